@@ -0,0 +1,118 @@
+import sys
+import os
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain_core.runnables import RunnableLambda
+from src.agent.admission import Lane, TokenBucket, AdmissionRejected, admission
+from src.agent.llm_routing import AdmittedChatModel
+from src.config import settings
+
+class TestAdmission(unittest.IsolatedAsyncioTestCase):
+
+    async def test_interactive_is_admitted_before_batch(self):
+        lane = Lane("openai", limit=1, rate=0, burst=1, max_queue=10)
+        order = []
+
+        async def worker(name, priority):
+            await lane.acquire(priority, time.monotonic() + 5)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            lane.release(0.01)
+
+        await lane.acquire(0, time.monotonic() + 5)  # occupy the only slot
+        tasks = [asyncio.create_task(worker("batch", 1))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(worker("interactive", 0)))
+        await asyncio.sleep(0.01)
+        self.assertEqual(lane.stats()["queue_depth"], 2)
+
+        lane.release(0.01)
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, ["interactive", "batch"])
+        self.assertEqual(lane.active, 0)
+
+    async def test_full_queue_fails_fast_with_retry_after(self):
+        lane = Lane("gemini", limit=1, rate=0, burst=1, max_queue=1)
+        await lane.acquire(0, time.monotonic() + 5)
+        waiter = asyncio.create_task(lane.acquire(0, time.monotonic() + 5))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as ctx:
+            await lane.acquire(0, time.monotonic() + 5)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        lane.release(0.01)
+        await waiter
+        lane.release(0.01)
+        self.assertEqual(lane.active, 0)
+        self.assertEqual(lane.rejected, 1)
+
+    async def test_wait_deadline(self):
+        lane = Lane("openai", limit=1, rate=0, burst=1, max_queue=10)
+        await lane.acquire(0, time.monotonic() + 5)
+        with self.assertRaises(AdmissionRejected):
+            await lane.acquire(0, time.monotonic() + 0.02)
+        lane.release(0.01)
+        self.assertEqual(lane.active, 0)
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+
+class TestAdmittedCalls(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.patches = [
+            mock.patch.dict(admission._lanes, clear=True),
+            mock.patch.object(settings, "ADMISSION_PROVIDER_CONCURRENCY", {"openai": 1}),
+            mock.patch.object(settings, "ADMISSION_MAX_QUEUE", 0),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    async def test_each_call_from_a_worker_thread_is_admitted(self):
+        admission.bind("interactive")
+        model = AdmittedChatModel("openai", "gpt-4o", RunnableLambda(lambda _: admission.stats()["openai"]["active"]))
+        self.assertEqual(await asyncio.to_thread(model.invoke, "q"), 1)
+        self.assertEqual(await asyncio.to_thread(model.invoke, "q"), 1)
+        stats = admission.stats()["openai"]
+        self.assertEqual((stats["admitted"], stats["active"]), (2, 0))
+
+    async def test_saturated_provider_rejects_the_call(self):
+        admission.bind("interactive")
+        started, finish = asyncio.Event(), asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def slow(_):
+            loop.call_soon_threadsafe(started.set)
+            asyncio.run_coroutine_threadsafe(finish.wait(), loop).result()
+            return "done"
+
+        model = AdmittedChatModel("openai", "gpt-4o", RunnableLambda(slow))
+        first = asyncio.ensure_future(asyncio.to_thread(model.invoke, "q"))
+        await started.wait()
+        with self.assertRaises(AdmissionRejected):
+            await asyncio.to_thread(model.invoke, "q")
+        finish.set()
+        self.assertEqual(await first, "done")
+
+    async def test_calls_outside_a_request_are_not_admitted(self):
+        model = AdmittedChatModel("openai", "gpt-4o", RunnableLambda(lambda _: "ok"))
+        self.assertEqual(await asyncio.to_thread(model.invoke, "q"), "ok")
+        self.assertEqual(admission.stats(), {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import os
+import asyncio
+import json
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from sqlalchemy import create_engine
+from src.database.schema_sync import reflect_tables
+from src.routers import onboarding
+
+class TestBulkOnboarding(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "warehouse.db")
+        with sqlite3.connect(self.db_path) as conn:
+            for i in range(120):
+                conn.execute(f"CREATE TABLE t{i} (id INTEGER PRIMARY KEY, name TEXT, amount REAL)")
+        self.registry_path = os.path.join(self.tmp.name, "postgres_tables.json")
+        self.meta_path = os.path.join(self.tmp.name, "postgres_metadata.json")
+        # The Postgres code path, pointed at a SQLite file
+        self.patches = [
+            mock.patch.object(onboarding, "REGISTRY_PATH", self.registry_path),
+            mock.patch.object(onboarding, "POSTGRES_META_PATH", self.meta_path),
+            mock.patch.object(onboarding, "postgres_url", lambda *args: f"sqlite:///{self.db_path}"),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def test_reflect_tables_reports_per_table(self):
+        engine = create_engine(f"sqlite:///{self.db_path}")
+        reflected = reflect_tables(engine, ["t0", "t1", "missing"], workers=2, chunk_size=2)
+        engine.dispose()
+        self.assertEqual([c["name"] for c in reflected["t1"]], ["id", "name", "amount"])
+        self.assertIsInstance(reflected["missing"], Exception)
+
+    def test_onboard_all_tables_in_one_write(self):
+        payload = onboarding.OnboardTablesRequest(database="warehouse", password="secret")
+        response = onboarding._onboard_postgres_tables(payload, "secret")
+        self.assertEqual((response.onboarded, response.failed), (120, 0))
+
+        with open(self.registry_path) as f:
+            registry = json.load(f)
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        self.assertEqual(len(registry["postgres_instances"]), 120)
+        self.assertEqual(len(registry["postgres_passwords"]), 1)
+        first = response.results[0]
+        self.assertEqual(meta[first.table_id]["columns"][1], {"name": "name", "type": "TEXT", "description": ""})
+        self.assertIn("schema_checksum", meta[first.table_id])
+
+        # Second run: everything already onboarded, unknown tables fail individually
+        payload = onboarding.OnboardTablesRequest(database="warehouse", password="secret",
+                                                  table_names=["t0", "nope"])
+        response = onboarding._onboard_postgres_tables(payload, "secret")
+        self.assertEqual([r.status for r in response.results], ["exists", "failed"])
+        with open(self.registry_path) as f:
+            self.assertEqual(len(json.load(f)["postgres_instances"]), 120)
+
+    def test_concurrent_onboarding_leaves_no_orphan_metadata(self):
+        reflect = onboarding.reflect_tables
+
+        def reflect_while_t0_is_onboarded(*args, **kwargs):
+            # /onboard-table adds t0 after the bulk run checked the registry
+            single = onboarding.OnboardTableRequest(database="warehouse", table_name="t0", password="secret")
+            asyncio.run(onboarding.onboard_postgres(single))
+            return reflect(*args, **kwargs)
+
+        payload = onboarding.OnboardTablesRequest(database="warehouse", password="secret", table_names=["t0", "t1"])
+        with mock.patch.object(onboarding, "reflect_tables", reflect_while_t0_is_onboarded):
+            response = onboarding._onboard_postgres_tables(payload, "secret")
+        self.assertEqual([r.status for r in response.results], ["exists", "onboarded"])
+
+        with open(self.registry_path) as f:
+            registry = json.load(f)
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        self.assertEqual([inst["postgress_table"] for inst in registry["postgres_instances"]], ["t0", "t1"])
+        self.assertEqual(set(meta), {inst["table_id"] for inst in registry["postgres_instances"]})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import sys
+import os
+import tempfile
+import time
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.cache.memory import MemoryCache
+from src.cache.sqlite import SQLiteCache
+from src.cache.base import NamespacedCache
+
+class TestMemoryCache(unittest.TestCase):
+
+    def test_roundtrip_is_a_copy(self):
+        cache = MemoryCache(max_bytes=1024 * 1024)
+        rows = [{"region": "North", "total": 10}]
+        cache.set("k", rows)
+        cache.get("k")[0]["total"] = 99
+        self.assertEqual(cache.get("k"), rows)
+
+    def test_lru_eviction_by_size(self):
+        cache = MemoryCache(max_bytes=3000)
+        for i in range(3):
+            cache.set(f"k{i}", "x" * 900)
+        cache.get("k0")  # k1 becomes least recently used
+        cache.set("k3", "x" * 900)
+        self.assertIsNone(cache.get("k1"))
+        self.assertIsNotNone(cache.get("k0"))
+        self.assertLessEqual(cache.stats()["bytes"], 3000)
+
+    def test_ttl(self):
+        cache = MemoryCache(max_bytes=1024)
+        cache.set("k", 1, ttl=0.05)
+        self.assertEqual(cache.get("k"), 1)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("k"))
+
+class TestSQLiteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_shared_between_instances(self):
+        # Two instances on one file stand in for two worker processes
+        writer = SQLiteCache(self.path, max_bytes=1024 * 1024)
+        reader = SQLiteCache(self.path, max_bytes=1024 * 1024)
+        NamespacedCache(writer, "sql").set("q", "SELECT 1")
+        self.assertEqual(NamespacedCache(reader, "sql").get("q"), "SELECT 1")
+        self.assertIsNone(NamespacedCache(reader, "schema").get("q"))
+
+    def test_ttl_and_eviction(self):
+        cache = SQLiteCache(self.path, max_bytes=5000)
+        cache.set("short", 1, ttl=0.05)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("short"))
+
+        for i in range(60):
+            cache.set(f"k{i}", "x" * 400)
+        # Eviction runs periodically, so the bound is max_bytes plus one maintenance window
+        self.assertLess(cache.stats()["bytes"], 10000)
+        self.assertIsNone(cache.get("k0"))
+        self.assertIsNotNone(cache.get("k59"))
+
+if __name__ == "__main__":
+    unittest.main()
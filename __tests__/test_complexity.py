@@ -0,0 +1,36 @@
+import sys
+import os
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.config import settings
+from src.agent.complexity import classify_question, select_model
+
+class TestComplexity(unittest.TestCase):
+
+    def test_simple_questions_are_fast(self):
+        for question in ("What is the total sales in 2024?",
+                         "How many orders did Acme Corp place?",
+                         "Show total quantity by region"):
+            self.assertEqual(classify_question(question).tier, "fast", question)
+
+    def test_comparative_questions_are_strong(self):
+        for question in ("Compare quarterly revenue growth by region between 2023 and 2024",
+                         "For each region, rank the top 3 products by sales and show their share of the regional total"):
+            self.assertEqual(classify_question(question).tier, "strong", question)
+
+    def test_select_model(self):
+        tiers = settings.MODEL_TIERS["openai"]
+        self.assertEqual(select_model("total sales", "openai", "gpt-4.1"), "gpt-4.1")
+        self.assertEqual(select_model("total sales", "openai"), tiers["fast"])
+        hard = "Compare year over year growth by region and product between 2023 and 2024"
+        self.assertEqual(select_model(hard, "openai"), tiers["strong"])
+        # Tiny results are summarised by the fast tier regardless of the question
+        self.assertEqual(select_model(hard, "openai", purpose="summary", row_count=4), tiers["fast"])
+        self.assertEqual(select_model(hard, "openai", purpose="summary", row_count=500), tiers["strong"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.database import registry
+from src.database.pools import DatasourcePools
+
+class TestDatasources(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_paths = []
+        for name in ("a", "b", "c"):
+            path = os.path.join(self.tmp.name, f"{name}.db")
+            with sqlite3.connect(path) as conn:
+                conn.execute(f"CREATE TABLE {name}_items (id INTEGER PRIMARY KEY, label TEXT)")
+            self.db_paths.append(path)
+
+        self.sqlite_registry = os.path.join(self.tmp.name, "sqlite_tables.json")
+        with open(self.sqlite_registry, "w") as f:
+            f.write(registry.json.dumps({"instances": [
+                {"table_id": f"t{i}", "type": "sqlite", "file_path": path, "table_name": os.path.basename(path)}
+                for i, path in enumerate(self.db_paths)
+            ] + [{"table_id": "t0b", "type": "sqlite", "file_path": self.db_paths[0], "table_name": "a again"}]}))
+        self.patches = [
+            mock.patch.object(registry, "SQLITE_REGISTRY", self.sqlite_registry),
+            mock.patch.object(registry, "POSTGRES_REGISTRY", os.path.join(self.tmp.name, "missing.json")),
+            mock.patch.object(registry, "PROMPT_CONFIG", os.path.join(self.tmp.name, "prompt.config")),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def test_resolve_table(self):
+        registry.invalidate_resolved()
+        datasource = registry.resolve_table("t0")
+        self.assertEqual(datasource.type, "sqlite")
+        self.assertEqual(datasource.url, f"sqlite:///{self.db_paths[0]}")
+        self.assertIsNone(registry.resolve_table("nope"))
+
+    def test_pools_are_lazy_bounded_and_idle_evicted(self):
+        pools = DatasourcePools(max_pools=2, idle_seconds=3600)
+        self.assertEqual(pools.stats()["open"], 0)
+
+        db = pools.get("t0")
+        self.assertEqual(db.get_usable_table_names(), ["a_items"])
+        self.assertIs(pools.get("t0"), db)
+
+        pools.get("t1")
+        pools.get("t2")
+        self.assertEqual([p["tables"] for p in pools.stats()["pools"].values()], [["t1"], ["t2"]])
+
+        pools.idle_seconds = 0
+        pools.sweep()
+        self.assertEqual(pools.stats()["open"], 0)
+        with self.assertRaises(KeyError):
+            pools.get("nope")
+
+    def test_tables_on_one_database_share_a_pool(self):
+        pools = DatasourcePools(max_pools=2, idle_seconds=3600)
+        self.assertIs(pools.get("t0")._engine, pools.get("t0b")._engine)
+        (pool,) = pools.stats()["pools"].values()
+        self.assertEqual(pool["tables"], ["t0", "t0b"])
+
+    def test_resolution_is_cached_until_the_registry_changes(self):
+        with mock.patch.object(registry, "load_json", wraps=registry.load_json) as load:
+            registry.resolve_table("t0")
+            registry.resolve_table("t0")
+            self.assertEqual(load.call_count, 3)
+            registry.invalidate_resolved()
+            registry.resolve_table("t0")
+            self.assertEqual(load.call_count, 6)
+
+    def test_missing_registered_table_is_not_widened(self):
+        pools = DatasourcePools(max_pools=2, idle_seconds=3600)
+        datasource = registry.Datasource(table_id="pg", type="postgres", url=f"sqlite:///{self.db_paths[0]}",
+                                         tables=["Sales"])
+        with mock.patch("src.database.pools.resolve_table", return_value=datasource):
+            with self.assertRaises(ValueError):
+                pools.get("pg")
+        datasource.tables = ["A_ITEMS"]  # catalog names match regardless of case
+        with mock.patch("src.database.pools.resolve_table", return_value=datasource):
+            self.assertEqual(pools.get("pg").get_usable_table_names(), ["a_items"])
+
+    def test_slow_datasource_does_not_block_others(self):
+        pools = DatasourcePools(max_pools=4, idle_seconds=3600)
+        create = pools._create
+        reflecting, release = threading.Event(), threading.Event()
+
+        def slow_create(engine, datasource):
+            if datasource.table_id == "t1":
+                reflecting.set()
+                release.wait(5)
+            return create(engine, datasource)
+
+        with mock.patch.object(pools, "_create", slow_create):
+            slow = threading.Thread(target=pools.get, args=("t1",))
+            slow.start()
+            self.assertTrue(reflecting.wait(5))
+            self.assertEqual(pools.get("t2").get_usable_table_names(), ["c_items"])  # while t1 is still reflecting
+            release.set()
+            slow.join(5)
+        self.assertEqual(pools.stats()["open"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+import os
+import math
+import unittest
+from datetime import date, timedelta
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.agent.downsample import downsample_rows, find_series
+
+def daily(days, region=None):
+    start = date(2022, 1, 1)
+    rows = []
+    for i in range(days):
+        row = {"sale_date": (start + timedelta(days=i)).isoformat(), "total": 1000 + 100 * math.sin(i / 10)}
+        if region:
+            row = {"region": region, **row}
+        rows.append(row)
+    # One spike that any chart of the series has to show
+    rows[days // 2]["total"] = 5000
+    return rows
+
+class TestDownsample(unittest.TestCase):
+
+    def test_detects_time_series(self):
+        self.assertEqual(find_series(["sale_date", "total"], daily(10)), ("sale_date", None, ["total"], []))
+        rows = [{"year": 2023, "month": m, "total": m} for m in range(1, 13)]
+        self.assertEqual(find_series(["year", "month", "total"], rows), ("year", "month", ["total"], []))
+        self.assertIsNone(find_series(["region", "total"], [{"region": "East", "total": 1}]))
+        self.assertIsNone(find_series(["sale_date", "region"], [{"sale_date": "2024-01-01", "region": "East"}]))
+
+    def test_lttb_keeps_shape_and_order(self):
+        rows = daily(3 * 365)
+        sampled = downsample_rows(["sale_date", "total"], rows, 200)
+        self.assertEqual(len(sampled), 200)
+        self.assertEqual(sampled[0], rows[0])
+        self.assertEqual(sampled[-1], rows[-1])
+        self.assertIn(rows[len(rows) // 2], sampled)
+        dates = [row["sale_date"] for row in sampled]
+        self.assertEqual(dates, sorted(dates))
+
+    def test_minmax_keeps_extremes(self):
+        rows = daily(1000)
+        sampled = downsample_rows(["sale_date", "total"], rows, 100, "minmax")
+        self.assertLessEqual(len(sampled), 100)
+        self.assertIn(rows[500], sampled)
+        self.assertEqual(min(r["total"] for r in sampled), min(r["total"] for r in rows))
+
+    def test_label_columns_are_separate_series(self):
+        rows = daily(400, "East") + daily(400, "West")
+        sampled = downsample_rows(["region", "sale_date", "total"], rows, 100)
+        self.assertEqual(sum(1 for r in sampled if r["region"] == "East"), 50)
+        self.assertEqual(sum(1 for r in sampled if r["region"] == "West"), 50)
+
+    def test_small_or_non_series_results_are_left_alone(self):
+        self.assertIsNone(downsample_rows(["sale_date", "total"], daily(50), 100))
+        rows = [{"org_name": f"org {i}", "total": i} for i in range(1000)]
+        self.assertIsNone(downsample_rows(["org_name", "total"], rows, 100))
+
+if __name__ == '__main__':
+    unittest.main()
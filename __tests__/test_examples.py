@@ -0,0 +1,65 @@
+import sys
+import os
+import tempfile
+import time
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.agent.examples import ExampleStore
+
+class TestExampleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "examples.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_nearest_examples_for_same_table(self):
+        store = ExampleStore(self.path, max_entries=100)
+        store.add("total sales for Acme Corp in 2024", "SELECT 1", "sales_data")
+        store.add("number of employees per department", "SELECT 2", "sales_data")
+        store.add("total sales for Acme Corp in 2023", "SELECT 3", "other_table")
+
+        results = store.search("What were total sales for Acme Corp in 2025?", "sales_data", k=2)
+        self.assertEqual(results[0][1]["sql"], "SELECT 1")
+        self.assertTrue(all(example["table"] == "sales_data" for _, example in results))
+
+    def test_persistence_supersede_and_eviction(self):
+        store = ExampleStore(self.path, max_entries=2)
+        store.add("q one", "SELECT 1", "t")
+        store.add("q one", "SELECT 11", "t")
+        store.add("q two", "SELECT 2", "t")
+        store.add("q three", "SELECT 3", "t")
+
+        reloaded = ExampleStore(self.path, max_entries=2)
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual([e["sql"] for _, e in reloaded.search("q three two", "t", k=5)], ["SELECT 3", "SELECT 2"])
+
+    def test_compaction_keeps_other_workers_examples(self):
+        worker_a = ExampleStore(self.path, max_entries=10)
+        worker_b = ExampleStore(self.path, max_entries=10)
+        worker_b.add("q from b", "SELECT 'b'", "t")
+        for i in range(3):  # superseded lines make worker A compact the file
+            worker_a.add("q from a", f"SELECT {i}", "t")
+
+        reloaded = ExampleStore(self.path, max_entries=10)
+        self.assertEqual(sorted(e["sql"] for _, e in reloaded.search("q from a b", "t", k=5)), ["SELECT 'b'", "SELECT 2"])
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_lookup_is_fast(self):
+        store = ExampleStore(self.path, max_entries=5000)
+        for i in range(2000):
+            store.add(f"total sales for org {i} in region {i % 4} during {2000 + i % 25}", f"SELECT {i}", "t")
+        started = time.perf_counter()
+        for _ in range(100):
+            store.search("total sales for org 17 in region 1", "t", k=3)
+        self.assertLess((time.perf_counter() - started) / 100, 0.005)
+
+if __name__ == '__main__':
+    unittest.main()
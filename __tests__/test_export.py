@@ -0,0 +1,68 @@
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from src.agent.answers import remember_answer
+from src.config import settings
+from src.database.export import stream_csv, stream_ndjson
+from src.routers import export
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "export.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE t (id INTEGER, name TEXT, amount REAL)")
+            conn.executemany("INSERT INTO t VALUES (?, ?, ?)", [(i, f"n,{i}", i / 2) for i in range(25)])
+        self.engine = create_engine(f"sqlite:///{path}")
+        self.batch_rows = settings.EXPORT_BATCH_ROWS
+        settings.EXPORT_BATCH_ROWS = 10
+
+    def tearDown(self):
+        settings.EXPORT_BATCH_ROWS = self.batch_rows
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_csv_streams_in_batches(self):
+        chunks = list(stream_csv(self.engine, "SELECT * FROM t ORDER BY id"))
+        self.assertEqual(len(chunks), 3)
+        lines = b"".join(chunks).decode().splitlines()
+        self.assertEqual(lines[0], "id,name,amount")
+        self.assertEqual(lines[2], '1,"n,1",0.5')
+        self.assertEqual(len(lines), 26)
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in b"".join(stream_ndjson(self.engine, "SELECT * FROM t")).splitlines()]
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[3], {"id": 3, "name": "n,3", "amount": 1.5})
+
+    def test_empty_result_still_has_header(self):
+        self.assertEqual(b"".join(stream_csv(self.engine, "SELECT * FROM t WHERE id < 0")), b"id,name,amount\r\n")
+
+    def test_endpoint_exports_answers_only(self):
+        app = FastAPI()
+        app.include_router(export.router)
+        client = TestClient(app)
+        with mock.patch.object(export, "get_db", return_value=mock.Mock(_engine=self.engine)), \
+             mock.patch.object(export, "get_replica_set", return_value=None):
+            answer_id = remember_answer("SELECT id FROM t WHERE id < 2 ORDER BY id")
+            response = client.post("/api/v1/export", json={"answer_id": answer_id})
+            self.assertEqual(response.text.splitlines(), ["id", "0", "1"])
+
+            self.assertEqual(client.post("/api/v1/export", json={"sql": "SELECT * FROM t"}).status_code, 422)
+            self.assertEqual(client.post("/api/v1/export", json={"answer_id": "nope"}).status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
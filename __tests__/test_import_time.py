@@ -0,0 +1,47 @@
+import sys
+import os
+import subprocess
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+# Cumulative import budget for src.main, in microseconds. Generous enough for
+# slow CI machines; it exists to catch heavy SDKs creeping back into module load.
+IMPORT_BUDGET_US = 2_000_000
+LAZY_MODULES = ["langchain_openai", "langchain_google_genai", "langgraph", "transformers", "torch"]
+
+class TestImportTime(unittest.TestCase):
+
+    def _importtime(self):
+        env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "test-key"))
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import src.main"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=env, capture_output=True, text=True, timeout=120
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr[-2000:])
+
+        timings = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            try:
+                timings[name.strip()] = int(cumulative)
+            except ValueError:
+                continue  # header line
+        return timings
+
+    def test_provider_sdks_are_lazy(self):
+        timings = self._importtime()
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, timings, f"{module} is imported at startup")
+
+    def test_import_budget(self):
+        timings = self._importtime()
+        print(f"\nsrc.main import: {timings['src.main'] / 1000:.0f} ms")
+        self.assertLess(timings["src.main"], IMPORT_BUDGET_US)
+
+if __name__ == "__main__":
+    unittest.main()
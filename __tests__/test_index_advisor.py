@@ -0,0 +1,97 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from sqlalchemy import create_engine
+from src.config import settings
+from src.database.workload import normalize_sql, extract_columns, record_query
+from src.database.index_advisor import recommend_indexes, apply_index
+
+COLUMNS = ["id", "org_name", "product_name", "sales_amount", "quantity", "sale_date", "year", "quarter", "month", "region"]
+
+class TestWorkloadParsing(unittest.TestCase):
+
+    def test_normalize_sql(self):
+        sql = "SELECT SUM(sales_amount)  FROM sales_data -- total\nWHERE region = 'North' AND year IN (2023, 2024);"
+        self.assertEqual(
+            normalize_sql(sql),
+            "SELECT SUM(sales_amount) FROM sales_data WHERE region = ? AND year IN (?)"
+        )
+
+    def test_extract_columns(self):
+        sql = ("SELECT region, SUM(sales_amount) FROM sales_data "
+               "WHERE org_name = 'Acme Corp' AND sale_date >= '2024-01-01' GROUP BY region ORDER BY 2 DESC")
+        cols = extract_columns(sql, COLUMNS)
+        self.assertEqual(cols["equality"], ["org_name"])
+        self.assertEqual(cols["range"], ["sale_date"])
+        self.assertEqual(cols["group_by"], ["region"])
+
+class TestIndexAdvisor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "sales.db")
+        self._old_log = settings.WORKLOAD_LOG_PATH
+        settings.WORKLOAD_LOG_PATH = os.path.join(self.tmp.name, "workload.db")
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE sales_data (id INTEGER PRIMARY KEY, org_name TEXT, region TEXT, sales_amount REAL, year INTEGER)")
+        conn.executemany(
+            "INSERT INTO sales_data (org_name, region, sales_amount, year) VALUES (?, ?, ?, ?)",
+            [(f"Org {i % 50}", ["North", "South", "East", "West"][i % 4], i * 1.5, 2023 + i % 3) for i in range(2000)]
+        )
+        conn.commit()
+        conn.close()
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+
+    def tearDown(self):
+        settings.WORKLOAD_LOG_PATH = self._old_log
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_recommends_and_applies_filter_index(self):
+        for org in ("Org 1", "Org 2", "Org 3"):
+            record_query(f"SELECT SUM(sales_amount) FROM sales_data WHERE org_name = '{org}'", 12.0, 1)
+
+        recs = recommend_indexes(self.engine)
+        self.assertTrue(recs)
+        self.assertEqual(recs[0]["columns"], ["org_name"])
+        self.assertEqual(recs[0]["query_count"], 3)
+        self.assertLess(recs[0]["estimated_cost_after"], recs[0]["estimated_cost_before"])
+
+        apply_index(self.engine, recs[0]["table"], recs[0]["columns"])
+        # Once the index exists it is no longer recommended
+        self.assertEqual([r for r in recommend_indexes(self.engine) if r["columns"] == ["org_name"]], [])
+
+    def test_sqlite_candidates_are_costed_on_a_copy(self):
+        record_query("SELECT SUM(sales_amount) FROM sales_data WHERE org_name = 'Org 1'", 12.0, 1)
+        # A writer holding the database must not block (or be blocked by) the advisor
+        writer = sqlite3.connect(self.db_path, isolation_level=None)
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            recs = recommend_indexes(self.engine)
+        finally:
+            writer.execute("ROLLBACK")
+            writer.close()
+        self.assertEqual(recs[0]["columns"], ["org_name"])
+
+    def test_postgres_without_hypopg_builds_nothing(self):
+        engine = mock.MagicMock()
+        engine.dialect.name = "postgresql"
+        connection = engine.connect.return_value.__enter__.return_value
+        connection.execute.return_value.scalar.return_value = None
+        record_query("SELECT SUM(sales_amount) FROM sales_data WHERE org_name = 'Org 1'", 12.0, 1)
+
+        self.assertEqual(recommend_indexes(engine), [])
+        statements = [str(call.args[0]) for call in connection.execute.call_args_list]
+        self.assertFalse(any("CREATE INDEX" in sql for sql in statements))
+
+if __name__ == "__main__":
+    unittest.main()
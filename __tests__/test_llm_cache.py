@@ -0,0 +1,74 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.agent.llm_cache import LLMResponseCache, llm_cache_policy, set_cache_policy
+from src.agent.token_budget import UsageRecorder, ledger, start_request, tenant_for
+from src.cache.sqlite import SQLiteCache
+
+class MeteredModel(FakeListChatModel):
+    """Fake provider that reports token usage like the real ones."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = super()._generate(messages, stop, run_manager, **kwargs).generations[0].message.content
+        usage = {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+class TestLLMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "llm_cache.db")
+        llm_cache_policy.set("use")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def model(self):
+        cache = LLMResponseCache(SQLiteCache(self.path, 10 * 1024 * 1024), ttl=3600)
+        return MeteredModel(responses=["first", "second", "third"], cache=cache)
+
+    def test_identical_prompts_are_answered_once(self):
+        llm = self.model()
+        self.assertEqual(llm.invoke("total sales?").content, "first")
+        self.assertEqual(llm.invoke("total sales?").content, "first")
+        self.assertEqual(llm.invoke("sales by region?").content, "second")
+
+        # Survives a restart: a new model over the same file
+        self.assertEqual(self.model().invoke("total sales?").content, "first")
+
+    def test_bound_arguments_are_part_of_the_key(self):
+        llm = self.model()
+        self.assertEqual(llm.invoke("q").content, "first")
+        self.assertEqual(llm.bind(schema="StructuredQnAPlan").invoke("q").content, "second")
+
+    def test_bypass_and_refresh(self):
+        llm = self.model()
+        llm.invoke("q")
+        set_cache_policy("bypass")
+        self.assertEqual(llm.invoke("q").content, "second")
+        set_cache_policy("refresh")
+        self.assertEqual(llm.invoke("q").content, "third")
+        set_cache_policy(None)
+        self.assertEqual(llm.invoke("q").content, "third")
+
+    def test_cache_hits_are_not_charged(self):
+        ledger._totals.clear()
+        budget = start_request("cache-key")
+        llm = self.model()
+        for _ in range(3):
+            llm.invoke("q", {"callbacks": [UsageRecorder("fake", 100)]})
+        self.assertEqual(budget.used, 110)
+        totals = ledger.stats()[tenant_for("cache-key")]
+        self.assertEqual((totals["calls"], totals["cached_calls"]), (1, 2))
+
+if __name__ == '__main__':
+    unittest.main()
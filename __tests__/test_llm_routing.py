@@ -0,0 +1,93 @@
+import sys
+import os
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain_core.runnables import RunnableLambda
+from src.config import settings
+from src.agent import llm_factory, llm_routing
+from src.agent.llm_routing import HedgedChatModel, get_profile
+
+def slow(answer, delay):
+    def call(_):
+        time.sleep(delay)
+        return answer
+    return RunnableLambda(call)
+
+def failing(_):
+    raise RuntimeError("503 from provider")
+
+class TestHedgedRouting(unittest.TestCase):
+
+    def setUp(self):
+        llm_routing._profiles.clear()
+        self._saved = (settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS, settings.LLM_PROFILE_MIN_SAMPLES)
+        settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS = 0.05
+        settings.LLM_PROFILE_MIN_SAMPLES = 3
+
+    def tearDown(self):
+        settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS, settings.LLM_PROFILE_MIN_SAMPLES = self._saved
+        llm_routing._profiles.clear()
+
+    def test_fast_primary_is_not_hedged(self):
+        model = HedgedChatModel([("openai", "a", slow("primary", 0.0)), ("gemini", "b", slow("alternate", 0.0))])
+        self.assertEqual(model.invoke("q"), "primary")
+        self.assertEqual(len(get_profile("gemini", "b").samples), 0)
+
+    def test_slow_primary_is_hedged(self):
+        model = HedgedChatModel([("openai", "a", slow("primary", 0.5)), ("gemini", "b", slow("alternate", 0.0))])
+        started = time.monotonic()
+        self.assertEqual(model.invoke("q"), "alternate")
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_async_loser_is_cancelled(self):
+        cancelled = []
+
+        async def stalled(_):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "primary"
+
+        async def quick(_):
+            return "alternate"
+
+        model = HedgedChatModel([("openai", "a", RunnableLambda(stalled)), ("gemini", "b", RunnableLambda(quick))])
+
+        async def run():
+            result = await model.ainvoke("q")
+            await asyncio.sleep(0)
+            return result
+
+        self.assertEqual(asyncio.run(run()), "alternate")
+        self.assertEqual(cancelled, [True])
+
+    def test_failing_provider_is_skipped(self):
+        model = HedgedChatModel([("openai", "a", RunnableLambda(failing)), ("gemini", "b", slow("alternate", 0.0))])
+        for _ in range(3):
+            self.assertEqual(model.invoke("q"), "alternate")
+        self.assertFalse(get_profile("openai", "a").available())
+        self.assertEqual(model._ordered()[0][0], "gemini")
+
+    def test_alternate_uses_the_same_tier(self):
+        tiers = settings.MODEL_TIERS
+        with mock.patch.object(settings, "LLM_ROUTING", "hedged"), \
+             mock.patch.object(settings, "GOOGLE_API_KEY", "test-key"), \
+             mock.patch.object(llm_factory, "_create_llm", lambda provider, model: RunnableLambda(lambda _: model)):
+            strong = llm_factory.get_llm("openai", tiers["openai"]["strong"])
+            fast = llm_factory.get_llm("openai", tiers["openai"]["fast"])
+            custom = llm_factory.get_llm("openai", "gpt-4.1")
+        self.assertEqual(strong.members[1][:2], ("gemini", tiers["gemini"]["strong"]))
+        self.assertEqual(fast.members[1][:2], ("gemini", tiers["gemini"]["fast"]))
+        self.assertEqual(custom.members[1][:2], ("gemini", llm_factory.DEFAULT_MODELS["gemini"]))
+
+if __name__ == "__main__":
+    unittest.main()
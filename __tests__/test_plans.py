@@ -0,0 +1,104 @@
+import sys
+import os
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from sqlalchemy import create_engine, text
+from src.config import settings
+from src.database import execution, plans
+from src.database.plans import explain_query, note_execution, profile_query, slow_plans
+
+# Trimmed EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) output of a filtered aggregate
+POSTGRES_PLAN = [{
+    "Plan": {
+        "Node Type": "Aggregate", "Plan Rows": 1, "Actual Rows": 1, "Actual Loops": 1, "Actual Total Time": 41.2,
+        "Plans": [{
+            "Node Type": "Seq Scan", "Relation Name": "sales_data", "Plan Rows": 50, "Actual Rows": 9800,
+            "Actual Loops": 1, "Actual Total Time": 38.5, "Shared Hit Blocks": 120, "Shared Read Blocks": 4,
+        }],
+    },
+    "Planning Time": 0.2,
+    "Execution Time": 41.5,
+}]
+
+class TestPlans(unittest.TestCase):
+
+    def setUp(self):
+        slow_plans.clear()
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE sales_data (id INTEGER PRIMARY KEY, region TEXT, amount REAL)"))
+            conn.execute(text("CREATE INDEX ix_region ON sales_data (region)"))
+            conn.execute(text("INSERT INTO sales_data (region, amount) VALUES ('East', 1), ('West', 2), ('East', 3)"))
+
+    def test_sqlite_plan_summary(self):
+        plan = explain_query(self.engine, "SELECT amount FROM sales_data ORDER BY amount")
+        self.assertEqual(plan["scan_types"], {"full_scan": 1})
+        self.assertEqual(plan["rows_returned"], 3)
+        self.assertIsNotNone(plan["execution_ms"])
+        self.assertIn("Full scan of sales_data", plan["warnings"])
+        self.assertTrue(any(w.startswith("Sort without an index") for w in plan["warnings"]))
+
+        plan = explain_query(self.engine, "SELECT region, COUNT(*) FROM sales_data WHERE region = 'East' GROUP BY region",
+                             analyze=False)
+        self.assertEqual(plan["scan_types"], {"index_only_scan": 1})
+        self.assertEqual(plan["nodes"][0]["index"], "ix_region")
+        self.assertIsNone(plan["execution_ms"])
+        self.assertEqual(plan["warnings"], [])
+
+    def test_postgres_plan_summary(self):
+        engine = mock.MagicMock()
+        engine.dialect.name = "postgresql"
+        engine.connect.return_value.__enter__.return_value.execute.return_value.scalar.return_value = POSTGRES_PLAN
+        plan = explain_query(engine, "SELECT SUM(sales_amount) FROM sales_data WHERE region = 'East'")
+        engine.connect.return_value.__enter__.return_value.begin.return_value.rollback.assert_called_once()
+
+        self.assertEqual((plan["planning_ms"], plan["execution_ms"]), (0.2, 41.5))
+        scan = plan["nodes"][1]
+        self.assertEqual((scan["node"], scan["relation"], scan["depth"]), ("Seq Scan", "sales_data", 1))
+        self.assertEqual((scan["estimated_rows"], scan["actual_rows"], scan["time_ms"]), (50, 9800, 38.5))
+        self.assertEqual(plan["scan_types"], {"full_scan": 1})
+        self.assertIn("Seq Scan on sales_data: estimated 50 rows, got 9800", plan["warnings"])
+
+    def test_slow_plans_are_kept_per_template(self):
+        with mock.patch.object(settings, "SLOW_PLAN_THRESHOLD_MS", 100), \
+             mock.patch.object(settings, "SLOW_PLAN_STORE_SIZE", 2):
+            note_execution(self.engine, "SELECT * FROM sales_data WHERE id = 1", "default", 50)
+            self.assertEqual(slow_plans.entries(), [])
+
+            note_execution(self.engine, "SELECT * FROM sales_data WHERE id = 1", "default", 150)
+            note_execution(self.engine, "SELECT * FROM sales_data WHERE id = 2", "default", 300)
+            (entry,) = slow_plans.entries()
+            self.assertEqual((entry["count"], entry["max_duration_ms"]), (2, 300))
+            self.assertFalse(entry["plan"]["analyzed"])
+
+            note_execution(self.engine, "SELECT region FROM sales_data", "default", 200)
+            note_execution(self.engine, "SELECT amount FROM sales_data", "default", 200)
+            self.assertEqual(len(slow_plans.entries()), 2)
+
+    def test_profile_failures_do_not_raise(self):
+        plan = profile_query(self.engine, "SELECT nope FROM sales_data")
+        self.assertIn("error", plan)
+
+    def test_explained_execution_is_recorded_once(self):
+        db = mock.Mock(_engine=self.engine)
+        sql = "SELECT amount FROM sales_data ORDER BY amount"
+        with mock.patch.object(settings, "SLOW_PLAN_THRESHOLD_MS", 0.000001), \
+             mock.patch.object(execution, "record_query"), \
+             mock.patch.object(plans, "explain_query", wraps=explain_query) as explain:
+            keys, rows, plan = execution.execute_sql_with_plan(db, sql, use_cache=False)
+        self.assertEqual(len(rows), 3)
+        # The answer's own run is the analyzed one: no second execution on SQLite
+        explain.assert_called_once_with(self.engine, sql, analyze=False)
+        self.assertTrue(plan["analyzed"])
+        self.assertEqual(plan["rows_returned"], 3)
+        (entry,) = slow_plans.entries()
+        self.assertEqual(entry["count"], 1)
+        self.assertEqual(entry["plan"], plan)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import sys
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from src.agent import llm_factory, replay
+from src.agent.qna_graph import StructuredQnAPlan
+from src.agent.replay import CassetteMiss, RecordingChatModel, ReplayChatModel
+from src.config import settings
+
+PROMPT = ChatPromptTemplate.from_template("Write SQL for: {question}")
+PLAN = StructuredQnAPlan(business_explanation="b", entity_explanation="e",
+                         sql_query="SELECT COUNT(*) FROM sales_data", table_layout="sales_data(id)")
+
+class FakeProvider(FakeListChatModel):
+    def with_structured_output(self, schema, include_raw=False, **kwargs):
+        raw = AIMessage(content="", usage_metadata={"input_tokens": 40, "output_tokens": 9, "total_tokens": 49})
+        return RunnableLambda(lambda _: {"raw": raw, "parsed": PLAN, "parsing_error": None})
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "llm.jsonl")
+        replay._cassettes.clear()
+        self.patch = mock.patch.object(settings, "LLM_CASSETTE_PATH", self.path)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        replay._cassettes.clear()
+        self.tmp.cleanup()
+
+    def test_recorded_answers_replay_offline(self):
+        recorder = RecordingChatModel(inner=FakeProvider(responses=["SELECT 1", "SELECT 2"]), model_name="fake")
+        self.assertEqual((PROMPT | recorder).invoke({"question": "one"}).content, "SELECT 1")
+        self.assertEqual((PROMPT | recorder).invoke({"question": "two"}).content, "SELECT 2")
+        self.assertEqual((PROMPT | recorder.with_structured_output(StructuredQnAPlan)).invoke({"question": "plan"}), PLAN)
+
+        replay._cassettes.clear()  # as a fresh process would
+        player = ReplayChatModel()
+        self.assertEqual((PROMPT | player).invoke({"question": "two"}).content, "SELECT 2")
+        self.assertEqual((PROMPT | player).invoke({"question": "one"}).content, "SELECT 1")
+        self.assertEqual((PROMPT | player.with_structured_output(StructuredQnAPlan)).invoke({"question": "plan"}), PLAN)
+        with self.assertRaises(CassetteMiss):
+            (PROMPT | player).invoke({"question": "never recorded"})
+
+    def test_latency_injection(self):
+        RecordingChatModel(inner=FakeProvider(responses=["SELECT 1"]), model_name="fake").invoke("hi")
+        with mock.patch.object(settings, "LLM_REPLAY_LATENCY_MS", 50):
+            started = time.monotonic()
+            ReplayChatModel().invoke("hi")
+            self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+    def test_replay_mode_overrides_the_provider(self):
+        with mock.patch.object(settings, "LLM_CASSETTE_MODE", "replay"):
+            provider, model = llm_factory.resolve_model("gemini", None)
+            self.assertEqual(provider, "replay")
+            self.assertIsInstance(llm_factory.get_llm("openai"), ReplayChatModel)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from sqlalchemy import create_engine, exc
+from src.database import execution
+from src.database.replicas import ReplicaSet, is_read_only
+
+class TestReplicas(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.urls = []
+        for name in ("primary", "r1", "r2"):
+            path = os.path.join(self.tmp.name, f"{name}.db")
+            with sqlite3.connect(path) as conn:
+                conn.execute("CREATE TABLE t (source TEXT)")
+                conn.execute("INSERT INTO t VALUES (?)", (name,))
+            self.urls.append(f"sqlite:///{path}")
+        self.primary = create_engine(self.urls[0])
+        self.replicas = ReplicaSet(self.urls[1:])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        _, (_, rows) = execution._run_on_replica(self.replicas, self.primary,
+                                                 lambda engine: execution._fetch(engine, "SELECT source FROM t"))
+        return rows[0]["source"]
+
+    def test_read_only_detection(self):
+        self.assertTrue(is_read_only("SELECT region, SUM(sales_amount) FROM sales_data GROUP BY region"))
+        self.assertTrue(is_read_only("-- top\nWITH x AS (SELECT 1) SELECT * FROM x;"))
+        self.assertFalse(is_read_only("DELETE FROM sales_data"))
+        self.assertFalse(is_read_only("WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d"))
+        self.assertFalse(is_read_only("SELECT * FROM t FOR UPDATE"))
+        self.assertFalse(is_read_only("SELECT 1; DROP TABLE t"))
+
+    def test_least_outstanding(self):
+        with self.replicas.acquire() as first:
+            with self.replicas.acquire() as second:
+                self.assertIsNot(first, second)
+        self.assertEqual([r.outstanding for r in self.replicas.replicas], [0, 0])
+
+    def test_lagging_and_failed_replicas_fall_back_to_primary(self):
+        r1, r2 = self.replicas.replicas
+        r1.lag_seconds = 3600
+        self.assertEqual(self.read(), "r2")
+
+        r2.engine = create_engine(f"sqlite:///{self.tmp.name}/missing/dir.db")
+        self.assertEqual(self.read(), "primary")
+        self.assertFalse(r2.healthy)
+        self.assertEqual(self.read(), "primary")
+        self.assertEqual(self.replicas.stats()["primary_fallbacks"], 1)
+
+        r1.lag_seconds = 0
+        self.assertEqual(self.read(), "r1")
+
+    def test_bad_sql_is_not_retried_on_the_primary(self):
+        error = exc.ProgrammingError("SELECT no_such_column FROM t", {}, Exception('column "no_such_column" does not exist'))
+        run = mock.Mock(side_effect=error)
+        with self.assertRaises(exc.ProgrammingError):
+            execution._run_on_replica(self.replicas, self.primary, run)
+        run.assert_called_once()
+        self.assertIsNot(run.call_args.args[0], self.primary)
+        self.assertTrue(all(r.healthy for r in self.replicas.replicas))
+
+    def test_plans_come_from_the_engine_that_ran_the_query(self):
+        r1, r2 = self.replicas.replicas
+        r1.lag_seconds = 3600
+        db = mock.Mock(_engine=self.primary)
+        with mock.patch.object(execution, "get_replica_set", return_value=self.replicas), \
+             mock.patch.object(execution, "record_query"), \
+             mock.patch.object(execution, "profile_query", return_value={}) as profile:
+            _, rows, _ = execution.execute_sql_with_plan(db, "SELECT source FROM t", use_cache=False)
+        self.assertEqual(rows[0]["source"], "r2")
+        self.assertIs(profile.call_args.args[0], r2.engine)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import sys
+import os
+import sqlite3
+import time
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from sqlalchemy import exc
+from src.agent import resilience
+from src.agent.resilience import CircuitOpenError, call_with_retry, get_breaker, is_transient, set_deadline
+from src.config import settings
+
+class Flaky:
+    def __init__(self, failures, error=ConnectionError("reset by peer")):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+class TestResilience(unittest.TestCase):
+
+    def setUp(self):
+        resilience._breakers.clear()
+        resilience.request_deadline.set(None)
+        self.patches = [
+            mock.patch.object(settings, "RETRY_BASE_DELAY_SECONDS", 0.001),
+            mock.patch.object(settings, "RETRY_MAX_ATTEMPTS", 3),
+            mock.patch.object(settings, "BREAKER_FAILURE_THRESHOLD", 3),
+            mock.patch.object(settings, "BREAKER_RESET_SECONDS", 0.05),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_transient_failures_are_retried(self):
+        flaky = Flaky(2)
+        self.assertEqual(call_with_retry("llm:test", flaky), "ok")
+        self.assertEqual(flaky.calls, 3)
+        self.assertEqual(get_breaker("llm:test").state, "closed")
+
+    def test_bad_requests_and_writes_are_not_retried(self):
+        flaky = Flaky(1, ValueError("unparsable answer"))
+        with self.assertRaises(ValueError):
+            call_with_retry("llm:test", flaky)
+        self.assertEqual(flaky.calls, 1)
+
+        flaky = Flaky(1)
+        with self.assertRaises(ConnectionError):
+            call_with_retry("db:test", flaky, idempotent=False)
+        self.assertEqual(flaky.calls, 1)
+
+    def test_retries_respect_the_deadline(self):
+        settings.RETRY_BASE_DELAY_SECONDS = 10
+        set_deadline(0.0)
+        flaky = Flaky(1)
+        with self.assertRaises(ConnectionError):
+            call_with_retry("llm:test", flaky)
+        self.assertEqual(flaky.calls, 1)
+
+    def test_breaker_fails_fast_then_probes(self):
+        down = Flaky(100)
+        with self.assertRaises(ConnectionError):
+            call_with_retry("db:test", down)
+        self.assertEqual(get_breaker("db:test").state, "open")
+        with self.assertRaises(CircuitOpenError):
+            call_with_retry("db:test", down)
+        self.assertEqual(down.calls, 3)
+
+        time.sleep(0.06)
+        self.assertEqual(call_with_retry("db:test", lambda: "back"), "back")
+        self.assertEqual(get_breaker("db:test").state, "closed")
+
+    def test_transient_classification(self):
+        locked = exc.OperationalError("SELECT 1", {}, sqlite3.OperationalError("database is locked"))
+        syntax = exc.OperationalError("SELEC 1", {}, sqlite3.OperationalError('near "SELEC": syntax error'))
+        self.assertTrue(is_transient(locked))
+        self.assertFalse(is_transient(syntax))
+        rate_limited = type("RateLimitError", (Exception,), {})()
+        self.assertTrue(is_transient(rate_limited))
+
+    def test_postgres_sqlstate_classification(self):
+        def pg_error(pgcode):
+            orig = type("PgError", (Exception,), {"pgcode": pgcode})("boom")
+            return exc.OperationalError("SELECT 1", {}, orig)
+
+        self.assertFalse(is_transient(pg_error("28P01")))  # bad password
+        self.assertFalse(is_transient(pg_error("57014")))  # statement timeout
+        self.assertTrue(is_transient(pg_error("08006")))   # connection failure
+        self.assertTrue(is_transient(pg_error("40P01")))   # deadlock
+        self.assertTrue(is_transient(pg_error("57P01")))   # admin shutdown
+        self.assertTrue(is_transient(pg_error(None)))      # server closed the connection
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import sys
+import os
+import json
+import unittest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import brotli
+import ormsgpack
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from src.responses import CompressionMiddleware, FastJSONResponse, dumps, respond
+
+class Rows(BaseModel):
+    data: List[Dict[str, Any]]
+
+class TestResponses(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI(default_response_class=FastJSONResponse)
+        app.add_middleware(CompressionMiddleware, minimum_size=1024, compresslevel=6, brotli_quality=4)
+
+        @app.get("/rows")
+        async def rows(request: Request, n: int = 3):
+            data = [{"amount": Decimal("10.50"), "day": date(2024, 1, i % 28 + 1)} for i in range(n)]
+            return respond(request, Rows.model_construct(data=data))
+
+        self.client = TestClient(app)
+
+    def test_database_values_encode(self):
+        row = {"amount": Decimal("1.25"), "at": datetime(2024, 5, 1, 12, 30), "took": timedelta(seconds=90),
+               "raw": b"\x00\x01", 1: "non-str key"}
+        self.assertEqual(json.loads(dumps(row)), {"amount": 1.25, "at": "2024-05-01T12:30:00", "took": 90.0,
+                                                   "raw": "AAE=", "1": "non-str key"})
+
+    def test_json_and_msgpack_negotiation(self):
+        response = self.client.get("/rows")
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(response.json()["data"][0], {"amount": 10.5, "day": "2024-01-01"})
+
+        response = self.client.get("/rows", headers={"Accept": "application/msgpack"})
+        self.assertEqual(response.headers["content-type"], "application/msgpack")
+        self.assertEqual(ormsgpack.unpackb(response.content)["data"][1], {"amount": 10.5, "day": "2024-01-02"})
+
+    def test_only_large_bodies_are_compressed(self):
+        small = self.client.get("/rows", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", small.headers)
+        large = self.client.get("/rows?n=500", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(large.headers["content-encoding"], "gzip")
+        self.assertEqual(len(large.json()["data"]), 500)
+
+    def test_brotli(self):
+        for n in (500, 20000):  # the larger body is compressed off the event loop
+            with self.client.stream("GET", f"/rows?n={n}", headers={"Accept-Encoding": "br"}) as response:
+                self.assertEqual(response.headers["content-encoding"], "br")
+                raw = b"".join(response.iter_raw())
+            self.assertEqual(len(json.loads(brotli.decompress(raw))["data"]), n)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import os
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.agent.results import get_page, store_result
+from src.config import settings
+from src.responses import FastJSONResponse
+from src.routers import results
+
+COLUMNS = ["org_name", "sale_date", "amount"]
+
+def make_rows(n):
+    return [{"org_name": f"org {i % 7}", "sale_date": date(2024, 1, 1 + i % 28),
+             "amount": Decimal(i) if i % 10 else None} for i in range(n)]
+
+class TestResults(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(settings, "RESULT_SPILL_DIR", self.tmp.name),
+            mock.patch.object(settings, "RESULT_MEMORY_MAX_ROWS", 100),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def check_paging(self, n):
+        rows = make_rows(n)
+        handle = store_result(COLUMNS, rows)
+
+        columns, page, total = get_page(handle, offset=20, limit=10)
+        self.assertEqual((columns, total), (COLUMNS, n))
+        self.assertEqual(page, rows[20:30])  # exact values, original order
+
+        _, page, _ = get_page(handle, offset=0, limit=n, sort="amount", descending=True)
+        amounts = [r["amount"] for r in page]
+        present = [a for a in amounts if a is not None]
+        self.assertEqual(present, sorted(present, reverse=True))
+        self.assertTrue(all(a is None for a in amounts[len(present):]))  # NULLs last
+
+        with self.assertRaises(ValueError):
+            get_page(handle, sort="no_such_column")
+        return handle
+
+    def test_small_results_stay_in_memory(self):
+        self.check_paging(80)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_large_results_spill_to_disk(self):
+        handle = self.check_paging(1000)
+        self.assertEqual(os.listdir(self.tmp.name), [f"{handle}.db"])
+
+    def test_expired_and_unknown_handles(self):
+        handle = store_result(COLUMNS, make_rows(500))
+        with mock.patch.object(settings, "RESULT_TTL_SECONDS", -1):
+            self.assertIsNone(get_page(handle))
+        self.assertIsNone(get_page("0" * 32))
+        self.assertIsNone(get_page("../../etc/passwd"))
+
+    def test_endpoint(self):
+        app = FastAPI(default_response_class=FastJSONResponse)
+        app.include_router(results.router)
+        client = TestClient(app)
+        handle = store_result(COLUMNS, make_rows(500))
+
+        body = client.get(f"/api/v1/results/{handle}", params={"offset": 490, "limit": 50, "sort": "-org_name"}).json()
+        self.assertEqual((body["total_rows"], len(body["data"])), (500, 10))
+        self.assertEqual(body["data"][0]["org_name"], "org 0")
+        self.assertEqual(client.get(f"/api/v1/results/{handle}", params={"sort": "x"}).status_code, 400)
+        self.assertEqual(client.get(f"/api/v1/results/{'f' * 32}").status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
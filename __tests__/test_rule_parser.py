@@ -0,0 +1,71 @@
+import sys
+import os
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.agent.rule_parser import parse_question
+
+VOCABULARY = {
+    "org_name": ["Acme Corp", "Globex", "Wayne Ent"],
+    "product_name": ["Keyboard", "Laptop", "Monitor"],
+    "region": ["East", "North", "South", "West"],
+    "quarter": ["Q1", "Q2", "Q3", "Q4"],
+    "month": ["January", "March", "May"],
+    "year": ["2023", "2024", "2025"],
+}
+
+class TestRuleParser(unittest.TestCase):
+
+    def assertCompiles(self, question, sql):
+        match = parse_question(question, VOCABULARY)
+        self.assertIsNotNone(match, question)
+        self.assertEqual(match.confidence, 1.0, question)
+        self.assertEqual(match.sql, sql)
+
+    def test_scalar_with_filters(self):
+        self.assertCompiles("What is the total sales in 2024?",
+                            "SELECT SUM(sales_amount) AS total_sales_amount FROM sales_data WHERE year = 2024")
+        self.assertCompiles("How many orders did Acme Corp place?",
+                            "SELECT COUNT(*) AS order_count FROM sales_data WHERE org_name = 'Acme Corp'")
+        self.assertCompiles("how many laptops were sold in Q1",
+                            "SELECT SUM(quantity) AS total_quantity FROM sales_data "
+                            "WHERE product_name = 'Laptop' AND quarter = 'Q1'")
+
+    def test_group_by_and_top_n(self):
+        self.assertCompiles("total sales by region and year",
+                            "SELECT region, year, SUM(sales_amount) AS total_sales_amount FROM sales_data "
+                            "GROUP BY region, year ORDER BY region, year")
+        self.assertCompiles("top 3 products by revenue for East and West",
+                            "SELECT product_name, SUM(sales_amount) AS total_sales_amount FROM sales_data "
+                            "WHERE region IN ('East', 'West') GROUP BY product_name "
+                            "ORDER BY total_sales_amount DESC LIMIT 3")
+
+    def test_counting_a_dimension(self):
+        self.assertCompiles("how many customers do we have",
+                            "SELECT COUNT(DISTINCT org_name) AS org_name_count FROM sales_data")
+        self.assertCompiles("number of products",
+                            "SELECT COUNT(DISTINCT product_name) AS product_name_count FROM sales_data")
+        self.assertCompiles("how many regions are there",
+                            "SELECT COUNT(DISTINCT region) AS region_count FROM sales_data")
+        self.assertCompiles("how many customers bought a Laptop",
+                            "SELECT COUNT(DISTINCT org_name) AS org_name_count FROM sales_data "
+                            "WHERE product_name = 'Laptop'")
+        self.assertLess(parse_question("how many customers and products", VOCABULARY).confidence, 1.0)
+
+    def test_months_in_calendar_order(self):
+        match = parse_question("total sales by month", VOCABULARY)
+        self.assertIn("ORDER BY CASE month WHEN 'January' THEN 1 WHEN 'February' THEN 2", match.sql)
+        self.assertTrue(match.sql.endswith("WHEN 'December' THEN 12 END"))
+
+    def test_low_confidence_falls_back(self):
+        match = parse_question("Compare sales growth between 2023 and 2024", VOCABULARY)
+        self.assertLess(match.confidence, 1.0)
+        # "May" the verb is not the month
+        self.assertLess(parse_question("may I see the total sales", VOCABULARY).confidence, 1.0)
+        self.assertIsNone(parse_question("Who is the CEO of Globex?", VOCABULARY))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from sqlalchemy import create_engine
+from src.database.schema_serializer import describe_tables, render_schema, serialize_schema
+from src.tokens import count_tokens
+
+class TestSchemaSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "wide.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, region TEXT, customer TEXT, amount DECIMAL(15, 2), sold_on DATE)")
+        conn.executemany(
+            "INSERT INTO orders (region, customer, amount, sold_on) VALUES (?, ?, ?, ?)",
+            [(["North", "South"][i % 2], f"Customer {i}", i * 2.5, "2024-01-01") for i in range(40)]
+        )
+        conn.commit()
+        conn.close()
+        self.engine = create_engine(f"sqlite:///{path}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_compact_form_with_enum_values(self):
+        tables = describe_tables(self.engine, ["orders"], enum_max_values=5)
+        self.assertEqual(
+            render_schema(tables),
+            "orders(id:int pk, region:text{North|South}, customer:text, amount:decimal, sold_on:date)"
+        )
+
+    def test_budget_drops_detail(self):
+        tables = describe_tables(self.engine, ["orders"])
+        tables[0].columns[1].description = "Sales region of the order"
+        full = render_schema(tables)
+        self.assertIn("Sales region", full)
+
+        squeezed = serialize_schema(tables, token_budget=count_tokens(full) - 1)
+        self.assertNotIn("Sales region", squeezed)
+        self.assertIn("{North|South}", squeezed)
+
+        minimal = serialize_schema(tables, token_budget=1)
+        self.assertEqual(minimal, "orders(id, region, customer, amount, sold_on)")
+
+if __name__ == "__main__":
+    unittest.main()
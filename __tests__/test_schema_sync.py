@@ -0,0 +1,102 @@
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.database import registry, schema_sync
+from src.database.schema_sync import merge_columns, sync_schemas
+
+class TestSchemaSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "shop.db")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, label TEXT)")
+
+        def path(name):
+            return os.path.join(self.tmp.name, name)
+
+        with open(path("sqlite_tables.json"), "w") as f:
+            json.dump({"instances": [{"table_id": "t0", "type": "sqlite", "file_path": self.db_path,
+                                      "table_name": "shop.db"}]}, f)
+        with open(path("sqlite_metadata.json"), "w") as f:
+            json.dump({"t0": {"description": "Shop items", "columns": [
+                {"name": "id", "type": "INTEGER", "description": "Item key"},
+                {"name": "label", "type": "TEXT", "description": "Shown to customers"},
+            ]}}, f)
+        self.patches = [
+            mock.patch.object(registry, "SQLITE_REGISTRY", path("sqlite_tables.json")),
+            mock.patch.object(registry, "SQLITE_META", path("sqlite_metadata.json")),
+            mock.patch.object(registry, "POSTGRES_REGISTRY", path("missing.json")),
+            mock.patch.object(registry, "POSTGRES_META", path("postgres_metadata.json")),
+            mock.patch.object(registry, "PROMPT_CONFIG", path("prompt.config")),
+            mock.patch.dict(schema_sync._applied_checksums, clear=True),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def metadata(self):
+        return registry.load_json(registry.SQLITE_META)["t0"]
+
+    def test_merge_keeps_descriptions(self):
+        columns, changes = merge_columns(
+            [{"name": "a", "type": "INT", "description": "kept"}, {"name": "gone", "type": "TEXT", "description": ""}],
+            [{"name": "a", "type": "BIGINT", "description": ""}, {"name": "b", "type": "TEXT", "description": ""}],
+        )
+        self.assertEqual(columns, [{"name": "a", "type": "BIGINT", "description": "kept"},
+                                   {"name": "b", "type": "TEXT", "description": ""}])
+        self.assertEqual(changes, {"added": ["b"], "removed": ["gone"], "retyped": ["a"]})
+
+    def test_only_drifted_tables_are_resynced(self):
+        # First run only records the checksum: the stored columns already match
+        report = sync_schemas()
+        self.assertEqual((report["checked"], report["changed"], report["unchanged"]), (1, {}, 1))
+        checksum = self.metadata()["schema_checksum"]
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("ALTER TABLE items ADD COLUMN price REAL")
+        report = sync_schemas()
+        self.assertEqual(report["changed"], {"t0": {"added": ["price"], "removed": [], "retyped": []}})
+        entry = self.metadata()
+        self.assertNotEqual(entry["schema_checksum"], checksum)
+        self.assertEqual(entry["description"], "Shop items")
+        self.assertEqual([c["description"] for c in entry["columns"]], ["Item key", "Shown to customers", ""])
+
+        report = sync_schemas()
+        self.assertEqual((report["changed"], report["unchanged"]), ({}, 1))
+
+    def test_worker_that_did_not_write_still_invalidates(self):
+        sync_schemas()
+        checksum = self.metadata()["schema_checksum"]
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("ALTER TABLE items ADD COLUMN price REAL")
+        sync_schemas()
+
+        # Another worker wrote the new checksum; this one last applied the old one
+        schema_sync._applied_checksums["t0"] = checksum
+        with mock.patch.object(schema_sync, "_invalidate") as invalidate:
+            report = sync_schemas()
+            self.assertEqual(report["changed"], {})
+            invalidate.assert_called_once_with("t0", f"sqlite:///{self.db_path}")
+            sync_schemas()
+            invalidate.assert_called_once()
+
+    def test_unknown_table_is_reported(self):
+        report = sync_schemas(["nope"])
+        self.assertEqual(report["failed"], {"nope": "not onboarded"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import sys
+import os
+import asyncio
+import tempfile
+import unittest
+from decimal import Decimal
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.config import settings
+from src.agent.sessions import SessionStore, add_turns, make_turn, refine_previous, run_on_previous
+
+TURN = make_turn(
+    "total sales by region",
+    "SELECT region, SUM(sales_amount) AS total FROM sales_data GROUP BY region",
+    ["region", "total"],
+    [{"region": "East", "total": 30.0}, {"region": "North", "total": 10.0},
+     {"region": "South", "total": 40.0}, {"region": "West", "total": 20.0}],
+)
+
+class TestSessions(unittest.TestCase):
+
+    def refine(self, question):
+        refinement = refine_previous(question, TURN)
+        return run_on_previous(TURN, refinement[0])[1] if refinement else None
+
+    def test_filter_previous_result(self):
+        self.assertEqual(self.refine("now only the North region"), [{"region": "North", "total": 10.0}])
+        rows = self.refine("excluding North and South")
+        self.assertEqual([r["region"] for r in rows], ["East", "West"])
+
+    def test_top_n_of_previous_result(self):
+        rows = self.refine("just the top 2")
+        self.assertEqual([r["region"] for r in rows], ["South", "East"])
+        rows = self.refine("bottom 1 by total")
+        self.assertEqual([r["region"] for r in rows], ["North"])
+
+    def test_decimal_results(self):
+        turn = make_turn("total sales by region", "SELECT ...", ["region", "total"],
+                         [{"region": "East", "total": Decimal("999")}, {"region": "West", "total": Decimal("1000")}])
+        refinement = refine_previous("top 1", turn)
+        self.assertIsNotNone(refinement)
+        self.assertEqual(run_on_previous(turn, refinement[0])[1], [{"region": "West", "total": 1000.0}])
+
+    def test_new_questions_go_to_the_source(self):
+        self.assertIsNone(refine_previous("what about by quarter", TURN))
+        self.assertIsNone(refine_previous("North", TURN))  # no follow-up marker
+        self.assertIsNone(refine_previous("now only North sales in 2023", TURN))
+        too_big = dict(TURN, rows=None)
+        self.assertIsNone(refine_previous("now only the North region", too_big))
+
+    def test_history_is_capped(self):
+        history = []
+        for i in range(settings.SESSION_MAX_TURNS + 3):
+            history = add_turns(history, [make_turn(f"q{i}", None, [], [])])
+        self.assertEqual(len(history), settings.SESSION_MAX_TURNS)
+        self.assertEqual(history[-1]["question"], f"q{settings.SESSION_MAX_TURNS + 2}")
+
+    def test_sessions_expire_and_are_capped(self):
+        tmp = tempfile.TemporaryDirectory()
+        saved = settings.SESSION_DB_PATH, settings.SESSION_MAX_SESSIONS, settings.SESSION_TTL_SECONDS
+        settings.SESSION_DB_PATH = os.path.join(tmp.name, "sessions.db")
+        settings.SESSION_MAX_SESSIONS = 2
+
+        async def scenario():
+            store = SessionStore()
+            for thread_id in ("a", "b", "c"):
+                await store.begin(thread_id)
+            self.assertEqual(sorted(store._last_seen), ["b", "c"])
+            settings.SESSION_TTL_SECONDS = -1
+            await store.begin("d")
+            self.assertEqual(list(store._last_seen), ["d"])
+            saver = await store.saver()
+            if hasattr(saver, "conn"):
+                await saver.conn.close()
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            settings.SESSION_DB_PATH, settings.SESSION_MAX_SESSIONS, settings.SESSION_TTL_SECONDS = saved
+            tmp.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
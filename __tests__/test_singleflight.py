@@ -0,0 +1,79 @@
+import sys
+import os
+import asyncio
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from src.agent.singleflight import SingleFlight, question_key
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_share_one_run(self):
+        flights = SingleFlight("test")
+        calls = 0
+
+        async def run():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"answer": 42}
+
+        results = await asyncio.gather(*[flights.do("k", run) for _ in range(20)])
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(r == {"answer": 42} for r in results))
+        self.assertEqual(flights.stats(), {"in_flight": 0, "runs": 1, "coalesced": 19})
+
+    async def test_waiter_cancellation_does_not_cancel_shared_run(self):
+        flights = SingleFlight("test")
+        finished = asyncio.Event()
+
+        async def run():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return "done"
+
+        first = asyncio.create_task(flights.do("k", run))
+        second = asyncio.create_task(flights.do("k", run))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        self.assertEqual(await second, "done")
+        self.assertTrue(finished.is_set())
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_errors_reach_every_waiter_and_key_is_released(self):
+        flights = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider down")
+
+        results = await asyncio.gather(flights.do("k", fail), flights.do("k", fail), return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+        async def ok():
+            return "recovered"
+
+        self.assertEqual(await flights.do("k", ok), "recovered")
+
+    def test_question_key_normalises_whitespace_and_case(self):
+        self.assertEqual(
+            question_key("Total  sales in 2024?", "openai", None, "db", "anonymous"),
+            question_key("total sales in 2024? ", "openai", None, "db", "anonymous"),
+        )
+        self.assertNotEqual(
+            question_key("total sales", "openai", None, "db", "anonymous"),
+            question_key("total sales", "gemini", None, "db", "anonymous"),
+        )
+
+    def test_question_key_is_per_tenant(self):
+        self.assertNotEqual(
+            question_key("total sales", "openai", None, "db", "key:aaa"),
+            question_key("total sales", "openai", None, "db", "key:bbb"),
+        )
+
+if __name__ == "__main__":
+    unittest.main()
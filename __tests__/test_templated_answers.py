@@ -0,0 +1,44 @@
+import sys
+import os
+import unittest
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.agent.templated_answers import column_label, is_trivial_result, render_answer, wants_template
+
+class TestTemplatedAnswers(unittest.TestCase):
+
+    def test_scalar(self):
+        columns, rows = ["SUM(sales_amount)"], [{"SUM(sales_amount)": 1234567.891}]
+        self.assertTrue(is_trivial_result(columns, rows))
+        self.assertEqual(render_answer(columns, rows), "The total sales amount is 1,234,567.89.")
+
+    def test_small_group_by(self):
+        columns = ["region", "total_sales"]
+        rows = [{"region": "East", "total_sales": 10.5}, {"region": "West", "total_sales": 3}]
+        self.assertTrue(is_trivial_result(columns, rows))
+        answer = render_answer(columns, rows, {"region": "Sales Region"})
+        self.assertEqual(answer, "Total sales by sales region:\n- East: 10.50\n- West: 3")
+
+    def test_non_trivial_results(self):
+        wide = [{"a": "x", "b": "y", "c": 1}, {"a": "z", "b": "w", "c": 2}]
+        self.assertFalse(is_trivial_result(["a", "b", "c"], wide))
+        self.assertFalse(is_trivial_result([], []))
+        many = [{"region": str(i), "n": i} for i in range(100)]
+        self.assertFalse(is_trivial_result(["region", "n"], many))
+
+    def test_routing_respects_flags(self):
+        state = {"result_columns": ["n"], "result_rows": [{"n": 1}]}
+        self.assertTrue(wants_template(state))
+        self.assertFalse(wants_template({**state, "full_summary": True}))
+        self.assertFalse(wants_template({**state, "error": "boom"}))
+
+    def test_column_label(self):
+        self.assertEqual(column_label("COUNT(*)"), "number of records")
+        self.assertEqual(column_label("avg(quantity)"), "average quantity")
+        self.assertEqual(column_label("org_name", {"org_name": "Deals with Organization Name and more words"}), "org name")
+
+if __name__ == '__main__':
+    unittest.main()
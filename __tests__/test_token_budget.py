@@ -0,0 +1,107 @@
+import sys
+import os
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.append(os.getcwd())
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.prompts import ChatPromptTemplate
+from src import database
+from src.agent import token_budget
+from src.agent.token_budget import (TokenBudgetExceeded, UsageRecorder, current_budget, fit_prompt, ledger,
+                                    start_request, tenant_for)
+from src.config import settings
+
+PROMPT = ChatPromptTemplate.from_template("Examples: {examples}\nQuestion: {question}\nData: {query_result}")
+
+class TestTokenBudget(unittest.TestCase):
+
+    def setUp(self):
+        ledger._totals.clear()
+        current_budget.set(None)
+        self.patches = [
+            mock.patch.object(token_budget, "count_tokens", lambda text: len(text) // 4 + 1 if text else 0),
+            mock.patch.object(settings, "TOKEN_BUDGET_COMPLETION_RESERVE", 100),
+            mock.patch.object(settings, "TOKEN_BUDGET_PER_REQUEST", 1100),
+            mock.patch.object(settings, "TOKEN_BUDGET_PER_KEY", 0),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_small_prompts_are_untouched(self):
+        start_request(None)
+        values = {"examples": "Q: a\nSQL: b", "question": "total sales?", "query_result": [{"n": 1}]}
+        fitted, tokens = fit_prompt(PROMPT, values, [("examples", "drop"), ("query_result", "truncate")])
+        self.assertEqual(fitted, values)
+        self.assertLess(tokens, 1000)
+
+    def test_large_results_are_shrunk_in_order(self):
+        start_request(None)
+        rows = [{"region": f"region-{i}", "total": i * 1000} for i in range(500)]
+        values = {"examples": "x" * 400, "question": "total sales?", "query_result": rows}
+        fitted, tokens = fit_prompt(PROMPT, values, [("examples", "drop"), ("query_result", "truncate")])
+        self.assertLessEqual(tokens, 1000)
+        self.assertEqual(fitted["examples"], "")
+        self.assertIn("rows omitted to fit the token budget", fitted["query_result"])
+        self.assertTrue(fitted["query_result"].startswith("[{'region': 'region-0'"))
+
+    def test_prompt_that_cannot_shrink_is_refused(self):
+        start_request(None)
+        with self.assertRaises(TokenBudgetExceeded):
+            fit_prompt(PROMPT, {"examples": "", "question": "q" * 8000, "query_result": ""},
+                       [("examples", "drop")])
+
+    def test_compact_schema_is_rendered_again_smaller(self):
+        start_request(None)
+        prompt = ChatPromptTemplate.from_template("Schema: {schema}\nQuestion: {question}")
+        with mock.patch.object(settings, "SCHEMA_PROMPT_FORMAT", "compact"), \
+             mock.patch.object(database, "get_db"), \
+             mock.patch.object(database, "render_schema_text", return_value="t(a:int)") as render:
+            fitted, _ = fit_prompt(prompt, {"schema": "t(a:int{1|2|3}) " * 500, "question": "q"},
+                                   [("schema", database.schema_shrinker("t0"))])
+        self.assertEqual(fitted["schema"], "t(a:int)")
+        self.assertLessEqual(render.call_args.args[1], 1000)
+        with mock.patch.object(settings, "SCHEMA_PROMPT_FORMAT", "ddl"):
+            self.assertEqual(database.schema_shrinker("t0"), "sample_rows")
+
+    def test_usage_without_a_model_name_uses_the_reported_one(self):
+        start_request(None)
+        message = AIMessage(content="ok", usage_metadata={"input_tokens": 7, "output_tokens": 5, "total_tokens": 12},
+                            response_metadata={"model_name": "gpt-4o-mini-2024-07-18"})
+        UsageRecorder(None, 10).on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+        UsageRecorder(None, 10).on_llm_end(LLMResult(generations=[[ChatGeneration(message=AIMessage(content="ok"))]]))
+        by_model = ledger.stats()["anonymous"]["by_model"]
+        self.assertEqual(sorted(by_model), ["gpt-4o-mini-2024-07-18", "unknown"])
+
+    def test_usage_is_charged_to_request_and_key(self):
+        budget = start_request("secret-key")
+        message = AIMessage(content="ok", usage_metadata={"input_tokens": 700, "output_tokens": 50, "total_tokens": 750})
+        UsageRecorder("gpt-4o-mini", 10).on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+        self.assertEqual(budget.used, 750)
+        totals = ledger.stats()[tenant_for("secret-key")]
+        self.assertEqual((totals["prompt_tokens"], totals["completion_tokens"]), (700, 50))
+        self.assertNotIn("secret-key", str(ledger.stats()))
+
+        # Only 350 of the request's 1100 tokens are left, minus the completion reserve
+        with self.assertRaises(TokenBudgetExceeded):
+            fit_prompt(PROMPT, {"examples": "", "question": "q" * 1200, "query_result": ""})
+
+    def test_key_budget_is_enforced_per_window(self):
+        settings.TOKEN_BUDGET_PER_KEY = 500
+        tenant = tenant_for("k")
+        ledger.check(tenant)
+        ledger.record(tenant, "m", 400, 100)
+        with self.assertRaises(TokenBudgetExceeded) as raised:
+            ledger.check(tenant)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+if __name__ == '__main__':
+    unittest.main()
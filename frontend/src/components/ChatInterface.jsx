@@ -55,7 +55,8 @@ function ChatInterface({ llmProvider, llmModel, initialContext }) {
                     entities: data.entity_explanation,
                     sql: data.sql_query,
                     table_layout: data.table_layout,
-                    data: data.data
+                    data: data.data,
+                    totalRows: data.total_rows
                 },
                 error: data.error
             }
@@ -115,7 +116,7 @@ function ChatInterface({ llmProvider, llmModel, initialContext }) {
 
                                             {msg.details.data && msg.details.data.length > 0 && (
                                                 <div style={{ marginBottom: '10px' }}>
-                                                    <strong style={{ color: '#f0abfc' }}>Result Data ({msg.details.data.length} rows):</strong>
+                                                    <strong style={{ color: '#f0abfc' }}>Result Data ({msg.details.totalRows ?? msg.details.data.length} rows{msg.details.totalRows > msg.details.data.length ? `, ${msg.details.data.length} shown` : ''}):</strong>
                                                     <div style={{ maxHeight: '150px', overflow: 'auto', marginTop: '4px', background: '#0f172a', borderRadius: '4px' }}>
                                                         <table style={{ width: '100%', fontSize: '0.8rem', borderCollapse: 'collapse' }}>
                                                             <thead>
@@ -0,0 +1,244 @@
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from src.config import settings
+from typing import Dict, Optional
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Event loop and priority of the API request being served, set by the routers.
+# LLM calls made from the graph's worker threads are admitted on that loop.
+_request_scope: ContextVar[Optional[tuple]] = ContextVar("admission_scope", default=None)
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; mapped to HTTP 429."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Takes one token, going into debt if necessary. Returns how long the
+        caller must wait before its token is actually available.
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+class Lane:
+    """
+    Concurrency limit + token bucket + bounded priority wait queue for one
+    provider or one model. Released slots are handed directly to the best
+    waiter (lowest priority value, then FIFO).
+    """
+
+    def __init__(self, name: str, limit: int, rate: float, burst: float, max_queue: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.bucket = TokenBucket(rate, burst)
+        self.active = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._wait_times = deque(maxlen=500)
+        self._hold_times = deque(maxlen=500)
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def retry_after(self) -> float:
+        avg_hold = sum(self._hold_times) / len(self._hold_times) if self._hold_times else 1.0
+        return avg_hold * (self.queued + 1) / max(1, self.limit)
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected += 1
+        logger.warning(f"[admission:{self.name}] Rejected: {reason}")
+        raise AdmissionRejected(f"{self.name}: {reason}", retry_after)
+
+    async def acquire(self, priority: int, deadline: float):
+        started = time.monotonic()
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+        else:
+            if self.queued >= self.max_queue:
+                self._reject("wait queue is full", self.retry_after())
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+            try:
+                await asyncio.wait({fut}, timeout=max(0.0, deadline - time.monotonic()))
+            except BaseException:
+                # Caller went away while queued: give back a slot we may have been handed
+                if fut.done() and not fut.cancelled():
+                    self.release(0.0)
+                fut.cancel()
+                raise
+            if not fut.done():
+                fut.cancel()
+                self._reject("timed out waiting for a slot", self.retry_after())
+            # Slot was handed over by release(); self.active already counts it
+
+        delay = self.bucket.reserve()
+        if delay > 0:
+            if time.monotonic() + delay > deadline:
+                self.bucket.refund()
+                self.release(0.0)
+                self._reject("rate limit exceeded", delay)
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                self.release(0.0)
+                raise
+
+        self.admitted += 1
+        self._wait_times.append(time.monotonic() - started)
+
+    def release(self, held_for: float):
+        if held_for:
+            self._hold_times.append(held_for)
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self):
+        waits = sorted(self._wait_times)
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queue_depth": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+        }
+
+class AdmissionController:
+    """
+    Admission layer in front of the LLM providers: every provider call must
+    hold a slot on its provider lane and on its (provider, model) lane. Calls
+    are admitted where they are made (see llm_routing.AdmittedChatModel), so
+    answers that never reach an LLM take no slot. When a lane is
+    saturated requests queue (interactive ahead of batch) up to
+    ADMISSION_MAX_QUEUE, and anything that cannot start within
+    ADMISSION_MAX_WAIT_SECONDS is rejected straight away with a Retry-After
+    hint rather than piling onto the provider.
+    """
+
+    def __init__(self):
+        self._lanes: Dict[str, Lane] = {}
+
+    def _lane(self, name: str, limit: int, rate: float) -> Lane:
+        lane = self._lanes.get(name)
+        if lane is None:
+            lane = Lane(name, limit, rate, max(1.0, rate * settings.ADMISSION_BURST_SECONDS), settings.ADMISSION_MAX_QUEUE)
+            self._lanes[name] = lane
+        return lane
+
+    def bind(self, priority: str = "interactive"):
+        """Admits LLM calls of the current request (and the threads it starts) at this priority."""
+        _request_scope.set((asyncio.get_running_loop(), PRIORITIES.get(priority, 0)))
+
+    def _lanes_for(self, provider: str, model: Optional[str]):
+        model_key = f"{provider}/{model or 'default'}"
+        return [
+            self._lane(
+                provider,
+                settings.ADMISSION_PROVIDER_CONCURRENCY.get(provider, settings.ADMISSION_DEFAULT_CONCURRENCY),
+                settings.ADMISSION_PROVIDER_RATE.get(provider, 0.0),
+            ),
+            self._lane(
+                model_key,
+                settings.ADMISSION_MODEL_CONCURRENCY.get(model_key, settings.ADMISSION_DEFAULT_CONCURRENCY),
+                settings.ADMISSION_MODEL_RATE.get(model_key, 0.0),
+            ),
+        ]
+
+    async def _acquire(self, provider: str, model: Optional[str], rank: int):
+        # Runs on the event loop, which owns the lanes
+        lanes = self._lanes_for(provider, model)
+        deadline = time.monotonic() + settings.ADMISSION_MAX_WAIT_SECONDS
+        acquired = []
+        try:
+            # Always provider first, then model, so lanes can't deadlock each other
+            for lane in lanes:
+                await lane.acquire(rank, deadline)
+                acquired.append(lane)
+        except BaseException:
+            for lane in acquired:
+                lane.release(0.0)
+            raise
+        return acquired
+
+    @staticmethod
+    def _release(acquired, held: float):
+        for lane in reversed(acquired):
+            lane.release(held)
+
+    @asynccontextmanager
+    async def admit(self, provider: str, model: Optional[str]):
+        """Holds a slot for one LLM call made on the event loop."""
+        scope = _request_scope.get()
+        if not settings.ADMISSION_ENABLED or scope is None:
+            yield
+            return
+
+        acquired = await self._acquire(provider, model, scope[1])
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(acquired, time.monotonic() - started)
+
+    @contextmanager
+    def admit_blocking(self, provider: str, model: Optional[str]):
+        """
+        Holds a slot for one LLM call made from a worker thread (sync graph
+        nodes, hedged calls): the lanes live on the request's event loop.
+        """
+        scope = _request_scope.get()
+        if not settings.ADMISSION_ENABLED or scope is None:
+            yield
+            return
+
+        loop, rank = scope
+        acquired = asyncio.run_coroutine_threadsafe(self._acquire(provider, model, rank), loop).result()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            loop.call_soon_threadsafe(self._release, acquired, time.monotonic() - started)
+
+    def stats(self):
+        return {name: lane.stats() for name, lane in self._lanes.items()}
+
+admission = AdmissionController()
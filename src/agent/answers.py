@@ -0,0 +1,17 @@
+from src.cache import get_cache
+from src.config import settings
+from typing import Optional
+import uuid
+
+# SQL behind each answer, so /api/v1/export can stream its full result later.
+# Kept in the cache backend: the default memory backend is per process, so
+# with several workers CACHE_BACKEND=sqlite is needed for an answer_id to be
+# exportable from any of them.
+
+def remember_answer(sql: str, table_id: Optional[str] = None) -> str:
+    answer_id = uuid.uuid4().hex
+    get_cache("answers", settings.ANSWER_TTL_SECONDS).set(answer_id, {"sql": sql, "table_id": table_id})
+    return answer_id
+
+def get_answer(answer_id: str) -> Optional[dict]:
+    return get_cache("answers", settings.ANSWER_TTL_SECONDS).get(answer_id)
@@ -0,0 +1,80 @@
+from dataclasses import dataclass, field
+from src.config import settings
+from typing import Dict, Optional
+import re
+
+_AGGREGATIONS = re.compile(
+    r"\b(sum|total|average|avg|mean|count|number of|how many|max(?:imum)?|highest|min(?:imum)?|lowest|"
+    r"median|percent(?:age)?|share|ratio|distinct|unique)\b", re.IGNORECASE)
+_TEMPORAL_COMPARISON = re.compile(
+    r"\b(vs\.?|versus|compared?|comparison|year[- ]over[- ]year|yoy|mom|qoq|growth|change|trend|"
+    r"increase|decrease|decline|difference|between)\b", re.IGNORECASE)
+_MULTI_STEP = re.compile(
+    r"\b(for each|then|among|except|excluding|not in|cumulative|running total|moving average|"
+    r"contribution|rank(?:ed|ing)?|correlat\w*|outlier\w*|above average|below average)\b", re.IGNORECASE)
+_GROUP_BY = re.compile(r"\b(?:by|per|across)\s+(\w+)", re.IGNORECASE)
+_YEAR = re.compile(r"\b(?:19|20)\d\d\b")
+_QUOTED = re.compile(r"'[^']+'|\"[^\"]+\"")
+_PROPER_NOUN = re.compile(r"(?<!^)(?<![.?!]\s)\b[A-Z][a-zA-Z]+\b")
+
+@dataclass
+class Complexity:
+    tier: str
+    score: float
+    features: Dict[str, int] = field(default_factory=dict)
+
+def classify_question(question: str) -> Complexity:
+    """
+    Cheap, local estimate of how hard a question is for SQL generation.
+
+    Counts requested aggregations, temporal comparisons, multi-step markers,
+    grouping dimensions and named entities; anything scoring at or above
+    COMPLEXITY_STRONG_THRESHOLD goes to the strong tier.
+    """
+    features = {
+        "aggregations": len(_AGGREGATIONS.findall(question)),
+        "temporal_comparisons": len(_TEMPORAL_COMPARISON.findall(question)),
+        "multi_step": len(_MULTI_STEP.findall(question)),
+        "group_by": len(_GROUP_BY.findall(question)),
+        "years": len(set(_YEAR.findall(question))),
+        "entities": len(_QUOTED.findall(question)) + len(_PROPER_NOUN.findall(question)),
+        "words": len(question.split()),
+    }
+
+    score = 0.0
+    score += max(0, features["aggregations"] - 1)
+    score += 2 * min(features["temporal_comparisons"], 2)
+    score += 1.5 * features["multi_step"]
+    score += max(0, features["group_by"] - 1)
+    score += 1 if features["years"] >= 2 else 0
+    score += 0.5 * max(0, features["entities"] - 2)
+    score += 1 if features["words"] > 25 else 0
+
+    tier = "strong" if score >= settings.COMPLEXITY_STRONG_THRESHOLD else "fast"
+    return Complexity(tier=tier, score=score, features=features)
+
+def select_model(question: str, provider: str, model_name: Optional[str] = None,
+                 purpose: str = "sql", row_count: Optional[int] = None) -> Optional[str]:
+    """
+    Picks the model for one LLM call. An explicit model_name always wins;
+    otherwise the tier comes from the question's complexity, except that
+    summaries of small results always use the fast tier. Returns None (the
+    provider default) when tiering is off or the provider has no tiers.
+    """
+    if model_name:
+        return model_name
+    if not settings.MODEL_TIERING_ENABLED:
+        return None
+
+    if purpose == "summary" and row_count is not None and row_count <= settings.SUMMARY_FAST_TIER_MAX_ROWS:
+        tier = "fast"
+    else:
+        tier = classify_question(question).tier
+    return settings.MODEL_TIERS.get(provider, {}).get(tier)
+
+def same_tier_model(model: str, provider: str, other: str) -> Optional[str]:
+    """other provider's model in the tier that model belongs to, or None if model is in no tier."""
+    for tier, name in settings.MODEL_TIERS.get(provider, {}).items():
+        if name == model:
+            return settings.MODEL_TIERS.get(other, {}).get(tier)
+    return None
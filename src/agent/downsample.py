@@ -0,0 +1,179 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Downsampling of time-series results for charting. A result qualifies when
+# it has a time column (a date, 'YYYY-MM' text, or year with an optional
+# month / quarter column) and at least one numeric column; any remaining
+# label columns (e.g. region) split it into one series each. Points are
+# picked with LTTB or min/max per bucket on the first numeric column, and
+# whole rows are kept, so every column of a kept point is exact.
+
+_TIME_NAME = re.compile(r"(^|_)(date|day|time|timestamp|week|month|year|period)($|_)", re.IGNORECASE)
+_YEAR_MONTH = re.compile(r"^(\d{4})-(\d{2})$")
+_YEAR = re.compile(r"^\d{4}$")
+# Columns that refine a year column into a finer time axis, and their steps per year
+_SUBPERIODS = {"month": 12, "quarter": 4}
+_SAMPLE = 50
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+def _time_value(value) -> Optional[float]:
+    """A sortable, evenly scaled position in time (days), or None if value is not a time."""
+    if isinstance(value, datetime):
+        return value.toordinal() + (value.hour * 3600 + value.minute * 60 + value.second) / 86400
+    if isinstance(value, date):
+        return float(value.toordinal())
+    if isinstance(value, str):
+        text = value.strip()
+        match = _YEAR_MONTH.match(text)
+        if match:
+            return float(date(int(match.group(1)), int(match.group(2)), 1).toordinal())
+        if _YEAR.match(text):
+            return float(date(int(text), 1, 1).toordinal())
+        try:
+            return _time_value(datetime.fromisoformat(text))
+        except ValueError:
+            return None
+    return None
+
+def _year_value(value, sub=None, steps: int = 1) -> Optional[float]:
+    try:
+        year = float(value)
+    except (TypeError, ValueError):
+        return None
+    if sub is None:
+        return year * 365.25
+    return (year + (float(sub) - 1) / steps) * 365.25
+
+def _sample(rows, column):
+    return [row[column] for row in rows[:_SAMPLE] if row.get(column) is not None]
+
+def find_series(columns: List[str], rows: List[Dict[str, Any]]) -> Optional[Tuple[str, Optional[str], List[str], List[str]]]:
+    """
+    (time column, sub-period column, numeric columns, label columns) of a
+    time-series result, or None if it is not one.
+    """
+    if not rows or not columns:
+        return None
+    samples = {c: _sample(rows, c) for c in columns}
+    time_col = sub_col = None
+    for column in columns:
+        values = samples[column]
+        if not values:
+            continue
+        if column.lower() == "year" and all(_is_number(v) or (isinstance(v, str) and _YEAR.match(v)) for v in values):
+            time_col = column
+            sub_col = next((c for c in columns if c.lower() in _SUBPERIODS and samples[c]
+                            and all(_is_number(v) for v in samples[c])), None)
+            break
+        if all(isinstance(v, (date, datetime)) for v in values) or (
+                _TIME_NAME.search(column) and all(isinstance(v, str) and _time_value(v) is not None for v in values)):
+            time_col = column
+            break
+    if time_col is None:
+        return None
+
+    numeric, labels = [], []
+    for column in columns:
+        if column in (time_col, sub_col):
+            continue
+        if samples[column] and all(_is_number(v) for v in samples[column]):
+            numeric.append(column)
+        else:
+            labels.append(column)
+    if not numeric:
+        return None
+    return time_col, sub_col, numeric, labels
+
+def lttb_indices(x, y, n_out: int):
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point and, per
+    bucket, the point forming the largest triangle with the previously kept
+    point and the next bucket's mean. The triangle areas of a bucket are
+    computed in one numpy expression.
+    """
+    import numpy as np
+
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return selected
+
+def minmax_indices(x, y, n_out: int):
+    """Per bucket the lowest and the highest point, plus the first and last point; fully vectorized."""
+    import numpy as np
+
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    buckets = (np.arange(n) * ((n_out - 2) // 2) // n).astype(np.int64)
+    picked = []
+    for values in (y, -y):
+        order = np.lexsort((values, buckets))
+        _, first = np.unique(buckets[order], return_index=True)
+        picked.append(order[first])
+    return np.unique(np.concatenate([[0, n - 1], *picked]))
+
+METHODS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+def downsample_rows(columns: List[str], rows: List[Dict[str, Any]], max_points: int,
+                    method: str = "lttb") -> Optional[List[Dict[str, Any]]]:
+    """
+    At most about max_points rows of a time-series result, chosen per series
+    with `method` ('lttb' or 'minmax'), in time order. None when the result
+    is already small enough or is not a time series.
+    """
+    if len(rows) <= max_points:
+        return None
+    series = find_series(columns, rows)
+    if series is None:
+        return None
+    time_col, sub_col, numeric, labels = series
+
+    import numpy as np
+
+    if time_col.lower() == "year":
+        steps = _SUBPERIODS[sub_col.lower()] if sub_col else 1
+        xs = [_year_value(row.get(time_col), row.get(sub_col) if sub_col else None, steps) for row in rows]
+    else:
+        xs = [_time_value(row.get(time_col)) for row in rows]
+    if any(v is None for v in xs):
+        return None
+
+    groups: Dict[tuple, List[int]] = {}
+    for i, row in enumerate(rows):
+        groups.setdefault(tuple(row.get(c) for c in labels), []).append(i)
+    per_group = max_points // len(groups)
+    if per_group < 3:
+        return None
+
+    x_all = np.asarray(xs, dtype=np.float64)
+    y_all = np.nan_to_num(np.asarray([row.get(numeric[0]) for row in rows], dtype=np.float64))
+    pick = METHODS[method]
+    kept = []
+    for members in groups.values():
+        index = np.asarray(members, dtype=np.int64)
+        index = index[np.argsort(x_all[index], kind="stable")]
+        kept.append(index[pick(x_all[index], y_all[index], per_group)])
+    kept = np.concatenate(kept)
+    kept = kept[np.lexsort((kept, x_all[kept]))]
+    logger.info(f"Downsampled {len(rows)} rows to {len(kept)} ({method}, {len(groups)} series)")
+    return [rows[i] for i in kept.tolist()]
@@ -0,0 +1,206 @@
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from src.config import settings
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker is assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_DIMENSIONS = 1 << 18
+_MAX_CANDIDATES = 256
+_WORD = re.compile(r"[a-z0-9_]+")
+
+def _bucket(feature: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little") % _DIMENSIONS
+
+def vectorize(text: str) -> Dict[int, float]:
+    """Hashing vectorizer over words and word bigrams, L2-normalised."""
+    words = _WORD.findall(text.lower())
+    counts = Counter(_bucket(w) for w in words)
+    counts.update(_bucket(f"{a} {b}") for a, b in zip(words, words[1:]))
+    norm = math.sqrt(sum(c * c for c in counts.values())) or 1.0
+    return {k: c / norm for k, c in counts.items()}
+
+def _example_key(question: str, table: str) -> str:
+    return f"{table}\x00{' '.join(question.lower().split())}"
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock across processes (uvicorn workers) sharing the file; held until the block exits."""
+    with open(f"{path}.lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+class ExampleStore:
+    """
+    Successful (question, SQL, table) triples for few-shot prompting.
+
+    Persisted as an append-only JSONL file; later lines for the same
+    question/table supersede earlier ones. Lookups go through an inverted
+    index from hashed feature to example, so a top-k query only scores the
+    examples sharing the question's rarer words. Past max_entries
+    the oldest examples are evicted; once superseded and evicted lines
+    dominate the file it is compacted. Several workers may share the file:
+    appends and compaction hold a file lock, and compaction rebuilds from
+    the file so other workers' examples are kept.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._examples: "OrderedDict[str, dict]" = OrderedDict()
+        self._vectors: Dict[str, Dict[int, float]] = {}
+        self._postings: Dict[int, set] = defaultdict(set)
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        self._read()
+        self._evict()
+        logger.info(f"Loaded {len(self._examples)} SQL examples from {self.path}")
+
+    def _read(self):
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._index(entry)
+                    self._lines += 1
+                except (ValueError, KeyError):
+                    continue  # a torn last line from a crash mid-append
+
+    def _index(self, entry: dict):
+        key = _example_key(entry["question"], entry["table"])
+        self._unindex(key)
+        vector = vectorize(entry["question"])
+        self._examples[key] = entry
+        self._vectors[key] = vector
+        for feature in vector:
+            self._postings[feature].add(key)
+
+    def _unindex(self, key: str):
+        if key not in self._examples:
+            return
+        del self._examples[key]
+        for feature in self._vectors.pop(key):
+            postings = self._postings[feature]
+            postings.discard(key)
+            if not postings:
+                del self._postings[feature]
+
+    def _evict(self) -> bool:
+        evicted = False
+        while len(self._examples) > self.max_entries:
+            self._unindex(next(iter(self._examples)))
+            evicted = True
+        return evicted
+
+    def _compact(self):
+        # Call with the file lock held. Rebuilt from the file rather than this
+        # process's view, which misses what other workers appended since
+        self._examples.clear()
+        self._vectors.clear()
+        self._postings.clear()
+        self._lines = 0
+        self._read()
+        self._evict()
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            for entry in self._examples.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, self.path)
+        self._lines = len(self._examples)
+
+    def add(self, question: str, sql: str, table: str):
+        entry = {"question": question.strip(), "sql": sql.strip(), "table": table, "ts": time.time()}
+        with self._lock:
+            existing = self._examples.get(_example_key(question, table))
+            if existing and existing["sql"] == entry["sql"]:
+                return
+            self._index(entry)
+            self._evict()
+            with _file_lock(self.path):
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+                self._lines += 1
+                # Superseded and evicted lines pile up in the file; rewrite it once they dominate
+                if self._lines > 2 * max(len(self._examples), 1):
+                    self._compact()
+
+    def search(self, question: str, table: str, k: int = 3, min_similarity: float = 0.0) -> List[Tuple[float, dict]]:
+        query = vectorize(question)
+        own_key = _example_key(question, table)
+        with self._lock:
+            # Candidates come from the rarest features first; words shared by
+            # most examples ("total", "sales") only count once scoring starts
+            postings = sorted((self._postings[f] for f in query if f in self._postings), key=len)
+            candidates = set()
+            for keys in postings:
+                if candidates and len(keys) > _MAX_CANDIDATES:
+                    break
+                candidates.update(keys)
+
+            ranked = []
+            for key in candidates:
+                example = self._examples[key]
+                if key == own_key or example["table"] != table:
+                    continue
+                vector = self._vectors[key]
+                score = sum(weight * vector.get(feature, 0.0) for feature, weight in query.items())
+                if score >= min_similarity:
+                    ranked.append((score, example))
+        ranked.sort(key=lambda item: -item[0])
+        return ranked[:k]
+
+    def __len__(self):
+        return len(self._examples)
+
+@lru_cache(maxsize=1)
+def get_example_store() -> Optional[ExampleStore]:
+    if not settings.EXAMPLE_STORE_ENABLED:
+        return None
+    return ExampleStore(settings.EXAMPLE_STORE_PATH, settings.EXAMPLE_STORE_MAX_ENTRIES)
+
+def record_example(question: str, sql: str, table: str):
+    """Remembers SQL that executed successfully; never fails the request."""
+    try:
+        store = get_example_store()
+        if store is not None:
+            store.add(question, sql, table)
+    except Exception as e:
+        logger.warning(f"Could not record SQL example: {e}")
+
+def format_examples(question: str, table: str) -> str:
+    """Prompt block with the closest past question/SQL pairs, or '' when there are none."""
+    try:
+        store = get_example_store()
+        if store is None:
+            return ""
+        examples = store.search(question, table, settings.EXAMPLE_TOP_K, settings.EXAMPLE_MIN_SIMILARITY)
+    except Exception as e:
+        logger.warning(f"SQL example lookup failed: {e}")
+        return ""
+    if not examples:
+        return ""
+    lines = ["Examples of similar questions answered correctly before:"]
+    for _, example in examples:
+        lines.append(f"Question: {example['question']}\nSQL: {example['sql']}")
+    return "\n".join(lines)
@@ -1,20 +1,44 @@
 from langgraph.graph import StateGraph, END
 from src.agent.state import AgentState
-from src.agent.nodes import write_query, execute_query, generate_answer
+from src.agent.nodes import (session_refine, rule_query, write_query, execute_query, generate_answer,
+                             template_answer, remember_turn)
+from src.agent.templated_answers import wants_template
 
 # Define the graph
 workflow = StateGraph(AgentState)
 
 # Add nodes
+workflow.add_node("session_refine", session_refine)
+workflow.add_node("rule_query", rule_query)
 workflow.add_node("write_query", write_query)
 workflow.add_node("execute_query", execute_query)
 workflow.add_node("generate_answer", generate_answer)
+workflow.add_node("template_answer", template_answer)
+workflow.add_node("remember_turn", remember_turn)
+
+def route_answer(state: AgentState):
+    # Trivial results (single value, small group-by) skip the summarization LLM call
+    return "template_answer" if wants_template(state) else "generate_answer"
 
 # Add edges
-workflow.set_entry_point("write_query")
+# Session follow-ups answerable from the previous result skip SQL generation and the database
+workflow.set_entry_point("session_refine")
+workflow.add_conditional_edges(
+    "session_refine",
+    lambda state: route_answer(state) if state.get("generation_path") == "session" else "rule_query",
+    ["template_answer", "generate_answer", "rule_query"],
+)
+# Questions the rule parser understands skip SQL generation by the LLM
+workflow.add_conditional_edges(
+    "rule_query",
+    lambda state: "execute_query" if state.get("generation_path") == "rules" else "write_query",
+    ["execute_query", "write_query"],
+)
 workflow.add_edge("write_query", "execute_query")
-workflow.add_edge("execute_query", "generate_answer")
-workflow.add_edge("generate_answer", END)
+workflow.add_conditional_edges("execute_query", route_answer, ["template_answer", "generate_answer"])
+workflow.add_edge("generate_answer", "remember_turn")
+workflow.add_edge("template_answer", "remember_turn")
+workflow.add_edge("remember_turn", END)
 
 # Compile
 graph = workflow.compile()
@@ -0,0 +1,62 @@
+from contextvars import ContextVar
+from functools import lru_cache
+from langchain_core.caches import BaseCache
+from src.cache import make_key
+from src.cache.base import NamespacedCache
+from src.cache.sqlite import SQLiteCache
+from src.config import settings
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Persistent cache of LLM answers, attached to every provider model from
+# get_llm(). LangChain keys each call by the rendered prompt and the model's
+# llm_string (provider class, model, temperature, bound tools / structured
+# output schema), so a key only ever matches a byte-identical request. All
+# models are created with temperature=0, so a cached answer is as good as a
+# fresh one. Stored in its own SQLite file (LRU by size, TTL per entry).
+
+# Per-request policy, set by the routers from the X-LLM-Cache header:
+# 'use' (default), 'refresh' (skip lookups, store fresh answers), 'bypass'
+llm_cache_policy: ContextVar[str] = ContextVar("llm_cache_policy", default="use")
+
+def set_cache_policy(policy: Optional[str]):
+    llm_cache_policy.set(policy or "use")
+
+class LLMResponseCache(BaseCache):
+    def __init__(self, backend: SQLiteCache, ttl: Optional[float] = None):
+        self.backend = backend
+        self.entries = NamespacedCache(backend, "llm", ttl)
+
+    def lookup(self, prompt: str, llm_string: str):
+        if llm_cache_policy.get() != "use":
+            return None
+        generations = self.entries.get(make_key(llm_string, prompt))
+        if generations is None:
+            return None
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                # Lets the token accounting tell a free cache hit from a paid call
+                message.response_metadata = {**message.response_metadata, "llm_cache": "hit"}
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val):
+        if llm_cache_policy.get() == "bypass":
+            return
+        self.entries.set(make_key(llm_string, prompt), list(return_val))
+
+    def clear(self, **kwargs):
+        self.backend.clear()
+
+    def stats(self):
+        return self.backend.stats()
+
+@lru_cache(maxsize=1)
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    logger.info(f"LLM response cache at {settings.LLM_CACHE_PATH}")
+    return LLMResponseCache(SQLiteCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_BYTES),
+                            settings.LLM_CACHE_TTL or None)
@@ -1,40 +1,99 @@
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
+from functools import lru_cache
 from src.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Provider SDKs (langchain_openai, langchain_google_genai) are imported on
+# first use only: together they account for most of the app's import time.
+
+DEFAULT_MODELS = {"openai": "gpt-3.5-turbo", "gemini": "gemini-2.5-flash", "replay": "cassette"}
+
 def get_llm(provider: str, model_name: str = None):
     """
     Returns the ChatModel based on the provider string.
-    Supported: 'openai', 'gemini'
+    Supported: 'openai', 'gemini', 'replay' (recorded answers, see
+    src.agent.replay; LLM_CASSETTE_MODE='replay' forces it for every request)
+    Instances are cached per (provider, model), so the HTTP clients are
+    created once per process.
+    Provider models are wrapped so every call takes an admission slot (see
+    llm_routing.AdmittedChatModel). With LLM_ROUTING='hedged' slow calls
+    are also hedged to the other provider (see llm_routing.HedgedChatModel).
     """
-    if provider.lower() == "gemini":
+    provider, model = resolve_model(provider, model_name)
+    if provider == "replay":
+        # Recorded answers never reach a provider
+        return _create_llm(provider, model)
+
+    from src.agent.llm_routing import AdmittedChatModel
+    llm = AdmittedChatModel(provider, model, _create_llm(provider, model))
+
+    if settings.LLM_ROUTING == "hedged":
+        from src.agent.complexity import same_tier_model
+        from src.agent.llm_routing import HedgedChatModel, alternate_for
+        alternate = alternate_for(provider)
+        if alternate:
+            # Hedge onto a model of the same tier, not a cheaper or stronger one
+            alt_model = same_tier_model(model, provider, alternate) or DEFAULT_MODELS[alternate]
+            return HedgedChatModel([
+                (provider, model, llm),
+                (alternate, alt_model, AdmittedChatModel(alternate, alt_model, _create_llm(alternate, alt_model))),
+            ])
+    return llm
+
+def resolve_model(provider: str, model_name: str = None):
+    """Maps a requested provider/model to the (provider, model) actually used."""
+    if provider.lower() == "replay" or settings.LLM_CASSETTE_MODE == "replay":
+        model = model_name or DEFAULT_MODELS["replay"]
+        logger.info(f"Using recorded LLM responses from {settings.LLM_CASSETTE_PATH}")
+        return "replay", model
+    elif provider.lower() == "gemini":
         if not settings.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY is not set in configuration.")
-        
-        model = model_name or "gemini-2.5-flash"
+
+        model = model_name or DEFAULT_MODELS["gemini"]
         logger.info(f"Using Google Gemini LLM: {model}")
-        return ChatGoogleGenerativeAI(
-            model=model,
-            google_api_key=settings.GOOGLE_API_KEY,
-            temperature=0,
-            convert_system_message_to_human=True # Often needed for some Gemini versions
-        )
+        return "gemini", model
     elif provider.lower() == "openai":
-        model = model_name or "gpt-3.5-turbo"
+        model = model_name or DEFAULT_MODELS["openai"]
         logger.info(f"Using OpenAI LLM: {model}")
-        return ChatOpenAI(
-            api_key=settings.OPENAI_API_KEY, 
-            model=model,
-            temperature=0
-        )
+        return "openai", model
     else:
         # Default fallback or error
         logger.warning(f"Unknown provider '{provider}', falling back to OpenAI.")
-        return ChatOpenAI(
-            api_key=settings.OPENAI_API_KEY, 
-            model="gpt-3.5-turbo",
-            temperature=0
+        return "openai", DEFAULT_MODELS["openai"]
+
+@lru_cache(maxsize=32)
+def _create_llm(provider: str, model: str):
+    if provider == "replay":
+        from src.agent.replay import ReplayChatModel
+        return ReplayChatModel(model_name=model)
+
+    if settings.LLM_CASSETTE_MODE == "record":
+        # Uncached, so every answer actually reaches the cassette
+        from src.agent.replay import RecordingChatModel
+        return RecordingChatModel(inner=_create_provider_llm(provider, model, None), model_name=model)
+
+    from src.agent.llm_cache import get_llm_cache
+    return _create_provider_llm(provider, model, get_llm_cache())
+
+def _create_provider_llm(provider: str, model: str, cache):
+    if provider == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=settings.GOOGLE_API_KEY,
+            temperature=0,
+            convert_system_message_to_human=True, # Often needed for some Gemini versions
+            max_retries=0,  # retried by src.agent.resilience, within the request deadline
+            cache=cache
         )
+
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        model=model,
+        temperature=0,
+        max_retries=0,  # retried by src.agent.resilience, within the request deadline
+        cache=cache
+    )
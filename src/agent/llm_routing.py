@@ -0,0 +1,210 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from langchain_core.runnables import Runnable
+from src.config import settings
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Hedged calls from sync graph nodes run on this pool. A losing thread
+# cannot be interrupted; its result is simply discarded (and its latency
+# still recorded). Async callers get real cancellation via ainvoke().
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+class LatencyProfile:
+    """Rolling latency / error window for one (provider, model)."""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)  # (latency_seconds, ok)
+        self.skip_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.samples.append((latency, ok))
+            if len(self.samples) >= settings.LLM_PROFILE_MIN_SAMPLES and self.error_rate() >= settings.LLM_ERROR_RATE_THRESHOLD:
+                self.skip_until = time.monotonic() + settings.LLM_SKIP_SECONDS
+                self.samples.clear()  # start a fresh window once the skip expires
+
+    def p95(self) -> Optional[float]:
+        latencies = sorted(lat for lat, ok in self.samples if ok)
+        if len(latencies) < settings.LLM_PROFILE_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.skip_until
+
+    def stats(self):
+        p95 = self.p95()
+        return {
+            "samples": len(self.samples),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "skipped_for_s": round(max(0.0, self.skip_until - time.monotonic()), 1),
+        }
+
+_profiles: Dict[Tuple[str, str], LatencyProfile] = {}
+_profiles_lock = threading.Lock()
+
+def get_profile(provider: str, model: str) -> LatencyProfile:
+    key = (provider, model)
+    with _profiles_lock:
+        if key not in _profiles:
+            _profiles[key] = LatencyProfile(settings.LLM_PROFILE_WINDOW)
+        return _profiles[key]
+
+def routing_stats():
+    with _profiles_lock:
+        profiles = list(_profiles.items())
+    return {f"{p}/{m}": profile.stats() for (p, m), profile in profiles}
+
+class AdmittedChatModel(Runnable):
+    """
+    Runnable over one provider model that holds an admission slot on its
+    provider and model lanes for the duration of each call (see
+    src.agent.admission). Hedged members are wrapped one by one, so a
+    duplicate request is admitted like any other.
+    """
+
+    def __init__(self, provider: str, model: str, runnable):
+        self.provider = provider
+        self.model = model
+        self.runnable = runnable
+
+    def with_structured_output(self, schema, **kwargs):
+        return AdmittedChatModel(self.provider, self.model, self.runnable.with_structured_output(schema, **kwargs))
+
+    def invoke(self, input, config=None, **kwargs):
+        from src.agent.admission import admission
+        with admission.admit_blocking(self.provider, self.model):
+            return self.runnable.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        from src.agent.admission import admission
+        async with admission.admit(self.provider, self.model):
+            return await self.runnable.ainvoke(input, config, **kwargs)
+
+class HedgedChatModel(Runnable):
+    """
+    Runnable over a primary and an alternate (provider, model, runnable).
+
+    The primary is called first. If it has not answered by its own rolling
+    p95 (or LLM_HEDGE_DEFAULT_DELAY_SECONDS until enough samples exist), a
+    duplicate request goes to the alternate and whichever answers first
+    wins. Members whose error rate crossed LLM_ERROR_RATE_THRESHOLD are
+    skipped for LLM_SKIP_SECONDS.
+    """
+
+    def __init__(self, members: List[Tuple[str, str, Any]]):
+        self.members = members
+
+    def with_structured_output(self, schema, **kwargs):
+        return HedgedChatModel([
+            (provider, model, runnable.with_structured_output(schema, **kwargs))
+            for provider, model, runnable in self.members
+        ])
+
+    def _ordered(self):
+        usable = [m for m in self.members if get_profile(m[0], m[1]).available()]
+        # If everything is being skipped, try anyway rather than fail outright
+        return usable or list(self.members)
+
+    def _hedge_delay(self, provider: str, model: str) -> float:
+        p95 = get_profile(provider, model).p95()
+        if p95 is None:
+            return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, p95)
+
+    @staticmethod
+    def _timed_call(provider, model, runnable, input, config, **kwargs):
+        started = time.monotonic()
+        try:
+            result = runnable.invoke(input, config, **kwargs)
+        except Exception:
+            get_profile(provider, model).record(time.monotonic() - started, False)
+            raise
+        get_profile(provider, model).record(time.monotonic() - started, True)
+        return result
+
+    def _submit(self, member, input, config, **kwargs):
+        # Copy the context so per-request contextvars reach the worker thread
+        ctx = contextvars.copy_context()
+        return _executor.submit(ctx.run, self._timed_call, *member, input, config, **kwargs)
+
+    def invoke(self, input, config=None, **kwargs):
+        members = self._ordered()[:2]
+        if len(members) == 1:
+            return self._timed_call(*members[0], input, config, **kwargs)
+
+        futures = [self._submit(members[0], input, config, **kwargs)]
+        done, _ = wait(futures, timeout=self._hedge_delay(members[0][0], members[0][1]))
+        if not done or futures[0].exception() is not None:
+            logger.info(f"Hedging {members[0][0]}/{members[0][1]} with {members[1][0]}/{members[1][1]}")
+            futures.append(self._submit(members[1], input, config, **kwargs))
+
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    return fut.result()
+                last_error = fut.exception()
+        raise last_error
+
+    async def _atimed_call(self, provider, model, runnable, input, config, **kwargs):
+        started = time.monotonic()
+        try:
+            result = await runnable.ainvoke(input, config, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            get_profile(provider, model).record(time.monotonic() - started, False)
+            raise
+        get_profile(provider, model).record(time.monotonic() - started, True)
+        return result
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        members = self._ordered()[:2]
+        tasks = [asyncio.ensure_future(self._atimed_call(*members[0], input, config, **kwargs))]
+        try:
+            if len(members) > 1:
+                done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(members[0][0], members[0][1]))
+                if not done or tasks[0].exception() is not None:
+                    logger.info(f"Hedging {members[0][0]}/{members[0][1]} with {members[1][0]}/{members[1][1]}")
+                    tasks.append(asyncio.ensure_future(self._atimed_call(*members[1], input, config, **kwargs)))
+
+            pending = set(tasks)
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            # The loser is cancelled outright, freeing its HTTP connection
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+def alternate_for(provider: str) -> Optional[str]:
+    if provider == "openai" and settings.GOOGLE_API_KEY:
+        return "gemini"
+    if provider == "gemini" and settings.OPENAI_API_KEY:
+        return "openai"
+    return None
@@ -1,42 +1,124 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from src.agent.state import AgentState
-from src.database import get_db
+from src.database import datasource_id, get_db, get_schema_info, schema_shrinker
+from src.database.registry import get_table_prompt
+from src.database.execution import execute_sql, execute_sql_with_plan
+from src.database.replicas import is_read_only
+from langchain_community.utilities.sql_database import truncate_word
 from src.agent.llm_factory import get_llm
+from src.agent.complexity import select_model
+from src.agent.templated_answers import column_descriptions, render_answer
+from src.agent.rule_parser import compile_question
+from src.agent.examples import format_examples, record_example
+from src.agent.sessions import conversation_context, make_turn, refine_previous, run_on_previous
+from src.agent.admission import AdmissionRejected
+from src.agent.resilience import call_with_retry
+from src.agent.token_budget import budgeted
+from src.cache import get_cache, make_key
+from src.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+SALES_INSTRUCTIONS = """Given the following database schema for a SALES database, write a SQL query to answer the user's question.
+    
+    The table name is 'sales_data'.
+    
+    - Always use 'sales_amount' for revenue calculations.
+    - Always use 'sales_data' as the table name."""
+
+def table_instructions(table_id, db) -> str:
+    """Prompt instructions for an onboarded table: its tables plus the prompt saved for it."""
+    if not table_id:
+        return SALES_INSTRUCTIONS
+    instructions = f"""Given the following database schema, write a SQL query to answer the user's question.
+    
+    Only use these tables: {', '.join(db.get_usable_table_names())}."""
+    saved = get_table_prompt(table_id)
+    if saved:
+        instructions += f"\n    \n    {saved}"
+    return instructions
+
+def session_refine(state: AgentState) -> AgentState:
+    """
+    Answers follow-ups that only filter, sort or cut down the previous
+    result of the session from that result, without the source database.
+    """
+    history = state.get("history") or []
+    if not history:
+        return {}
+    refinement = refine_previous(state["question"], history[-1])
+    if refinement is None:
+        return {}
+    sql, description = refinement
+    try:
+        keys, rows = run_on_previous(history[-1], sql)
+    except Exception as e:
+        logger.warning(f"Local refinement failed, querying the source instead: {e}")
+        return {}
+    logger.info(f"{description} ({sql})")
+    result = str([tuple(row.values()) for row in rows]) if rows else ""
+    return {"sql_query": sql, "query_result": result, "result_columns": keys, "result_rows": rows,
+            "row_count": len(rows), "generation_path": "session", "error": None}
+
+def rule_query(state: AgentState) -> AgentState:
+    """
+    Compiles common sales questions to SQL locally; the graph only goes on
+    to write_query (the LLM) when this finds no confident match.
+    """
+    match = compile_question(state["question"], get_db(state.get("table_id")))
+    if match is None:
+        return {}
+    logger.info(f"Rule-based query (confidence {match.confidence:.2f}): {match.sql}")
+    return {"sql_query": match.sql, "generation_path": "rules", "error": None}
+
 def write_query(state: AgentState) -> AgentState:
     """
     Generates an SQL query based on the user question and database schema.
     """
     logger.info("Generating SQL query...")
-    # Dynamically get DB (SQLite or Postgres) based on config
-    db = get_db()
-    schema = db.get_table_info()
+    # Dynamically get DB (SQLite or Postgres) based on config, or the onboarded table's datasource
+    table_id = state.get("table_id")
+    db = get_db(table_id)
+    schema = get_schema_info(table_id)
+    instructions = table_instructions(table_id, db)
     
-    # 1. Get LLM based on provider in state (default to openai if missing)
+    # 1. Get LLM based on provider in state (default to openai if missing);
+    #    the model tier follows the question's complexity unless one was requested
     provider = state.get("model_provider", "openai")
-    model_name = state.get("model_name")
+    model_name = select_model(state["question"], provider, state.get("model_name"))
+
+    # Identical question + model + schema -> reuse the SQL generated last time
+    sql_cache = get_cache("sql", settings.CACHE_SQL_TTL)
+    # Follow-ups in a session ("break that down by quarter") depend on the earlier turns
+    conversation = conversation_context(state.get("history"))
+    cache_key = make_key("write_query", state["question"].strip().lower(), provider, model_name,
+                         datasource_id(table_id), instructions, schema, conversation)
+    cached_query = sql_cache.get(cache_key)
+    if cached_query:
+        logger.info(f"Using cached query ({provider}): {cached_query}")
+        return {"sql_query": cached_query, "selected_model": model_name, "generation_path": "cache", "error": None}
+
     try:
         llm = get_llm(provider, model_name)
     except ValueError as e:
         return {"error": str(e)}
 
+    # Nearest successful question/SQL pairs for this database, as few-shot examples
+    examples = format_examples(state["question"], datasource_id(table_id))
+
     template = """You are an expert SQL data analyst.
-    Given the following database schema for a SALES database, write a SQL query to answer the user's question.
-    
-    The table name is 'sales_data'.
-    Key columns: org_name, product_name, sales_amount, quantity, sale_date, year, quarter, month, region.
-    
-    - Always use 'sales_amount' for revenue calculations.
-    - Always use 'sales_data' as the table name.
+    {instructions}
     - Return ONLY the SQL query. No markdown, no explanation.
     
-    Schema:
+    Schema (table(column:type{{allowed values}} "description", ...)):
     {schema}
     
+    {examples}
+    
+    {conversation}
+    
     Question: {question}
     
     SQL Query:"""
@@ -45,10 +127,18 @@ def write_query(state: AgentState) -> AgentState:
     chain = prompt | llm | StrOutputParser()
     
     try:
-        query = chain.invoke({"schema": schema, "question": state["question"]})
+        # Over budget: lose the examples and conversation before the schema's sample rows
+        values, config = budgeted(prompt, {
+            "instructions": instructions, "schema": schema, "examples": examples,
+            "conversation": conversation, "question": state["question"]},
+            model_name, shrink=[("examples", "drop"), ("conversation", "drop"), ("schema", schema_shrinker(table_id))])
+        query = call_with_retry(f"llm:{provider}", chain.invoke, values, config)
         cleaned_query = query.strip().replace("```sql", "").replace("```", "")
         logger.info(f"Generated Query ({provider}): {cleaned_query}")
-        return {"sql_query": cleaned_query, "error": None}
+        sql_cache.set(cache_key, cleaned_query)
+        return {"sql_query": cleaned_query, "selected_model": model_name, "generation_path": "llm", "error": None}
+    except AdmissionRejected:
+        raise  # answered as 429 by the router
     except Exception as e:
         return {"error": str(e)}
 
@@ -63,13 +153,33 @@ def execute_query(state: AgentState) -> AgentState:
     if not state.get("sql_query"):
         return {"error": "No SQL query generated."}
     
-    db = get_db()
+    db = get_db(state.get("table_id"))
     query = state["sql_query"]
     
     try:
-        result = db.run(query)
+        # Only read-only statements are safe to run twice
+        datasource = datasource_id(state.get("table_id"))
+        plan = None
+        if state.get("explain"):
+            keys, rows, plan = call_with_retry(f"db:{datasource}", execute_sql_with_plan, db, query,
+                                               datasource=datasource, idempotent=is_read_only(query))
+        else:
+            keys, rows = call_with_retry(f"db:{datasource}", execute_sql, db, query, datasource=datasource,
+                                         idempotent=is_read_only(query))
+        # Same rendering as SQLDatabase.run(): tuples of truncated values
+        result = str([
+            tuple(truncate_word(v, length=db._max_string_length) for v in row.values())
+            for row in rows
+        ]) if rows else ""
         logger.info(f"Query Result: {result}")
-        return {"query_result": str(result), "error": None}
+        # A follow-up's SQL depends on the conversation, so it is no standalone example
+        if state.get("generation_path") == "llm" and not state.get("history"):
+            record_example(state["question"], query, datasource_id(state.get("table_id")))
+        output = {"query_result": str(result), "result_columns": list(keys), "result_rows": rows,
+                  "row_count": len(rows), "error": None}
+        if plan is not None:
+            output["query_plan"] = plan
+        return output
     except Exception as e:
         return {"error": f"SQL Execution Failed: {str(e)}"}
 
@@ -82,9 +192,10 @@ def generate_answer(state: AgentState) -> AgentState:
     if state.get("error"):
         return {"answer": f"I enountered an error: {state['error']}"}
         
-    # Get LLM based on provider
+    # Get LLM based on provider; small results are always summarised by the fast tier
     provider = state.get("model_provider", "openai")
-    model_name = state.get("model_name")
+    model_name = select_model(state["question"], provider, state.get("model_name"),
+                              purpose="summary", row_count=state.get("row_count"))
     try:
         llm = get_llm(provider, model_name)
     except ValueError as e:
@@ -103,11 +214,40 @@ def generate_answer(state: AgentState) -> AgentState:
     chain = prompt | llm | StrOutputParser()
     
     try:
-        answer = chain.invoke({
+        values, config = budgeted(prompt, {
             "question": state["question"], 
             "sql_query": state["sql_query"],
             "query_result": state["query_result"] or "No results found."
-        })
+        }, model_name, shrink=[("query_result", "truncate")])
+        answer = call_with_retry(f"llm:{provider}", chain.invoke, values, config)
         return {"answer": answer}
+    except AdmissionRejected:
+        raise  # answered as 429 by the router
     except Exception as e:
         return {"answer": "Failed to generate answer.", "error": str(e)}
+
+def template_answer(state: AgentState) -> AgentState:
+    """
+    Phrases scalar and small group-by results locally, skipping the LLM.
+    """
+    logger.info("Answering from template...")
+    try:
+        descriptions = column_descriptions(get_db(state.get("table_id")))
+    except Exception as e:
+        logger.warning(f"Column descriptions unavailable: {e}")
+        descriptions = {}
+    return {"answer": render_answer(state["result_columns"], state["result_rows"], descriptions)}
+
+def remember_turn(state: AgentState) -> AgentState:
+    """
+    Appends this turn to the session history (checkpointed when the graph
+    runs with a session).
+    """
+    if state.get("error"):
+        return {}
+    history = state.get("history") or []
+    sql = state.get("sql_query")
+    if state.get("generation_path") == "session" and history:
+        sql = history[-1]["sql"]  # keep the source SQL; the local one only means something here
+    return {"history": [make_turn(state["question"], sql, state.get("result_columns"), state.get("result_rows"))]}
+
@@ -1,7 +1,20 @@
 from langgraph.graph import StateGraph, END
 from src.agent.qna_state import QnAState
-from src.database import get_db
+from src.database import datasource_id, get_db, get_schema_info, schema_shrinker
+from src.database.registry import get_table_prompt
+from src.database.execution import execute_sql, execute_sql_with_plan
+from src.database.replicas import is_read_only
 from src.agent.llm_factory import get_llm
+from src.agent.complexity import select_model
+from src.agent.rule_parser import compile_question
+from src.agent.examples import format_examples, record_example
+from src.agent.admission import AdmissionRejected
+from src.agent.resilience import call_with_retry
+from src.agent.token_budget import budgeted
+from src.agent.sessions import PREVIOUS_TABLE, conversation_context, make_turn, refine_previous, run_on_previous
+from src.agent.templated_answers import column_descriptions, render_answer, wants_template
+from src.cache import get_cache, make_key
+from src.config import settings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
@@ -16,15 +29,71 @@ class StructuredQnAPlan(BaseModel):
 class SummaryOutput(BaseModel):
     summary: str = Field(..., description="The natural language answer based on the data.")
 
+def session_refine_node(state: QnAState):
+    """
+    Answers follow-ups that only filter, sort or cut down the previous
+    result of the session from that result, without the source database.
+    """
+    history = state.get("history") or []
+    if not history:
+        return {}
+    refinement = refine_previous(state["question"], history[-1])
+    if refinement is None:
+        return {}
+    sql, description = refinement
+    try:
+        keys, rows = run_on_previous(history[-1], sql)
+    except Exception:
+        return {}
+    return {
+        "business_explanation": f"Follows up on \"{history[-1]['question']}\".",
+        "entity_explanation": description,
+        "sql_query": sql,
+        "table_layout": f"{PREVIOUS_TABLE}({', '.join(keys)})",
+        "query_result": rows,
+        "result_columns": keys,
+        "generation_path": "session",
+        "error": None,
+    }
+
+def rule_plan_node(state: QnAState):
+    """
+    Builds the plan locally for questions the rule parser understands;
+    otherwise the graph goes on to the LLM planner.
+    """
+    match = compile_question(state["question"], get_db(state.get("table_id")))
+    if match is None:
+        return {}
+    return {
+        "business_explanation": f"Answers \"{state['question']}\" directly from the sales data.",
+        "entity_explanation": match.describe(),
+        "sql_query": match.sql,
+        "table_layout": f"sales_data({', '.join(dict.fromkeys(match.group_by + list(match.filters) + [match.distinct or match.measure or 'id']))})",
+        "generation_path": "rules",
+        "error": None,
+    }
+
 def generate_plan_node(state: QnAState):
     """
     Generates usage explanation, SQL, and schema info.
     """
-    db = get_db()
-    schema = db.get_table_info()
+    table_id = state.get("table_id")
+    schema = get_schema_info(table_id)
+    # Instructions saved for an onboarded table through /tables/{table_id}/prompt
+    instructions = get_table_prompt(table_id) if table_id else ""
     
     provider = state.get("model_provider", "openai")
-    model_name = state.get("model_name")
+    model_name = select_model(state["question"], provider, state.get("model_name"))
+
+    # Identical question + model + schema -> reuse the previous plan
+    plan_cache = get_cache("sql", settings.CACHE_SQL_TTL)
+    # Follow-ups in a session depend on the earlier turns
+    conversation = conversation_context(state.get("history"))
+    cache_key = make_key("qna_plan", state["question"].strip().lower(), provider, model_name,
+                         datasource_id(table_id), instructions, schema, conversation)
+    cached_plan = plan_cache.get(cache_key)
+    if cached_plan:
+        return {**cached_plan, "selected_model": model_name, "generation_path": "cache", "error": None}
     
     try:
         llm = get_llm(provider, model_name)
@@ -32,13 +101,21 @@ def generate_plan_node(state: QnAState):
         structured_llm = llm.with_structured_output(StructuredQnAPlan)
     except Exception as e:
         return {"error": f"LLM Setup Error: {str(e)}"}
+
+    # Nearest successful question/SQL pairs for this database, as few-shot examples
+    examples = format_examples(state["question"], datasource_id(table_id))
     
     template = """You are an expert SQL data analyst.
     Given the database schema, answer the user's question by generating a valid SQL query and explaining your reasoning.
+    {instructions}
     
-    Schema:
+    Schema (table(column:type{{allowed values}} "description", ...)):
     {schema}
     
+    {examples}
+    
+    {conversation}
+    
     User Question: {question}
     """
     
@@ -46,14 +123,21 @@ def generate_plan_node(state: QnAState):
     chain = prompt | structured_llm
     
     try:
-        result: StructuredQnAPlan = chain.invoke({"schema": schema, "question": state["question"]})
-        return {
+        values, config = budgeted(prompt, {
+            "instructions": instructions, "schema": schema, "examples": examples,
+            "conversation": conversation, "question": state["question"]},
+            model_name, shrink=[("examples", "drop"), ("conversation", "drop"), ("schema", schema_shrinker(table_id))])
+        result: StructuredQnAPlan = call_with_retry(f"llm:{provider}", chain.invoke, values, config)
+        plan = {
             "business_explanation": result.business_explanation,
             "entity_explanation": result.entity_explanation,
             "sql_query": result.sql_query,
             "table_layout": result.table_layout,
-            "error": None
         }
+        plan_cache.set(cache_key, plan)
+        return {**plan, "selected_model": model_name, "generation_path": "llm", "error": None}
+    except AdmissionRejected:
+        raise  # answered as 429 by the router
     except Exception as e:
         return {"error": f"Planning Failed: {str(e)}"}
 
@@ -62,21 +146,24 @@ def execute_qna_query_node(state: QnAState):
     if state.get("error"):
         return {"error": state["error"]}
         
-    db = get_db()
+    db = get_db(state.get("table_id"))
     try:
-        from sqlalchemy import text
-        
-        # Use the underlying SQLAlchemy engine to get raw results as list of dicts
-        with db._engine.connect() as connection:
-            result_proxy = connection.execute(text(state["sql_query"]))
-            # keys are internal in sqlalchemy 1.4+, need to convert to list/keys handle
-            keys = result_proxy.keys()
-            rows = result_proxy.fetchall()
-            
-            # Map columns to values
-            results = [dict(zip(keys, row)) for row in rows]
-            
-        return {"query_result": results}
+        # Only read-only statements are safe to run twice
+        datasource = datasource_id(state.get("table_id"))
+        plan = None
+        if state.get("explain"):
+            keys, results, plan = call_with_retry(f"db:{datasource}", execute_sql_with_plan, db, state["sql_query"],
+                                                  datasource=datasource, idempotent=is_read_only(state["sql_query"]))
+        else:
+            keys, results = call_with_retry(f"db:{datasource}", execute_sql, db, state["sql_query"],
+                                            datasource=datasource, idempotent=is_read_only(state["sql_query"]))
+        # A follow-up's SQL depends on the conversation, so it is no standalone example
+        if state.get("generation_path") == "llm" and not state.get("history"):
+            record_example(state["question"], state["sql_query"], datasource_id(state.get("table_id")))
+        output = {"query_result": results, "result_columns": list(keys)}
+        if plan is not None:
+            output["query_plan"] = plan
+        return output
     except Exception as e:
         return {"error": f"Execution Failed: {str(e)}"}
 
@@ -85,8 +172,10 @@ def summarize_result_node(state: QnAState):
     if state.get("error"):
         return {"summary": "Error occurred during processing."}
         
+    # Small results are always summarised by the fast tier
     provider = state.get("model_provider", "openai")
-    model_name = state.get("model_name")
+    model_name = select_model(state["question"], provider, state.get("model_name"),
+                              purpose="summary", row_count=len(state.get("query_result") or []))
     
     try:
         llm = get_llm(provider, model_name)
@@ -111,24 +200,66 @@ def summarize_result_node(state: QnAState):
     chain = prompt | llm | StrOutputParser()
     
     try:
-        summary = chain.invoke({
+        # A huge result is cut to the rows that fit the budget
+        values, config = budgeted(prompt, {
             "question": state["question"],
             "business_explanation": state["business_explanation"],
             "query_result": state.get("query_result", "No results")
-        })
+        }, model_name, shrink=[("query_result", "truncate")])
+        summary = call_with_retry(f"llm:{provider}", chain.invoke, values, config)
         return {"summary": summary}
+    except AdmissionRejected:
+        raise  # answered as 429 by the router
     except Exception as e:
         return {"summary": f"Failed to generate summary: {str(e)}"}
 
+def template_summary_node(state: QnAState):
+    """Phrases scalar and small group-by results locally, skipping the LLM."""
+    try:
+        descriptions = column_descriptions(get_db(state.get("table_id")))
+    except Exception:
+        descriptions = {}
+    return {"summary": render_answer(state["result_columns"], state["query_result"], descriptions)}
+
+def route_summary(state: QnAState):
+    # wants_template reads result_rows; in this graph the rows are query_result
+    return "template_summary" if wants_template({**state, "result_rows": state.get("query_result")}) else "summarize"
+
+def remember_turn_node(state: QnAState):
+    """Appends this turn to the session history."""
+    if state.get("error"):
+        return {}
+    history = state.get("history") or []
+    sql = state.get("sql_query")
+    if state.get("generation_path") == "session" and history:
+        sql = history[-1]["sql"]  # keep the source SQL; the local one only means something here
+    return {"history": [make_turn(state["question"], sql, state.get("result_columns"), state.get("query_result"))]}
+
 # Build Graph
 qna_workflow = StateGraph(QnAState)
+qna_workflow.add_node("session_refine", session_refine_node)
+qna_workflow.add_node("rule_plan", rule_plan_node)
 qna_workflow.add_node("plan", generate_plan_node)
 qna_workflow.add_node("execute", execute_qna_query_node)
 qna_workflow.add_node("summarize", summarize_result_node)
+qna_workflow.add_node("template_summary", template_summary_node)
+qna_workflow.add_node("remember_turn", remember_turn_node)
 
-qna_workflow.set_entry_point("plan")
+qna_workflow.set_entry_point("session_refine")
+qna_workflow.add_conditional_edges(
+    "session_refine",
+    lambda state: route_summary(state) if state.get("generation_path") == "session" else "rule_plan",
+    ["template_summary", "summarize", "rule_plan"],
+)
+qna_workflow.add_conditional_edges(
+    "rule_plan",
+    lambda state: "execute" if state.get("generation_path") == "rules" else "plan",
+    ["execute", "plan"],
+)
 qna_workflow.add_edge("plan", "execute")
-qna_workflow.add_edge("execute", "summarize")
-qna_workflow.add_edge("summarize", END)
+qna_workflow.add_conditional_edges("execute", route_summary, ["template_summary", "summarize"])
+qna_workflow.add_edge("summarize", "remember_turn")
+qna_workflow.add_edge("template_summary", "remember_turn")
+qna_workflow.add_edge("remember_turn", END)
 
 qna_graph = qna_workflow.compile()
@@ -1,9 +1,16 @@
 from typing import TypedDict, Optional, List, Dict, Any
+from typing_extensions import Annotated
+from src.agent.sessions import add_turns
 
 class QnAState(TypedDict):
     question: str
+    table_id: Optional[str]  # onboarded table to query; None = DATABASE_URL
     model_provider: str
     model_name: Optional[str]
+    selected_model: Optional[str]
+    full_summary: bool
+    explain: bool  # attach the execution plan of sql_query
+    generation_path: Optional[str]  # 'rules', 'cache', 'llm' or 'session'
     
     # Outputs
     business_explanation: Optional[str]
@@ -11,6 +18,9 @@ class QnAState(TypedDict):
     sql_query: Optional[str]
     table_layout: Optional[str]
     query_result: Optional[List[Dict[str, Any]]]
+    result_columns: Optional[List[str]]
     summary: Optional[str]
+    query_plan: Optional[Dict[str, Any]]
     
     error: Optional[str]
+    history: Annotated[List[Dict[str, Any]], add_turns]  # previous turns of the session
@@ -0,0 +1,145 @@
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from src.config import settings
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Record / replay of LLM calls. In 'record' mode every provider model is
+# wrapped and each answer is appended to the cassette (JSON lines) under a
+# hash of the prompt; the 'replay' provider serves those answers without any
+# network access, optionally after an injected delay. Keys leave the model
+# out, so a cassette recorded with one provider or tier replays under any.
+
+class CassetteMiss(LookupError):
+    pass
+
+def prompt_key(messages, schema: Optional[str] = None) -> str:
+    rendered = [(m.type, m.content) for m in messages]
+    return hashlib.sha256(json.dumps([schema, rendered], default=str).encode()).hexdigest()
+
+class Cassette:
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Optional[Dict[str, dict]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._entries[entry["key"]] = entry  # later recordings win
+            logger.info(f"Loaded {len(self._entries)} LLM responses from {self.path}")
+        return self._entries
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None:
+            raise CassetteMiss(f"No recorded LLM response for prompt {key[:12]} in {self.path}; "
+                               f"record it with LLM_CASSETTE_MODE=record.")
+        return entry
+
+    def put(self, key: str, messages, content: str, usage: Optional[dict], model: str, schema: Optional[str] = None):
+        entry = {"key": key, "model": model, "schema": schema,
+                 "prompt": [{"type": m.type, "content": m.content} for m in messages],
+                 "content": content, "usage": usage}
+        with self._lock:
+            self._load()[key] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+_cassettes: Dict[str, Cassette] = {}
+
+def get_cassette(path: Optional[str] = None) -> Cassette:
+    path = path or settings.LLM_CASSETTE_PATH
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+def _replay_delay() -> float:
+    delay = settings.LLM_REPLAY_LATENCY_MS + random.uniform(0, settings.LLM_REPLAY_LATENCY_JITTER_MS)
+    return delay / 1000
+
+def _result(entry: dict) -> ChatResult:
+    message = AIMessage(content=entry["content"], usage_metadata=entry.get("usage") or None)
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model answering from a cassette. Structured output is replayed as JSON and validated."""
+
+    model_name: str = "cassette"
+    cassette_path: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _generate(self, messages, stop=None, run_manager=None, schema: Optional[str] = None, **kwargs) -> ChatResult:
+        entry = get_cassette(self.cassette_path).get(prompt_key(messages, schema))
+        time.sleep(_replay_delay())
+        return _result(entry)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, schema: Optional[str] = None, **kwargs) -> ChatResult:
+        entry = get_cassette(self.cassette_path).get(prompt_key(messages, schema))
+        await asyncio.sleep(_replay_delay())
+        return _result(entry)
+
+    def with_structured_output(self, schema, *, include_raw: bool = False, **kwargs):
+        parse = RunnableLambda(lambda message: schema.model_validate_json(message.content))
+        return self.bind(schema=schema.__name__) | parse
+
+class RecordingChatModel(BaseChatModel):
+    """Wraps a provider model and appends every answer it gives to the cassette."""
+
+    inner: Any
+    model_name: str
+    cassette_path: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"record-{self.inner._llm_type}"
+
+    def _record(self, messages, result: ChatResult) -> ChatResult:
+        message = result.generations[0].message
+        get_cassette(self.cassette_path).put(prompt_key(messages), messages, message.content,
+                                             getattr(message, "usage_metadata", None), self.model_name)
+        return result
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # The provider's own _generate, so callbacks see this call once (from the wrapper)
+        return self._record(messages, self.inner._generate(messages, stop=stop, **kwargs))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self._record(messages, await self.inner._agenerate(messages, stop=stop, **kwargs))
+
+    def with_structured_output(self, schema, *, include_raw: bool = False, **kwargs):
+        structured = self.inner.with_structured_output(schema, include_raw=True, **kwargs)
+
+        def record(input, config=None):
+            messages = self._convert_input(input).to_messages()
+            output = structured.invoke(input, config)
+            if output.get("parsing_error"):
+                raise output["parsing_error"]
+            parsed, raw = output["parsed"], output["raw"]
+            get_cassette(self.cassette_path).put(prompt_key(messages, schema.__name__), messages,
+                                                 parsed.model_dump_json(), getattr(raw, "usage_metadata", None),
+                                                 self.model_name, schema.__name__)
+            return parsed
+
+        return RunnableLambda(record)
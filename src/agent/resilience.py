@@ -0,0 +1,176 @@
+from contextvars import ContextVar
+from src.config import settings
+from typing import Callable, Dict, Optional, TypeVar
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Retries with jittered exponential backoff and a circuit breaker per
+# dependency ("llm:openai", "db:default", ...). Only transient failures
+# (connection drops, timeouts, 429 / 5xx) are retried or count against a
+# breaker; a bad SQL statement or an unparsable LLM answer is the caller's
+# problem, not the dependency's.
+
+# Monotonic time by which the current request should be answered; retries
+# never sleep past it. Set by the routers, inherited by the graph nodes.
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+def set_deadline(seconds: float):
+    request_deadline.set(time.monotonic() + seconds)
+
+def remaining_seconds() -> Optional[float]:
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+class CircuitOpenError(Exception):
+    def __init__(self, dependency: str, retry_in: float):
+        super().__init__(f"{dependency} is unavailable (circuit open), retry in {retry_in:.0f}s")
+        self.dependency = dependency
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures and fails
+    calls fast for reset_seconds. Then one probe call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            retry_in = self.opened_at + self.reset_seconds - time.monotonic()
+            if self.state == "open" and retry_in <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(retry_in, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Circuit {self.name} closed")
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit {self.name} opened after {self.consecutive_failures} failures: {error}")
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        retry_in = self.opened_at + self.reset_seconds - time.monotonic() if self.state == "open" else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in_s": round(max(retry_in, 0.0), 1),
+            "last_error": self.last_error,
+        }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(dependency: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if dependency not in _breakers:
+            _breakers[dependency] = CircuitBreaker(dependency, settings.BREAKER_FAILURE_THRESHOLD,
+                                                   settings.BREAKER_RESET_SECONDS)
+        return _breakers[dependency]
+
+def breaker_stats():
+    return {name: breaker.stats() for name, breaker in sorted(_breakers.items())}
+
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+# Provider SDK exceptions, by name so neither SDK has to be imported here
+_TRANSIENT_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+                    "ServiceUnavailable", "ResourceExhausted", "DeadlineExceeded", "TooManyRequests"}
+# Postgres SQLSTATEs worth retrying: serialization failure, deadlock and the
+# admin/crash shutdown codes. Class 08 (connection exception) is matched by prefix.
+_TRANSIENT_SQLSTATES = {"40001", "40P01", "57P01", "57P02", "57P03"}
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in _TRANSIENT_STATUS or type(error).__name__ in _TRANSIENT_NAMES:
+        return True
+
+    from sqlalchemy import exc
+    if isinstance(error, (exc.DisconnectionError, exc.TimeoutError)):
+        return True
+    if isinstance(error, exc.DBAPIError):
+        if error.connection_invalidated:
+            return True
+        if isinstance(error, exc.OperationalError):
+            # SQLite reports syntax errors and missing tables as OperationalError too
+            if isinstance(error.orig, sqlite3.OperationalError):
+                message = str(error.orig)
+                return "locked" in message or "busy" in message or "unable to open" in message
+        sqlstate = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+        if sqlstate:
+            return sqlstate.startswith("08") or sqlstate in _TRANSIENT_SQLSTATES
+        # No SQLSTATE means the server never answered, e.g. psycopg2's "server closed the connection"
+        return isinstance(error, exc.OperationalError)
+    return False
+
+def call_with_retry(dependency: str, fn: Callable[..., T], *args, idempotent: bool = True, **kwargs) -> T:
+    """
+    Calls fn through the dependency's circuit breaker. Idempotent calls that
+    fail transiently are retried up to RETRY_MAX_ATTEMPTS times with full
+    jitter backoff, as long as the wait still fits before the request
+    deadline.
+    """
+    breaker = get_breaker(dependency)
+    attempts = settings.RETRY_MAX_ATTEMPTS if idempotent else 1
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if not is_transient(e):
+                breaker.record_success()  # the dependency answered; the request was bad
+                raise
+            breaker.record_failure(e)
+            delay = random.uniform(0, min(settings.RETRY_MAX_DELAY_SECONDS,
+                                          settings.RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+            remaining = remaining_seconds()
+            if attempt + 1 >= attempts or (remaining is not None and delay >= remaining):
+                raise
+            logger.info(f"{dependency} failed ({type(e).__name__}: {e}); retry {attempt + 1} in {delay:.2f}s")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
@@ -0,0 +1,138 @@
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from src.cache import get_cache
+from src.config import settings
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Full /qna results kept under a handle for RESULT_TTL_SECONDS, so later
+# pages (in any order) are served without running the SQL again. Results up
+# to RESULT_MEMORY_MAX_ROWS live in the cache backend; larger ones are
+# spilled to one SQLite file each under RESULT_SPILL_DIR. A spill file keeps
+# every row pickled (returned exactly as the query produced it) next to a
+# sortable copy of each column, indexed the first time a page sorts by it.
+
+_HANDLE = re.compile(r"^[0-9a-f]{32}$")
+_last_sweep = 0.0
+
+def _sortable(value):
+    # Same text / number forms the JSON encoder produces, so the order matches what clients see
+    if isinstance(value, (Decimal, timedelta)):
+        return float(value) if isinstance(value, Decimal) else value.total_seconds()
+    if isinstance(value, (date, datetime, dt_time)):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return str(value)
+
+def _spill_path(handle: str) -> str:
+    return os.path.join(settings.RESULT_SPILL_DIR, f"{handle}.db")
+
+def _spill(handle: str, columns: List[str], rows: List[Dict[str, Any]]):
+    os.makedirs(settings.RESULT_SPILL_DIR, exist_ok=True)
+    path = _spill_path(handle)
+    partial = path + ".tmp"
+    conn = sqlite3.connect(partial)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        sort_columns = ", ".join(f"c{i}" for i in range(len(columns)))
+        conn.execute(f"CREATE TABLE result_rows (row_no INTEGER PRIMARY KEY, data BLOB NOT NULL, {sort_columns})")
+        conn.execute("CREATE TABLE result_meta (columns BLOB NOT NULL, row_count INTEGER NOT NULL, created_at REAL NOT NULL)")
+        conn.execute("INSERT INTO result_meta VALUES (?, ?, ?)", (pickle.dumps(columns), len(rows), time.time()))
+        placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+        conn.executemany(
+            f"INSERT INTO result_rows VALUES ({placeholders})",
+            ((i, pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL), *(_sortable(row.get(c)) for c in columns))
+             for i, row in enumerate(rows)),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(partial, path)
+
+def _sweep():
+    """Deletes spill files not modified for RESULT_TTL_SECONDS; runs at most once a minute."""
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < 60 or not os.path.isdir(settings.RESULT_SPILL_DIR):
+        return
+    _last_sweep = now
+    for name in os.listdir(settings.RESULT_SPILL_DIR):
+        path = os.path.join(settings.RESULT_SPILL_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > settings.RESULT_TTL_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+
+def store_result(columns: List[str], rows: List[Dict[str, Any]]) -> str:
+    handle = uuid.uuid4().hex
+    columns = list(dict.fromkeys(columns))
+    if len(rows) <= settings.RESULT_MEMORY_MAX_ROWS:
+        get_cache("result_handles", settings.RESULT_TTL_SECONDS).set(handle, (columns, rows))
+    else:
+        started = time.perf_counter()
+        _spill(handle, columns, rows)
+        logger.info(f"Spilled {len(rows)} rows to {_spill_path(handle)} in {(time.perf_counter() - started) * 1000:.0f}ms")
+    _sweep()
+    return handle
+
+def _sorted_rows(rows, column: str, descending: bool):
+    present = [r for r in rows if r.get(column) is not None]
+    missing = [r for r in rows if r.get(column) is None]
+    try:
+        present.sort(key=lambda r: _sortable(r[column]), reverse=descending)
+    except TypeError:  # mixed types in one column
+        present.sort(key=lambda r: str(_sortable(r[column])), reverse=descending)
+    return present + missing  # NULLs last either way, as in the spilled path
+
+def _spilled_page(handle: str, offset: int, limit: int, sort: Optional[str], descending: bool):
+    path = _spill_path(handle)
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path, timeout=5)
+    try:
+        columns, total, created_at = conn.execute("SELECT columns, row_count, created_at FROM result_meta").fetchone()
+        if time.time() - created_at > settings.RESULT_TTL_SECONDS:
+            return None
+        columns = pickle.loads(columns)
+        order = "row_no"
+        if sort is not None:
+            if sort not in columns:
+                raise ValueError(f"Unknown sort column: {sort}")
+            column = f"c{columns.index(sort)}"
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{column} ON result_rows ({column}, row_no)")
+            order = f"{column} IS NULL, {column} {'DESC' if descending else 'ASC'}, row_no"
+        page = conn.execute(f"SELECT data FROM result_rows ORDER BY {order} LIMIT ? OFFSET ?", (limit, offset))
+        rows = [pickle.loads(data) for (data,) in page]
+    finally:
+        conn.close()
+    return columns, rows, total
+
+def get_page(handle: str, offset: int = 0, limit: int = 100, sort: Optional[str] = None,
+             descending: bool = False) -> Optional[Tuple[List[str], List[Dict[str, Any]], int]]:
+    """
+    (columns, rows, total rows) for one page of a stored result, or None if
+    the handle is unknown or expired. Raises ValueError for an unknown sort
+    column.
+    """
+    if not _HANDLE.match(handle):
+        return None
+    stored = get_cache("result_handles", settings.RESULT_TTL_SECONDS).get(handle)
+    if stored is None:
+        return _spilled_page(handle, offset, limit, sort, descending)
+    columns, rows = stored
+    if sort is not None:
+        if sort not in columns:
+            raise ValueError(f"Unknown sort column: {sort}")
+        rows = _sorted_rows(rows, sort, descending)
+    return columns, rows[offset:offset + limit], len(rows)
@@ -0,0 +1,236 @@
+from dataclasses import dataclass, field
+from sqlalchemy import inspect, text
+from src.cache import get_cache, make_key
+from src.config import settings
+from typing import Dict, List, Optional, Tuple
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# The grammar covers the sales_data table only: <aggregation> <measure>
+# [by <dimension>...] [top/bottom N <dimension>] [<known values as filters>].
+TABLE = "sales_data"
+VALUE_COLUMNS = ("org_name", "product_name", "region", "quarter", "month", "year")
+
+AGGREGATIONS = {
+    "total": "SUM", "sum": "SUM", "overall": "SUM",
+    "average": "AVG", "avg": "AVG", "mean": "AVG",
+    "count": "COUNT", "number": "COUNT", "many": "COUNT",
+    "maximum": "MAX", "max": "MAX", "largest": "MAX", "biggest": "MAX",
+    "minimum": "MIN", "min": "MIN", "smallest": "MIN",
+}
+SUPERLATIVES = {"highest": "DESC", "most": "DESC", "best": "DESC", "top": "DESC",
+                "lowest": "ASC", "least": "ASC", "worst": "ASC", "bottom": "ASC", "fewest": "ASC"}
+MEASURES = {
+    "sales": "sales_amount", "sale": "sales_amount", "revenue": "sales_amount", "amount": "sales_amount",
+    "gtv": "sales_amount", "turnover": "sales_amount", "value": "sales_amount",
+    "quantity": "quantity", "units": "quantity", "unit": "quantity", "items": "quantity", "volume": "quantity",
+    "orders": None, "order": None, "transactions": None, "transaction": None, "deals": None,
+    "records": None, "rows": None, "entries": None,  # None = COUNT(*)
+}
+DIMENSIONS = {
+    "org": "org_name", "orgs": "org_name", "organization": "org_name", "organizations": "org_name",
+    "organisation": "org_name", "organisations": "org_name", "customer": "org_name", "customers": "org_name",
+    "company": "org_name", "companies": "org_name", "client": "org_name", "clients": "org_name",
+    "product": "product_name", "products": "product_name",
+    "region": "region", "regions": "region",
+    "year": "year", "years": "year", "yearly": "year", "annual": "year", "annually": "year",
+    "quarter": "quarter", "quarters": "quarter", "quarterly": "quarter",
+    "month": "month", "months": "month", "monthly": "month",
+}
+_PERIODIC = {"yearly", "annual", "annually", "quarterly", "monthly"}
+_GROUP_MARKERS = {"by", "per", "each", "which", "what", "every"}
+FILLER = {
+    "what", "whats", "is", "was", "were", "are", "the", "of", "for", "in", "on", "by", "per", "across", "show",
+    "me", "give", "list", "get", "find", "tell", "how", "much", "did", "do", "does", "we", "our", "my", "all",
+    "a", "an", "with", "from", "to", "during", "and", "or", "made", "make", "have", "has", "had", "generated",
+    "earned", "sold", "selling", "performing", "please", "which", "who", "each", "every", "there", "been",
+    "at", "it", "its", "breakdown", "split", "broken", "down", "grouped", "group", "i", "you", "can", "see",
+    "place", "placed", "buy", "bought", "purchase", "purchased", "spend", "spent",
+}
+_WORD = re.compile(r"[a-z0-9]+")
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+           "November", "December")
+# month holds names: order groups by calendar, not alphabetically
+_MONTH_ORDER = "CASE month " + " ".join(f"WHEN '{m}' THEN {i}" for i, m in enumerate(_MONTHS, 1)) + " END"
+
+@dataclass
+class RuleMatch:
+    sql: str
+    confidence: float
+    aggregation: str
+    measure: Optional[str]
+    group_by: List[str] = field(default_factory=list)
+    filters: Dict[str, List[str]] = field(default_factory=dict)
+    limit: Optional[int] = None
+    distinct: Optional[str] = None  # COUNT(DISTINCT <column>) instead of a measure
+
+    def describe(self) -> str:
+        target = f"COUNT(DISTINCT {self.distinct})" if self.distinct else f"{self.aggregation}({self.measure or '*'})"
+        parts = [f"Compiled locally from the question: {target} over {TABLE}"]
+        if self.filters:
+            parts.append("filtered on " + ", ".join(f"{c} in {v}" for c, v in self.filters.items()))
+        if self.group_by:
+            parts.append("grouped by " + ", ".join(self.group_by))
+        if self.limit:
+            parts.append(f"limited to {self.limit} rows")
+        return "; ".join(parts) + "."
+
+def load_vocabulary(db) -> Optional[Dict[str, List[str]]]:
+    """
+    Distinct values of the filterable sales_data columns, cached like the
+    schema. None when the database has no sales_data table of that shape.
+    """
+    def load():
+        if TABLE not in db.get_usable_table_names():
+            return None
+        columns = {c["name"] for c in inspect(db._engine).get_columns(TABLE)}
+        if not set(VALUE_COLUMNS) | {"sales_amount", "quantity"} <= columns:
+            return None
+        vocabulary = {}
+        with db._engine.connect() as connection:
+            for column in VALUE_COLUMNS:
+                rows = connection.execute(text(f'SELECT DISTINCT "{column}" FROM {TABLE}')).fetchall()
+                vocabulary[column] = sorted(str(r[0]) for r in rows if r[0] is not None)
+        return vocabulary
+
+    cache = get_cache("schema", settings.CACHE_SCHEMA_TTL)
+    return cache.get_or_set(make_key("rule_vocabulary", str(db._engine.url)), load)
+
+def _match_values(question: str, vocabulary: Dict[str, List[str]]) -> Tuple[Dict[str, List[str]], str]:
+    """Finds known column values in the question; returns them and the question with them blanked out."""
+    filters: Dict[str, List[str]] = {}
+    candidates = [(value, column) for column in VALUE_COLUMNS for value in vocabulary.get(column, [])]
+    # Longest first so "Acme Corp" wins over a shorter overlapping value
+    for value, column in sorted(candidates, key=lambda c: -len(c[0])):
+        # "may" is far more often a verb than a month
+        flags = 0 if column == "month" else re.IGNORECASE
+        pattern = re.compile(rf"\b{re.escape(value)}s?\b", flags)
+        if pattern.search(question):
+            filters.setdefault(column, []).append(value)
+            question = pattern.sub(" ", question)
+    return filters, question
+
+def _literal(column: str, value: str) -> str:
+    if column == "year" and value.isdigit():
+        return value
+    return "'" + value.replace("'", "''") + "'"
+
+def parse_question(question: str, vocabulary: Dict[str, List[str]]) -> Optional[RuleMatch]:
+    """
+    Compiles a question from the common sales grammar straight to SQL.
+
+    Returns None when the question has no measure/aggregation at all;
+    otherwise confidence is the share of its words the grammar understood,
+    so anything it had to ignore (comparisons, relative dates, ...) lowers
+    it and the caller falls back to the LLM.
+    """
+    filters, rest = _match_values(question, vocabulary)
+    words = _WORD.findall(rest.lower().replace("'", ""))
+
+    aggregation = None
+    measure = ...  # Ellipsis = not mentioned; None = COUNT(*)
+    order = None
+    limit = None
+    group_by: List[str] = []
+    mentioned: List[str] = []  # dimensions named outside a grouping position ("how many customers")
+    ranked_plural = False  # "top products" (no N) means a handful, "top product" means one
+    understood = 0
+    previous = ""
+    for i, word in enumerate(words):
+        known = True
+        if word.isdigit() and previous in ("top", "bottom") and 0 < int(word) <= 100:
+            limit = int(word)
+        elif word in AGGREGATIONS and not (word == "number" and words[i + 1:i + 2] != ["of"]):
+            aggregation = aggregation or AGGREGATIONS[word]
+        elif word in SUPERLATIVES:
+            order = order or SUPERLATIVES[word]
+        elif word in MEASURES:
+            if measure is ... or measure is None:
+                measure = MEASURES[word]
+        elif word in DIMENSIONS:
+            column = DIMENSIONS[word]
+            # "by region and year": a dimension right after a grouped one joins the grouping
+            joined = previous == "and" and i >= 2 and DIMENSIONS.get(words[i - 2]) in group_by
+            if (word in _PERIODIC or previous in _GROUP_MARKERS or previous in SUPERLATIVES
+                    or previous.isdigit() or joined) and column not in group_by:
+                group_by.append(column)
+                ranked_plural = ranked_plural or (previous in ("top", "bottom") and word.endswith("s"))
+            elif column not in group_by and column not in mentioned:
+                mentioned.append(column)
+        elif word not in FILLER:
+            known = False
+        understood += known
+        previous = word
+
+    if aggregation is None and measure is ... and order is None:
+        return None
+    if (aggregation == "COUNT" and measure == "quantity") or (
+            measure is ... and aggregation in (None, "COUNT") and "sold" in words):
+        # "how many units", "how many laptops were sold", "which product sold the most":
+        # a quantity total, not a row count
+        aggregation, measure = "SUM", "quantity"
+    distinct = None
+    if measure is ... and aggregation == "COUNT":
+        # "how many customers bought a Laptop": count the dimension's distinct values;
+        # with several dimensions named it is unclear which one is counted
+        counted = [c for c in mentioned if c not in group_by]
+        if len(counted) == 1:
+            distinct = counted[0]
+        understood -= max(len(counted) - 1, 0)
+    if measure is ...:
+        measure = None if aggregation == "COUNT" else "sales_amount"
+    if aggregation is None:
+        aggregation = "COUNT" if measure is None else "SUM"
+    if measure is None:
+        aggregation = "COUNT"
+    if len(group_by) > 2:
+        return None
+
+    if order and group_by:
+        limit = limit or (5 if ranked_plural else 1)
+    elif order and aggregation == "SUM" and measure:
+        # "highest sale" without a dimension asks for the single largest row value
+        aggregation = "MAX" if order == "DESC" else "MIN"
+
+    if distinct:
+        expression, alias = f"COUNT(DISTINCT {distinct})", f"{distinct}_count"
+    else:
+        expression = f"{aggregation}({measure or '*'})"
+        alias = {"SUM": "total", "AVG": "average", "COUNT": "count", "MAX": "max", "MIN": "min"}[aggregation]
+        alias = f"{alias}_{measure}" if measure else "order_count"
+
+    sql = f"SELECT {', '.join(group_by + [f'{expression} AS {alias}'])} FROM {TABLE}"
+    conditions = []
+    for column, values in filters.items():
+        literals = ", ".join(_literal(column, v) for v in values)
+        conditions.append(f"{column} = {literals}" if len(values) == 1 else f"{column} IN ({literals})")
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if group_by:
+        sql += f" GROUP BY {', '.join(group_by)}"
+        sql += f" ORDER BY {alias} {order or 'DESC'}" if limit else \
+            f" ORDER BY {', '.join(_MONTH_ORDER if c == 'month' else c for c in group_by)}"
+        if limit:
+            sql += f" LIMIT {limit}"
+
+    confidence = understood / len(words) if words else 1.0
+    return RuleMatch(sql=sql, confidence=confidence, aggregation=aggregation, measure=measure,
+                     group_by=group_by, filters=filters, limit=limit, distinct=distinct)
+
+def compile_question(question: str, db) -> Optional[RuleMatch]:
+    """The rule-based fast path: a RuleMatch when confident enough, else None (use the LLM)."""
+    if not settings.RULE_PARSER_ENABLED:
+        return None
+    try:
+        vocabulary = load_vocabulary(db)
+    except Exception as e:
+        logger.warning(f"Rule parser vocabulary unavailable: {e}")
+        return None
+    if not vocabulary:
+        return None
+    match = parse_question(question, vocabulary)
+    if match is None or match.confidence < settings.RULE_PARSER_MIN_CONFIDENCE:
+        return None
+    return match
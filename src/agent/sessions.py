@@ -0,0 +1,236 @@
+from decimal import Decimal
+from src.config import settings
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import re
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+# Multi-turn sessions. Graph state is checkpointed per session (thread) so a
+# follow-up sees the previous turns; follow-ups that only narrow, reorder or
+# cut down the previous result are answered from that result on an
+# in-memory SQLite copy instead of going back to the source database.
+
+PREVIOUS_TABLE = "previous_result"
+
+# Per-turn keys; reset on every invocation so a checkpointed value from the
+# previous turn never leaks into the next one
+TURN_KEYS = ("sql_query", "query_result", "result_columns", "result_rows", "row_count", "answer", "error",
+             "generation_path", "selected_model", "business_explanation", "entity_explanation",
+             "table_layout", "summary", "query_plan")
+
+def add_turns(left: Optional[List[dict]], right: Optional[List[dict]]) -> List[dict]:
+    """State reducer for history: append, keeping the last SESSION_MAX_TURNS turns."""
+    return ((left or []) + (right or []))[-settings.SESSION_MAX_TURNS:]
+
+def make_turn(question: str, sql: Optional[str], columns: Optional[List[str]],
+              rows: Optional[List[Dict[str, Any]]]) -> dict:
+    # Only results small enough to keep are available for local refinement
+    keep = rows is not None and len(rows) <= settings.SESSION_MAX_RESULT_ROWS
+    return {"question": question, "sql": sql, "columns": columns or [], "rows": rows if keep else None}
+
+def conversation_context(history: Optional[List[dict]]) -> str:
+    """Prompt block with the last few questions and their SQL, for follow-ups that need the source."""
+    if not history:
+        return ""
+    lines = ["Earlier in this conversation (the question may refer to these):"]
+    for turn in history[-3:]:
+        lines.append(f"Question: {turn['question']}\nSQL: {turn.get('sql') or '(none)'}")
+    return "\n".join(lines)
+
+_MARKERS = {"now", "only", "just", "filter", "restrict", "limit", "keep", "exclude", "excluding", "without",
+            "except", "those", "that", "them", "these", "same", "top", "bottom", "sort", "order", "instead"}
+_NEGATIONS = {"exclude", "excluding", "without", "except", "not", "other"}
+_FILLER = {"show", "me", "the", "for", "in", "of", "and", "or", "to", "but", "than", "by", "please", "then",
+           "what", "about", "rows", "results", "result", "it", "a", "an", "with", "give", "list", "from",
+           "ascending", "descending", "asc", "desc", "highest", "lowest", "first", "is", "are", "on"}
+_WORD = re.compile(r"[a-z0-9_]+")
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+def refine_previous(question: str, turn: dict) -> Optional[Tuple[str, str]]:
+    """
+    Compiles a follow-up to SQL over the previous result (table
+    previous_result), or None if it needs more than that result holds.
+    Handles value filters ("now only the North region", "excluding Acme
+    Corp"), top/bottom N and sorting. Returns (sql, description).
+    """
+    columns, rows = turn.get("columns") or [], turn.get("rows")
+    if not rows or not columns:
+        return None
+
+    # Known text values in the previous result, longest first
+    values = {}
+    for column in columns:
+        for row in rows:
+            value = row.get(column)
+            if isinstance(value, str) and value.strip():
+                values.setdefault(value, column)
+    rest = question
+    filters: Dict[str, List[str]] = {}
+    for value in sorted(values, key=len, reverse=True):
+        pattern = re.compile(rf"\b{re.escape(value)}s?\b", re.IGNORECASE)
+        if pattern.search(rest):
+            filters.setdefault(values[value], []).append(value)
+            rest = pattern.sub(" ", rest)
+
+    words = _WORD.findall(rest.lower())
+    column_words = {part for column in columns for part in _WORD.findall(column.lower().replace("_", " "))}
+    if not _MARKERS & set(words):
+        return None
+    known = _MARKERS | _NEGATIONS | _FILLER | column_words
+    # Numbers only as "top 5"; anything else ("in 2023") needs the source data
+    if any(w not in known and not (w.isdigit() and i and words[i - 1] in ("top", "bottom", "first"))
+           for i, w in enumerate(words)):
+        return None
+
+    numeric = [c for c in columns if any(_is_number(r.get(c)) for r in rows)]
+    descending = not ({"bottom", "lowest", "ascending", "asc"} & set(words))
+    limit = None
+    for i, word in enumerate(words[:-1]):
+        if word in ("top", "bottom", "first") and words[i + 1].isdigit():
+            limit = int(words[i + 1])
+    sort_column = None
+    if "sort" in words or "order" in words or limit:
+        after = words[words.index("by") + 1:] if "by" in words else []
+        named = [c for c in columns if set(_WORD.findall(c.lower().replace("_", " "))) <= set(after)] if after else []
+        sort_column = named[0] if named else (numeric[-1] if numeric else None)
+        if sort_column is None:
+            return None
+    if not filters and not sort_column:
+        return None
+
+    negate = bool(_NEGATIONS & set(words))
+    sql = f"SELECT * FROM {PREVIOUS_TABLE}"
+    conditions = [
+        f"{_quote(column)} {'NOT IN' if negate else 'IN'} ({', '.join(_literal(v) for v in vals)})"
+        for column, vals in filters.items()
+    ]
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if sort_column:
+        sql += f" ORDER BY {_quote(sort_column)} {'DESC' if descending else 'ASC'}"
+    if limit:
+        sql += f" LIMIT {limit}"
+
+    description = "Refined the previous result locally"
+    if filters:
+        description += (" excluding " if negate else " keeping ") + ", ".join(v for vals in filters.values() for v in vals)
+    if sort_column:
+        description += f", ordered by {sort_column}"
+    if limit:
+        description += f", first {limit} rows"
+    return sql, description + "."
+
+def _sqlite_value(value):
+    # Decimals (Postgres numeric) as numbers, so they sort and compare numerically
+    if isinstance(value, Decimal):
+        return float(value)
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return str(value)
+
+def run_on_previous(turn: dict, sql: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Runs sql against an in-memory SQLite copy of the turn's result."""
+    columns = turn["columns"]
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute(f"CREATE TABLE {PREVIOUS_TABLE} ({', '.join(_quote(c) for c in columns)})")
+        connection.executemany(
+            f"INSERT INTO {PREVIOUS_TABLE} VALUES ({', '.join('?' for _ in columns)})",
+            ([_sqlite_value(r.get(c)) for c in columns] for r in turn["rows"]),
+        )
+        cursor = connection.execute(sql)
+        keys = [d[0] for d in cursor.description]
+        return keys, [dict(zip(keys, row)) for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+class SessionStore:
+    """
+    The LangGraph checkpointer behind sessions plus a small index of when
+    each session was last used.
+
+    Checkpoints live in SQLite (langgraph-checkpoint-sqlite) at
+    SESSION_DB_PATH; without that package sessions fall back to process
+    memory. Only the latest checkpoint of a session is kept, sessions idle
+    for SESSION_TTL_SECONDS are dropped, and past SESSION_MAX_SESSIONS the
+    least recently used are dropped first.
+    """
+
+    def __init__(self):
+        self._saver = None
+        self._lock = asyncio.Lock()
+        self._last_seen: Dict[str, float] = {}
+
+    async def saver(self):
+        async with self._lock:
+            if self._saver is None:
+                try:
+                    import aiosqlite
+                    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+                    self._saver = AsyncSqliteSaver(await aiosqlite.connect(settings.SESSION_DB_PATH))
+                    await self._saver.setup()
+                    await self._saver.conn.execute(
+                        "CREATE TABLE IF NOT EXISTS session_index (thread_id TEXT PRIMARY KEY, last_seen REAL)")
+                    async with self._saver.conn.execute("SELECT thread_id, last_seen FROM session_index") as cursor:
+                        self._last_seen = {thread_id: last_seen async for thread_id, last_seen in cursor}
+                except ImportError:
+                    from langgraph.checkpoint.memory import InMemorySaver
+                    logger.warning("langgraph-checkpoint-sqlite not installed; sessions are kept in memory only")
+                    self._saver = InMemorySaver()
+            return self._saver
+
+    def _persistent(self) -> bool:
+        return hasattr(self._saver, "conn")
+
+    async def _drop(self, thread_id: str):
+        await self._saver.adelete_thread(thread_id)
+        self._last_seen.pop(thread_id, None)
+        if self._persistent():
+            await self._saver.conn.execute("DELETE FROM session_index WHERE thread_id = ?", (thread_id,))
+
+    async def begin(self, thread_id: str):
+        """Call before a turn: expires idle sessions (this one included) and enforces the cap."""
+        saver = await self.saver()
+        now = time.time()
+        for stale in [t for t, seen in self._last_seen.items() if now - seen > settings.SESSION_TTL_SECONDS]:
+            logger.info(f"Session {stale} expired")
+            await self._drop(stale)
+        self._last_seen[thread_id] = now
+        while len(self._last_seen) > settings.SESSION_MAX_SESSIONS:
+            await self._drop(min(self._last_seen, key=self._last_seen.get))
+        if self._persistent():
+            await saver.conn.execute("INSERT OR REPLACE INTO session_index VALUES (?, ?)", (thread_id, now))
+            await saver.conn.commit()
+        return {"configurable": {"thread_id": thread_id}}
+
+    async def finish(self, config: dict):
+        """Call after a turn: drops all but the session's latest checkpoint."""
+        if not self._persistent():
+            return
+        latest = await self._saver.aget_tuple(config)
+        if latest is None:
+            return
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_id = latest.config["configurable"]["checkpoint_id"]
+        async with self._saver.lock:
+            for table in ("checkpoints", "writes"):
+                await self._saver.conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id != ?", (thread_id, checkpoint_id))
+            await self._saver.conn.commit()
+
+    def stats(self):
+        return {"sessions": len(self._last_seen), "persistent": self._persistent() if self._saver else None}
+
+sessions = SessionStore()
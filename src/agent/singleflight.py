@@ -0,0 +1,50 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight run.
+
+    The first caller for a key starts the run as its own task; everyone
+    arriving while it is in flight awaits the same task. Waiters await it
+    through asyncio.shield, so a client disconnecting (which cancels its
+    request handler) never cancels the shared run for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.runs = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._finished(k, t))
+            self.runs += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"[{self.name}] Joined in-flight run ({len(self._inflight)} in flight)")
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {"in_flight": len(self._inflight), "runs": self.runs, "coalesced": self.coalesced}
+
+def question_key(question: str, provider: str, model: str | None, datasource: str, tenant: str) -> tuple:
+    """
+    Coalescing key: whitespace/case differences in the question don't matter.
+    Per tenant, since a run's tokens are charged to the caller that started it.
+    """
+    return (" ".join(question.lower().split()), provider, model or "", datasource, tenant)
@@ -1,15 +1,26 @@
 from typing import Optional, List, Dict, Any
-from typing_extensions import TypedDict
+from typing_extensions import Annotated, TypedDict
+from src.agent.sessions import add_turns
 
 class AgentState(TypedDict):
     """
     Represents the state of the SQL generation agent.
     """
     question: str
+    table_id: Optional[str]  # onboarded table to query; None = DATABASE_URL
     sql_query: Optional[str]
+    generation_path: Optional[str]  # 'rules', 'cache', 'llm' or 'session'
     query_result: Optional[str]
+    result_columns: Optional[List[str]]
+    result_rows: Optional[List[Dict[str, Any]]]
+    row_count: Optional[int]
     answer: Optional[str]
     error: Optional[str]
     model_provider: str = "openai"
     model_name: Optional[str] = None
+    selected_model: Optional[str] = None
+    full_summary: bool = False
+    explain: bool = False  # attach the execution plan of sql_query
+    query_plan: Optional[Dict[str, Any]]
     iterations: int = 0
+    history: Annotated[List[Dict[str, Any]], add_turns]  # previous turns of the session
@@ -0,0 +1,97 @@
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import inspect
+from src.cache import get_cache, make_key
+from src.config import settings
+from src.database.registry import find_column_descriptions
+from typing import Any, Dict, List, Optional
+import re
+
+_AGGREGATE = re.compile(r"^\s*(sum|avg|average|count|max|min)\s*\(\s*(distinct\s+)?([\w.*\"]+)\s*\)\s*$", re.IGNORECASE)
+_AGGREGATE_WORDS = {"sum": "total", "avg": "average", "average": "average", "count": "number of", "max": "maximum", "min": "minimum"}
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+def format_value(value) -> str:
+    if value is None:
+        return "n/a"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, (float, Decimal)):
+        if float(value).is_integer() and abs(value) >= 1000:
+            return f"{int(value):,}"
+        return f"{float(value):,.2f}"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def column_label(name: str, descriptions: Optional[Dict[str, str]] = None) -> str:
+    """
+    Human-readable label for a result column: short hand-written
+    descriptions win, aggregate expressions read as words
+    ("SUM(sales_amount)" -> "total sales amount"), otherwise the name with
+    underscores removed.
+    """
+    descriptions = descriptions or {}
+    match = _AGGREGATE.match(name)
+    if match:
+        func, distinct, inner = match.groups()
+        inner = inner.split(".")[-1].strip('"')
+        if inner == "*":
+            return "number of records"
+        word = _AGGREGATE_WORDS[func.lower()]
+        return f"{word} {'distinct ' if distinct else ''}{column_label(inner, descriptions)}"
+    description = descriptions.get(name, "")
+    if description and len(description.split()) <= 4:
+        return description.lower()
+    return name.replace("_", " ").strip().lower()
+
+def is_trivial_result(columns: List[str], rows: List[Dict[str, Any]]) -> bool:
+    """
+    Results we can phrase without an LLM: a single value, a single row of
+    a few numbers, or a small group-by of one label column and one number.
+    """
+    if not rows or not columns:
+        return False
+    if len(rows) == 1:
+        if len(columns) == 1:
+            return True
+        return len(columns) <= 3 and all(_is_number(v) or v is None for v in rows[0].values())
+    if len(rows) <= settings.TEMPLATED_ANSWER_MAX_ROWS and len(columns) == 2:
+        label, value = columns
+        return all(not _is_number(r[label]) and (_is_number(r[value]) or r[value] is None) for r in rows)
+    return False
+
+def render_answer(columns: List[str], rows: List[Dict[str, Any]], descriptions: Optional[Dict[str, str]] = None) -> str:
+    if len(rows) == 1 and len(columns) == 1:
+        return f"The {column_label(columns[0], descriptions)} is {format_value(rows[0][columns[0]])}."
+    if len(rows) == 1:
+        parts = [f"{column_label(c, descriptions)}: {format_value(rows[0][c])}" for c in columns]
+        return "Result — " + "; ".join(parts) + "."
+    label, value = columns
+    lines = [f"{column_label(value, descriptions).capitalize()} by {column_label(label, descriptions)}:"]
+    for row in rows:
+        lines.append(f"- {format_value(row[label])}: {format_value(row[value])}")
+    return "\n".join(lines)
+
+def column_descriptions(db) -> Dict[str, str]:
+    """Onboarded column descriptions across the database's tables, cached like the schema."""
+    def load():
+        inspector = inspect(db._engine)
+        merged = {}
+        for table in db.get_usable_table_names():
+            columns = [c["name"] for c in inspector.get_columns(table)]
+            merged.update({k: v for k, v in find_column_descriptions(table, columns)[1].items() if k not in merged})
+        return merged
+
+    cache = get_cache("schema", settings.CACHE_SCHEMA_TTL)
+    return cache.get_or_set(make_key("column_descriptions", str(db._engine.url)), load)
+
+def wants_template(state) -> bool:
+    """Routing predicate shared by both graphs' conditional edges."""
+    if state.get("error") or state.get("full_summary") or not settings.TEMPLATED_ANSWERS_ENABLED:
+        return False
+    return is_trivial_result(state.get("result_columns") or [], state.get("result_rows") or [])
@@ -0,0 +1,229 @@
+from contextvars import ContextVar
+from langchain_core.callbacks import BaseCallbackHandler
+from src.config import settings
+from src.tokens import count_tokens
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+import hashlib
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Token accounting and budgets. Every LLM call is measured before sending
+# (local tokenizer) and after (provider usage metadata). Prompts that would
+# overrun the request's or the API key's remaining budget are shrunk first
+# (few-shot examples, conversation, sample rows, then the data itself) and
+# refused only if they still do not fit.
+
+class TokenBudgetExceeded(Exception):
+    def __init__(self, message: str, retry_after: int = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def tenant_for(api_key: Optional[str]) -> str:
+    """Name an API key is accounted under; the key itself is never stored."""
+    if not api_key:
+        return "anonymous"
+    return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+class TenantLedger:
+    """Running token totals per tenant over a TOKEN_BUDGET_WINDOW_SECONDS window."""
+
+    def __init__(self):
+        self._totals: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, tenant: str) -> int:
+        return settings.TOKEN_BUDGET_KEY_OVERRIDES.get(tenant, settings.TOKEN_BUDGET_PER_KEY)
+
+    def _entry(self, tenant: str) -> dict:
+        now = time.time()
+        entry = self._totals.get(tenant)
+        if entry is None or now - entry["window_start"] >= settings.TOKEN_BUDGET_WINDOW_SECONDS:
+            entry = {"window_start": now, "prompt_tokens": 0, "completion_tokens": 0, "calls": 0,
+                     "requests": 0, "cached_calls": 0, "shrunk_prompts": 0, "refused": 0, "by_model": {}}
+            self._totals[tenant] = entry
+        return entry
+
+    def remaining(self, tenant: str) -> Optional[int]:
+        limit = self.limit(tenant)
+        if not limit:
+            return None
+        with self._lock:
+            entry = self._entry(tenant)
+            return limit - entry["prompt_tokens"] - entry["completion_tokens"]
+
+    def check(self, tenant: str):
+        """Raises TokenBudgetExceeded when the tenant has used up its window."""
+        remaining = self.remaining(tenant)
+        if remaining is not None and remaining <= 0:
+            with self._lock:
+                entry = self._entry(tenant)
+                entry["refused"] += 1
+                retry_after = int(entry["window_start"] + settings.TOKEN_BUDGET_WINDOW_SECONDS - time.time()) + 1
+            raise TokenBudgetExceeded(f"Token budget for this API key is used up ({self.limit(tenant)} per window).",
+                                      retry_after)
+        with self._lock:
+            self._entry(tenant)["requests"] += 1
+
+    def record(self, tenant: str, model: str, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            entry = self._entry(tenant)
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["calls"] += 1
+            per_model = entry["by_model"].setdefault(model, {"prompt_tokens": 0, "completion_tokens": 0, "calls": 0})
+            per_model["prompt_tokens"] += prompt_tokens
+            per_model["completion_tokens"] += completion_tokens
+            per_model["calls"] += 1
+
+    def note(self, tenant: str, counter: str):
+        with self._lock:
+            self._entry(tenant)[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                tenant: {**entry, "by_model": {m: dict(v) for m, v in entry["by_model"].items()},
+                         "limit": self.limit(tenant) or None}
+                for tenant, entry in self._totals.items()
+            }
+
+ledger = TenantLedger()
+
+class RequestBudget:
+    def __init__(self, tenant: str, limit: int):
+        self.tenant = tenant
+        self.limit = limit
+        self.used = 0
+
+    def remaining(self) -> Optional[int]:
+        return self.limit - self.used if self.limit else None
+
+# Set by the routers for the duration of one request; graph nodes inherit it
+current_budget: ContextVar[Optional[RequestBudget]] = ContextVar("current_budget", default=None)
+
+def start_request(api_key: Optional[str]) -> RequestBudget:
+    budget = RequestBudget(tenant_for(api_key), settings.TOKEN_BUDGET_PER_REQUEST)
+    current_budget.set(budget)
+    return budget
+
+def prompt_allowance() -> int:
+    """Most prompt tokens the next call may send, leaving room for its answer."""
+    allowance = settings.LLM_MAX_PROMPT_TOKENS
+    budget = current_budget.get()
+    if budget is not None:
+        for remaining in (budget.remaining(), ledger.remaining(budget.tenant)):
+            if remaining is not None:
+                allowance = min(allowance, remaining - settings.TOKEN_BUDGET_COMPLETION_RESERVE)
+    return allowance
+
+_SAMPLE_ROWS = re.compile(r"\n*/\*\n\d+ rows from .*?\*/", re.DOTALL)
+
+def _drop(value, excess: int):
+    return ""
+
+def _drop_sample_rows(value, excess: int):
+    # SQLDatabase.get_table_info() (SCHEMA_PROMPT_FORMAT='ddl') appends sample rows per table
+    return _SAMPLE_ROWS.sub("", value or "")
+
+def _truncate(value, excess: int):
+    """Cuts text, or a list of rows, down by at least `excess` tokens and says so."""
+    if isinstance(value, list):
+        rows = value
+        tokens = count_tokens(str(rows))
+        target = tokens - excess - 32
+        # Rows render to roughly equal sizes: start from the proportional count
+        keep = max(0, int(len(rows) * target / max(tokens, 1)))
+        while keep > 0 and count_tokens(str(rows[:keep])) > target:
+            keep = int(keep * 0.9)
+        return f"{rows[:keep]} ... ({len(rows) - keep} of {len(rows)} rows omitted to fit the token budget)"
+    text = str(value or "")
+    tokens = count_tokens(text)
+    target = tokens - excess - 32
+    if target <= 0:
+        return "(omitted to fit the token budget)"
+    cut = int(len(text) * target / tokens)
+    while cut > 0 and count_tokens(text[:cut]) > target:
+        cut = int(cut * 0.9)
+    return text[:cut] + " ... (truncated to fit the token budget)"
+
+SHRINKERS = {"drop": _drop, "sample_rows": _drop_sample_rows, "truncate": _truncate}
+
+def fit_prompt(prompt, values: dict, shrink: Sequence[Tuple[str, Union[str, Callable]]] = ()) -> Tuple[dict, int]:
+    """
+    Returns (values, prompt tokens) where the rendered prompt fits
+    prompt_allowance(), applying the (key, 'drop' | 'sample_rows' |
+    'truncate' | shrink(value, excess)) steps in order until it does.
+    Raises TokenBudgetExceeded if nothing left to shrink helps.
+    """
+    allowance = prompt_allowance()
+    tokens = count_tokens(prompt.format(**values))
+    original = tokens
+    for key, how in shrink:
+        if tokens <= allowance:
+            break
+        shrinker = how if callable(how) else SHRINKERS[how]
+        values = {**values, key: shrinker(values.get(key), tokens - allowance)}
+        tokens = count_tokens(prompt.format(**values))
+    budget = current_budget.get()
+    if tokens > allowance:
+        if budget is not None:
+            ledger.note(budget.tenant, "refused")
+        raise TokenBudgetExceeded(f"Prompt needs {tokens} tokens but only {max(allowance, 0)} remain in the budget.")
+    if tokens < original:
+        logger.info(f"Shrunk prompt from {original} to {tokens} tokens to fit the budget")
+        if budget is not None:
+            ledger.note(budget.tenant, "shrunk_prompts")
+    return values, tokens
+
+class UsageRecorder(BaseCallbackHandler):
+    """
+    Callback that charges each LLM call to the current request and tenant,
+    from the provider's usage metadata or, without it, the local count.
+    """
+
+    def __init__(self, model: Optional[str], estimated_prompt_tokens: int):
+        self.model = model
+        self.estimated_prompt_tokens = estimated_prompt_tokens
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens = completion_tokens = 0
+        text = ""
+        messages = [getattr(g, "message", None) for generations in response.generations for g in generations]
+        if messages and all(m is not None and m.response_metadata.get("llm_cache") == "hit" for m in messages):
+            # Answered from the LLM response cache: nothing was paid for
+            budget = current_budget.get()
+            ledger.note(budget.tenant if budget is not None else "anonymous", "cached_calls")
+            return
+        for generations in response.generations:
+            for generation in generations:
+                text += getattr(generation, "text", "") or ""
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        if not prompt_tokens:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+        if not prompt_tokens:
+            prompt_tokens, completion_tokens = self.estimated_prompt_tokens, count_tokens(text)
+        # Without a requested model, use the one the provider reports
+        model = self.model or (response.llm_output or {}).get("model_name") or next(
+            (m.response_metadata.get("model_name") for m in messages if m is not None and m.response_metadata.get("model_name")),
+            "unknown")
+        charge(model, prompt_tokens, completion_tokens)
+
+def charge(model: str, prompt_tokens: int, completion_tokens: int):
+    budget = current_budget.get()
+    tenant = budget.tenant if budget is not None else "anonymous"
+    if budget is not None:
+        budget.used += prompt_tokens + completion_tokens
+    ledger.record(tenant, model, prompt_tokens, completion_tokens)
+
+def budgeted(prompt, values: dict, model: Optional[str], shrink: Sequence[Tuple[str, Union[str, Callable]]] = ()):
+    """(values, config) for chain.invoke: the prompt fitted to the budget and a usage recorder attached."""
+    values, tokens = fit_prompt(prompt, values, shrink)
+    return values, {"callbacks": [UsageRecorder(model, tokens)]}
@@ -0,0 +1,27 @@
+from functools import lru_cache
+from src.cache.base import CacheBackend, NamespacedCache
+from src.config import settings
+from typing import Optional
+import hashlib
+import json
+
+@lru_cache(maxsize=1)
+def get_cache_backend() -> CacheBackend:
+    """
+    Process-wide cache backend selected by CACHE_BACKEND:
+    'memory' (default, per process) or 'sqlite' (one file shared by all
+    workers on the host).
+    """
+    if settings.CACHE_BACKEND == "sqlite":
+        from src.cache.sqlite import SQLiteCache
+        return SQLiteCache(settings.CACHE_PATH, settings.CACHE_MAX_BYTES)
+    from src.cache.memory import MemoryCache
+    return MemoryCache(settings.CACHE_MAX_BYTES)
+
+def get_cache(namespace: str, default_ttl: Optional[float] = None) -> NamespacedCache:
+    return NamespacedCache(get_cache_backend(), namespace, default_ttl)
+
+def make_key(*parts) -> str:
+    """Stable hash of arbitrary JSON-serialisable key parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
@@ -0,0 +1,69 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+import pickle
+
+_MISSING = object()
+
+class CacheBackend(ABC):
+    """
+    Minimal key/value cache interface shared by all backends.
+
+    Values are pickled on the way in, so callers can never mutate a cached
+    object in place and every backend measures size the same way.
+    """
+
+    @abstractmethod
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set_bytes(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raw = self.get_bytes(key)
+        if raw is None:
+            return default
+        return pickle.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_bytes(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+
+class NamespacedCache:
+    """View over a backend that prefixes keys and applies a default TTL."""
+
+    def __init__(self, backend: CacheBackend, namespace: str, default_ttl: Optional[float] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.backend.get(self._key(key), default)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.backend.set(self._key(key), value, ttl if ttl is not None else self.default_ttl)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(self._key(key))
+
+    def get_or_set(self, key: str, factory, ttl: Optional[float] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
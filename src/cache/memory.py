@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from src.cache.base import CacheBackend
+from typing import Optional
+import threading
+import time
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache bounded by total pickled size, with per-entry TTL."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set_bytes(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
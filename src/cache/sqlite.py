@@ -0,0 +1,133 @@
+from src.cache.base import CacheBackend
+from typing import Optional
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping (expiry purge + size check) runs every N writes rather than on each one
+MAINTENANCE_EVERY = 50
+# Reads only refresh the LRU timestamp when it is older than this, to keep
+# hot keys from turning every read into a write.
+TOUCH_INTERVAL_SECONDS = 5.0
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache stored in a local SQLite file in WAL mode, shared by every worker
+    process on the host: readers never block each other or the writer.
+    Bounded by total value size (least-recently-used entries are evicted
+    first) and by per-entry TTL.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed ON cache_entries (accessed_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return None
+            if now - row[2] > TOUCH_INTERVAL_SECONDS:
+                conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            self.hits += 1
+            return row[0]
+        except sqlite3.Error as e:
+            # A busy or broken cache file degrades to a miss, never to a failed request
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return None
+
+    def set_bytes(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), now + ttl if ttl else None, now),
+            )
+            conn.commit()
+            with self._lock:
+                self._writes += 1
+                run_maintenance = self._writes % MAINTENANCE_EVERY == 1
+            if run_maintenance:
+                self._maintain(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+    def _maintain(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total > self.max_bytes:
+            # Evict down to 90% so we don't run this on every following write
+            excess = total - int(self.max_bytes * 0.9)
+            freed = 0
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM cache_entries ORDER BY accessed_at"):
+                victims.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            conn.executemany("DELETE FROM cache_entries WHERE key = ?", victims)
+        conn.commit()
+
+    def delete(self, key: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        conn.commit()
+
+    def clear(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries")
+        conn.commit()
+
+    def stats(self):
+        conn = self._conn()
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
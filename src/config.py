@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Dict, List, Literal
 
 class Settings(BaseSettings):
     """Application settings configuration."""
@@ -12,6 +13,151 @@ class Settings(BaseSettings):
     # Database - Pointing to the new sales.db
     DATABASE_URL: str = "sqlite:///./sales.db"
     
+    # Workload log / index advisor
+    WORKLOAD_LOG_ENABLED: bool = True
+    WORKLOAD_LOG_PATH: str = "./workload_log.db"
+    WORKLOAD_LOG_MAX_ENTRIES: int = 50000
+    INDEX_ADVISOR_ALLOW_APPLY: bool = False
+    # Plans of statements slower than this are kept for /admin/slow-plans (0 = off)
+    SLOW_PLAN_THRESHOLD_MS: float = 1000.0
+    SLOW_PLAN_STORE_SIZE: int = 100
+    
+    # Cache (schema text, generated SQL, query results)
+    CACHE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    CACHE_PATH: str = "./cache.db"
+    CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    CACHE_SCHEMA_TTL: int = 600
+    CACHE_SQL_TTL: int = 3600
+    CACHE_RESULT_TTL: int = 60
+
+    # Persistent LLM answer cache (own SQLite file, shared across restarts and workers);
+    # per request, X-LLM-Cache: refresh | bypass skips it
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "./llm_cache.db"
+    LLM_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    LLM_CACHE_TTL: int = 7 * 24 * 3600
+    
+    # Admission control (limits apply to graph runs, keyed by provider and "provider/model")
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_DEFAULT_CONCURRENCY: int = 8
+    ADMISSION_PROVIDER_CONCURRENCY: Dict[str, int] = {"openai": 16, "gemini": 16}
+    ADMISSION_MODEL_CONCURRENCY: Dict[str, int] = {}
+    ADMISSION_PROVIDER_RATE: Dict[str, float] = {}  # LLM calls/second, 0 or missing = unlimited
+    ADMISSION_MODEL_RATE: Dict[str, float] = {}
+    ADMISSION_BURST_SECONDS: float = 2.0
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0
+    
+    # LLM routing: 'single' uses the requested provider only; 'hedged' sends a
+    # duplicate request to the other provider when the primary is slower than its p95
+    LLM_ROUTING: Literal["single", "hedged"] = "single"
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 5.0
+    LLM_PROFILE_WINDOW: int = 200
+    LLM_PROFILE_MIN_SAMPLES: int = 20
+    LLM_ERROR_RATE_THRESHOLD: float = 0.5
+    LLM_SKIP_SECONDS: float = 30.0
+
+    # Record / replay of LLM answers for offline and reproducible runs: 'record'
+    # appends every provider answer to the cassette, 'replay' serves only from it
+    LLM_CASSETTE_MODE: Literal["off", "record", "replay"] = "off"
+    LLM_CASSETTE_PATH: str = "cassettes/llm.jsonl"
+    LLM_REPLAY_LATENCY_MS: float = 0.0
+    LLM_REPLAY_LATENCY_JITTER_MS: float = 0.0
+    
+    # Model tiers: simple questions -> fast model, complex ones -> strong model.
+    # An explicit model_name on the request always overrides the tier.
+    MODEL_TIERING_ENABLED: bool = True
+    MODEL_TIERS: Dict[str, Dict[str, str]] = {
+        "openai": {"fast": "gpt-4o-mini", "strong": "gpt-4o"},
+        "gemini": {"fast": "gemini-2.5-flash-lite", "strong": "gemini-2.5-flash"},
+    }
+    COMPLEXITY_STRONG_THRESHOLD: float = 3.0
+    SUMMARY_FAST_TIER_MAX_ROWS: int = 20
+    
+    # Schema text in prompts: 'compact' = table(col:type{enum values} "description", ...)
+    SCHEMA_PROMPT_FORMAT: Literal["compact", "ddl"] = "compact"
+    SCHEMA_PROMPT_TOKEN_BUDGET: int = 1500
+    SCHEMA_ENUM_MAX_VALUES: int = 12
+    TOKENIZER_ENCODING: str = "o200k_base"  # tiktoken encoding, or 'heuristic'
+    
+    # Scalar / small group-by results are phrased from a template instead of an LLM summary
+    TEMPLATED_ANSWERS_ENABLED: bool = True
+    TEMPLATED_ANSWER_MAX_ROWS: int = 12
+    
+    # Rule-based fast path for the common sales_data questions (no LLM for SQL).
+    # Confidence is the share of question words the grammar understood.
+    RULE_PARSER_ENABLED: bool = True
+    RULE_PARSER_MIN_CONFIDENCE: float = 1.0
+    
+    # Few-shot examples: successful question/SQL pairs, append-only JSONL
+    EXAMPLE_STORE_ENABLED: bool = True
+    EXAMPLE_STORE_PATH: str = "./sql_examples.jsonl"
+    EXAMPLE_STORE_MAX_ENTRIES: int = 5000
+    EXAMPLE_TOP_K: int = 3
+    EXAMPLE_MIN_SIMILARITY: float = 0.3
+    
+    # Per-datasource pools for onboarded tables (table_id on /query and /qna)
+    DATASOURCE_MAX_POOLS: int = 16
+    DATASOURCE_IDLE_SECONDS: float = 300.0
+    DATASOURCE_POOL_SIZE: int = 5
+    DATASOURCE_MAX_OVERFLOW: int = 5
+    
+    # Read replicas for the default datasource; read-only SQL is balanced across them
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 30.0
+    REPLICA_HEALTH_INTERVAL_SECONDS: float = 10.0
+    
+    # /api/v1/export: rows per fetch / Parquet row group; how long answer SQL stays exportable
+    # (answer_ids are in the cache backend: use CACHE_BACKEND=sqlite with several workers)
+    EXPORT_BATCH_ROWS: int = 10000
+    ANSWER_TTL_SECONDS: int = 86400
+
+    # Result handles: /qna answers with the first RESULT_PAGE_SIZE rows, the rest
+    # is paged from /api/v1/results/{handle}; big results are spilled to disk
+    RESULT_PAGE_SIZE: int = 500
+    RESULT_TTL_SECONDS: int = 1800
+    RESULT_MEMORY_MAX_ROWS: int = 5000
+    RESULT_SPILL_DIR: str = "./result_spill"
+    
+    # Multi-turn sessions (session_id): LangGraph checkpoints, idle expiry, caps
+    SESSION_DB_PATH: str = "./sessions.db"
+    SESSION_TTL_SECONDS: int = 3600
+    SESSION_MAX_SESSIONS: int = 1000
+    SESSION_MAX_TURNS: int = 10
+    SESSION_MAX_RESULT_ROWS: int = 5000  # larger results are not kept for local follow-ups
+    
+    # /api/v1/onboard-tables: connections / workers reflecting tables in parallel
+    ONBOARD_CONCURRENCY: int = 8
+    
+    # Schema drift re-sync for onboarded tables (0 = only via /admin/schema-sync)
+    SCHEMA_SYNC_INTERVAL_SECONDS: float = 900.0
+    SCHEMA_SYNC_CONCURRENCY: int = 8  # databases checked in parallel
+    
+    # Resilience: retries for transient LLM / database failures, per-dependency circuit breakers
+    REQUEST_DEADLINE_SECONDS: float = 60.0  # retries never wait past this
+    RETRY_MAX_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY_SECONDS: float = 0.2
+    RETRY_MAX_DELAY_SECONDS: float = 2.0
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RESET_SECONDS: float = 30.0
+    
+    # Token budgets (0 = unlimited); the per-key budget is per API key (X-API-Key) per window
+    LLM_MAX_PROMPT_TOKENS: int = 32000
+    TOKEN_BUDGET_PER_REQUEST: int = 60000
+    TOKEN_BUDGET_PER_KEY: int = 0
+    TOKEN_BUDGET_KEY_OVERRIDES: Dict[str, int] = {}  # tenant ('key:<sha256 prefix>' or 'anonymous') -> budget
+    TOKEN_BUDGET_WINDOW_SECONDS: int = 86400
+    TOKEN_BUDGET_COMPLETION_RESERVE: int = 1024  # kept free for the answer
+    
+    # Responses: gzip / brotli above this many bytes (0 = never compress)
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 4
+    
+    # Startup
+    WARMUP_ON_STARTUP: bool = False
+    
     # App Config
     APP_TITLE: str = "GenAI Text-to-SQL API (Sales Data)"
     APP_VERSION: str = "1.0.0"
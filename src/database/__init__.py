@@ -1,13 +1,62 @@
+from functools import lru_cache
 from src.config import settings
-from src.database.sqlite import get_db as get_sqlite_db
-from src.database.postgres import get_postgres_db
+from typing import Optional
 
-def get_db():
+def get_db(table_id: Optional[str] = None):
     """
     Factory function to get the appropriate database connection 
-    based on the configured DATABASE_URL.
+    based on the configured DATABASE_URL, or for an onboarded table_id
+    (see pools.DatasourcePools). Raises KeyError for an unknown table_id.
     """
+    if table_id:
+        from src.database.pools import pools
+        return pools.get(table_id)
+    return _get_default_db()
+
+def datasource_id(table_id: Optional[str] = None) -> str:
+    """Name a datasource goes by in caches, coalescing keys and the workload log."""
+    return table_id or "default"
+
+@lru_cache(maxsize=1)
+def _get_default_db():
+    # The SQLDatabase (engine + reflected tables) is created once per process
     if "sqlite" in settings.DATABASE_URL:
+        from src.database.sqlite import get_db as get_sqlite_db
         return get_sqlite_db()
     else:
+        from src.database.postgres import get_postgres_db
         return get_postgres_db()
+
+def get_schema_info(table_id: Optional[str] = None) -> str:
+    """
+    Schema text for prompts. By default this is the compact, token-budgeted
+    form from schema_serializer; SCHEMA_PROMPT_FORMAT='ddl' restores
+    SQLDatabase.get_table_info() (CREATE TABLE + sample rows). Rendering
+    queries the database, so the text is cached for CACHE_SCHEMA_TTL.
+    """
+    from src.cache import get_cache, make_key
+    cache = get_cache("schema", settings.CACHE_SCHEMA_TTL)
+    key = make_key(settings.DATABASE_URL, datasource_id(table_id),
+                   settings.SCHEMA_PROMPT_FORMAT, settings.SCHEMA_PROMPT_TOKEN_BUDGET)
+    return cache.get_or_set(key, lambda: render_schema_text(get_db(table_id)))
+
+def render_schema_text(db, token_budget: Optional[int] = None) -> str:
+    if settings.SCHEMA_PROMPT_FORMAT == "ddl":
+        return db.get_table_info()
+    from src.database.schema_serializer import describe_tables, serialize_schema
+    tables = describe_tables(db._engine, db.get_usable_table_names(), settings.SCHEMA_ENUM_MAX_VALUES)
+    return serialize_schema(tables, token_budget or settings.SCHEMA_PROMPT_TOKEN_BUDGET)
+
+def schema_shrinker(table_id: Optional[str] = None):
+    """
+    Shrink step for the schema in token_budget.fit_prompt: the DDL form loses
+    its sample rows, the compact form is rendered again (uncached) at a
+    budget `excess` tokens below its current size.
+    """
+    if settings.SCHEMA_PROMPT_FORMAT == "ddl":
+        return "sample_rows"
+
+    def shrink(schema, excess: int) -> str:
+        from src.tokens import count_tokens
+        return render_schema_text(get_db(table_id), max(1, count_tokens(schema or "") - excess))
+    return shrink
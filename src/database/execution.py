@@ -0,0 +1,89 @@
+from sqlalchemy import text
+from src.agent.resilience import is_transient
+from src.cache import get_cache, make_key
+from src.config import settings
+from src.database.plans import note_execution, profile_query
+from src.database.replicas import get_replica_set, is_read_only
+from src.database.workload import record_query
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def execute_sql(db, sql: str, datasource: str = "default", use_cache: bool = True):
+    """
+    Runs a statement on the SQLDatabase's engine and returns (columns, rows)
+    where rows is a list of dicts. Every execution is timed and recorded in
+    the workload log used by the index advisor.
+    Results are cached per (datasource, sql) for CACHE_RESULT_TTL seconds.
+    Read-only statements on the default datasource go to a read replica
+    when DATABASE_REPLICA_URLS is set.
+    """
+    keys, rows, _ = _execute(db, sql, datasource, use_cache, explain=False)
+    return keys, rows
+
+def execute_sql_with_plan(db, sql: str, datasource: str = "default", use_cache: bool = True):
+    """
+    execute_sql plus the analyzed plan of a read-only statement (None for
+    anything else), taken on the same engine the statement was routed to.
+    """
+    return _execute(db, sql, datasource, use_cache, explain=True)
+
+def _execute(db, sql: str, datasource: str, use_cache: bool, explain: bool):
+    cache = get_cache("results", settings.CACHE_RESULT_TTL)
+    key = make_key(str(db._engine.url), datasource, sql.strip())
+    read_only = is_read_only(sql)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            keys, rows = cached
+            plan = None
+            if explain and read_only:
+                _, plan = _routed(db, sql, datasource, lambda engine: profile_query(engine, sql))
+            return keys, rows, plan
+
+    started = time.perf_counter()
+    engine, (keys, rows) = _routed(db, sql, datasource, lambda engine: _fetch(engine, sql))
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    record_query(sql, duration_ms, len(rows), datasource)
+    plan = None
+    if read_only:
+        if explain:
+            plan = profile_query(engine, sql, duration_ms, len(rows))
+        # One slow-plan entry per execution, reusing the analyzed plan when there is one
+        note_execution(engine, sql, datasource, duration_ms, plan if plan and "error" not in plan else None)
+    if use_cache:
+        cache.set(key, (keys, rows))
+    return keys, rows, plan
+
+def _routed(db, sql: str, datasource: str, run):
+    """(engine, run(engine)) on a read replica for read-only statements on the default datasource, else the primary."""
+    replicas = get_replica_set() if datasource == "default" else None
+    if replicas is not None and is_read_only(sql):
+        return _run_on_replica(replicas, db._engine, run)
+    return db._engine, run(db._engine)
+
+def _fetch(engine, sql: str):
+    with engine.connect() as connection:
+        result_proxy = connection.execute(text(sql))
+        keys = list(result_proxy.keys())
+        rows = [dict(zip(keys, row)) for row in result_proxy.fetchall()]
+    return keys, rows
+
+def _run_on_replica(replicas, primary_engine, run):
+    with replicas.acquire() as replica:
+        if replica is None:
+            return primary_engine, run(primary_engine)
+        try:
+            return replica.engine, run(replica.engine)
+        except Exception as replica_error:
+            # Only a lost / unreachable replica is worth the primary's time; a
+            # bad statement would fail there just the same
+            if not is_transient(replica_error):
+                raise
+            # Retry on the primary; only if it succeeds was the replica at fault
+            logger.warning(f"Replica {replica.name} failed, retrying on primary: {replica_error}")
+            result = run(primary_engine)
+            replica.mark_failed(replica_error)
+            return primary_engine, result
@@ -0,0 +1,162 @@
+from sqlalchemy import text
+from src.config import settings
+from src.responses import dumps
+from typing import Iterator
+import csv
+import io
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Streaming exports of full query results. Every writer pulls rows in
+# batches of EXPORT_BATCH_ROWS from a streaming cursor (server-side on
+# Postgres, fetchmany on SQLite) and yields encoded chunks, so memory stays
+# flat however many rows the query returns.
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _batches(engine, sql: str):
+    """Yields (columns, rows) batches from a streaming cursor."""
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, max_row_buffer=settings.EXPORT_BATCH_ROWS
+        ).execute(text(sql))
+        columns = list(result.keys())
+        empty = True
+        for rows in result.partitions(settings.EXPORT_BATCH_ROWS):
+            empty = False
+            yield columns, rows
+        if empty:
+            yield columns, []
+
+def stream_csv(engine, sql: str) -> Iterator[bytes]:
+    if engine.dialect.name == "postgresql":
+        yield from _stream_pg_copy(engine, sql)
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header = False
+    for columns, rows in _batches(engine, sql):
+        if not header:
+            writer.writerow(columns)
+            header = True
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+def stream_ndjson(engine, sql: str) -> Iterator[bytes]:
+    for columns, rows in _batches(engine, sql):
+        if rows:
+            yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_parquet(engine, sql: str) -> Iterator[bytes]:
+    """One Parquet row group per batch. Needs pyarrow (optional dependency)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for columns, rows in _batches(engine, sql):
+            records = [dict(zip(columns, row)) for row in rows]
+            if writer is None:
+                schema = pa.Table.from_pylist(records).schema if records else pa.schema([])
+                # Columns that are all NULL in the first batch have no type yet
+                schema = pa.schema([
+                    pa.field(c, pa.string()) if c not in schema.names or pa.types.is_null(schema.field(c).type)
+                    else schema.field(c) for c in columns
+                ])
+                writer = pq.ParquetWriter(sink, schema)
+            if records:
+                writer.write_table(pa.Table.from_pylist(records, schema=writer.schema))
+            yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+class _QueueWriter:
+    """File-like target for COPY that hands chunks to the streaming response."""
+
+    def __init__(self, chunks: "queue.Queue", cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def put(self, item):
+        # Bounded queue: COPY blocks (back-pressure) while the client is slow
+        while True:
+            if self.cancelled.is_set():
+                raise IOError("Export cancelled")
+            try:
+                self.chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data):
+        self.put(data if isinstance(data, bytes) else data.encode())
+
+_DONE = object()
+
+def _stream_pg_copy(engine, sql: str) -> Iterator[bytes]:
+    """COPY (query) TO STDOUT: Postgres renders the CSV itself, the fastest path."""
+    chunks: "queue.Queue" = queue.Queue(maxsize=64)
+    cancelled = threading.Event()
+    statement = f"COPY ({sql.strip().rstrip(';')}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+    def run():
+        target = _QueueWriter(chunks, cancelled)
+        raw = engine.raw_connection()
+        try:
+            with raw.cursor() as cursor:
+                cursor.copy_expert(statement, target, size=1 << 16)
+            target.put(_DONE)
+        except Exception as e:
+            raw.rollback()
+            try:
+                target.put(e)
+            except IOError:
+                pass  # nobody is listening any more
+        finally:
+            raw.close()
+
+    worker = threading.Thread(target=run, name="pg-copy-export", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Client went away (or we finished): stop the COPY if it is still writing
+        cancelled.set()
+
+WRITERS = {"csv": stream_csv, "ndjson": stream_ndjson, "parquet": stream_parquet}
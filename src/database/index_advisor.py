@@ -0,0 +1,209 @@
+from sqlalchemy import inspect, text
+from src.database.workload import load_workload, extract_columns
+from typing import Dict, List, Optional
+import json
+import logging
+import re
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+MAX_COMPOSITE_WIDTH = 3
+# SQLite's EXPLAIN QUERY PLAN has no costs; an indexed SEARCH is assumed to
+# touch this fraction of the table (the planner's own default for equality).
+SQLITE_SEARCH_SELECTIVITY = 0.1
+
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?', re.IGNORECASE)
+
+def index_name(table: str, columns) -> str:
+    return f"ix_{table}_{'_'.join(columns)}"[:63]
+
+def _column_list(columns) -> str:
+    return ", ".join(f'"{c}"' for c in columns)
+
+def _existing_index_prefixes(inspector, table: str) -> List[tuple]:
+    prefixes = []
+    for ix in inspector.get_indexes(table):
+        cols = tuple(c for c in ix.get("column_names", []) if c)
+        prefixes.append(cols)
+    pk = inspector.get_pk_constraint(table).get("constrained_columns") or []
+    if pk:
+        prefixes.append(tuple(pk))
+    return prefixes
+
+def _already_covered(columns: tuple, existing: List[tuple]) -> bool:
+    return any(ix[:len(columns)] == columns for ix in existing)
+
+def _candidates_for(cols: Dict[str, List[str]]) -> List[tuple]:
+    """
+    Single-column candidates for every filter/join/group key, plus composites
+    that follow the usual equality-first, range-last ordering.
+    """
+    candidates = []
+    for name in cols["equality"] + cols["range"] + cols["join"] + cols["group_by"]:
+        if (name,) not in candidates:
+            candidates.append((name,))
+
+    equality = cols["equality"] + [c for c in cols["join"] if c not in cols["equality"]]
+    if len(equality) > 1 or (equality and cols["range"]):
+        composite = tuple((equality + cols["range"][:1])[:MAX_COMPOSITE_WIDTH])
+        if composite not in candidates:
+            candidates.append(composite)
+    if equality and cols["group_by"]:
+        composite = tuple(dict.fromkeys(equality + cols["group_by"]))[:MAX_COMPOSITE_WIDTH]
+        if len(composite) > 1 and composite not in candidates:
+            candidates.append(composite)
+    return candidates
+
+def _postgres_cost(connection, sql: str) -> float:
+    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0]["Plan"]["Total Cost"])
+
+def _sqlite_cost(conn: sqlite3.Connection, sql: str, row_count: int) -> float:
+    cost = 0.0
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall():
+        detail = row[-1]
+        if detail.startswith("SCAN") and "COVERING INDEX" not in detail:
+            cost += row_count
+        elif detail.startswith("SCAN"):
+            cost += row_count * 0.5
+        elif detail.startswith("SEARCH"):
+            cost += max(1.0, row_count * SQLITE_SEARCH_SELECTIVITY)
+        if "TEMP B-TREE" in detail:
+            cost += row_count * 0.2
+    return cost
+
+def _has_hypopg(engine) -> bool:
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'")
+        ).scalar() is not None
+
+def _evaluate_postgres(engine, table: str, columns: tuple, statements: List[str]) -> Dict:
+    """
+    Compares plan costs with and without the candidate index, using a hypopg
+    hypothetical index so nothing is built (or locked) on the live database.
+    """
+    ddl = f'CREATE INDEX ON "{table}" ({_column_list(columns)})'
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            before = [_postgres_cost(connection, sql) for sql in statements]
+            connection.execute(text("SELECT * FROM hypopg_create_index(:ddl)"), {"ddl": ddl})
+            after = [_postgres_cost(connection, sql) for sql in statements]
+            connection.execute(text("SELECT hypopg_reset()"))
+        finally:
+            trans.rollback()
+    return {"before": before, "after": after}
+
+def _evaluate_sqlite(engine, table: str, columns: tuple, statements: List[str]) -> Dict:
+    """
+    Builds the candidate index on an in-memory copy of the database, so the
+    live file is only read (by the backup) and never write-locked.
+    """
+    source = sqlite3.connect(f"file:{engine.url.database}?mode=ro", uri=True)
+    conn = sqlite3.connect(":memory:")
+    try:
+        source.backup(conn)
+        row_count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        before = [_sqlite_cost(conn, sql, row_count) for sql in statements]
+        conn.execute(f'CREATE INDEX "{index_name(table, columns)}" ON "{table}" ({_column_list(columns)})')
+        after = [_sqlite_cost(conn, sql, row_count) for sql in statements]
+    finally:
+        conn.close()
+        source.close()
+    return {"before": before, "after": after}
+
+def recommend_indexes(engine, datasource: Optional[str] = None, top_n: int = 10, min_benefit_pct: float = 5.0) -> List[Dict]:
+    """
+    Builds index recommendations from the recorded workload.
+
+    For each table referenced by the logged queries, candidate single and
+    composite indexes are derived from filter, join and group-by columns and
+    scored by the EXPLAIN cost reduction they give the statements that use
+    them, weighted by how often those statements ran.
+
+    On Postgres candidates are evaluated as hypothetical indexes, which
+    needs the hypopg extension (CREATE EXTENSION hypopg). Without it no
+    recommendations are made: building real indexes to cost them would scan
+    and lock the live tables.
+    """
+    if engine.dialect.name == "postgresql" and not _has_hypopg(engine):
+        logger.warning("hypopg extension is not installed; index recommendations are unavailable on Postgres")
+        return []
+    inspector = inspect(engine)
+    tables = {t.lower(): t for t in inspector.get_table_names()}
+    workload = load_workload(datasource)
+
+    # (table, columns) -> list of (sample_sql, calls)
+    candidates: Dict[tuple, List[tuple]] = {}
+    column_cache: Dict[str, List[str]] = {}
+    existing_cache: Dict[str, List[tuple]] = {}
+
+    for entry in workload:
+        referenced = {m.lower() for m in _TABLE_REF.findall(entry["sample_sql"])}
+        for ref in referenced:
+            table = tables.get(ref)
+            if not table:
+                continue
+            if table not in column_cache:
+                column_cache[table] = [c["name"] for c in inspector.get_columns(table)]
+                existing_cache[table] = _existing_index_prefixes(inspector, table)
+            cols = extract_columns(entry["sample_sql"], column_cache[table])
+            for candidate in _candidates_for(cols):
+                if _already_covered(candidate, existing_cache[table]):
+                    continue
+                candidates.setdefault((table, candidate), []).append((entry["sample_sql"], entry["calls"]))
+
+    evaluate = _evaluate_postgres if engine.dialect.name == "postgresql" else _evaluate_sqlite
+    recommendations = []
+    for (table, columns), uses in candidates.items():
+        statements = [sql for sql, _ in uses]
+        try:
+            costs = evaluate(engine, table, columns, statements)
+        except Exception as e:
+            logger.warning(f"Could not evaluate index {columns} on {table}: {e}")
+            continue
+
+        weighted_before = sum(b * calls for b, (_, calls) in zip(costs["before"], uses))
+        weighted_after = sum(a * calls for a, (_, calls) in zip(costs["after"], uses))
+        if weighted_before <= 0:
+            continue
+        benefit_pct = (weighted_before - weighted_after) / weighted_before * 100
+        if benefit_pct < min_benefit_pct:
+            continue
+
+        recommendations.append({
+            "table": table,
+            "columns": list(columns),
+            "index_name": index_name(table, columns),
+            "estimated_cost_before": round(weighted_before, 2),
+            "estimated_cost_after": round(weighted_after, 2),
+            "benefit_pct": round(benefit_pct, 1),
+            "query_count": sum(calls for _, calls in uses),
+            "ddl": create_index_sql(engine.dialect.name, table, columns),
+        })
+
+    # Prefer the biggest win; on ties prefer the narrower index
+    recommendations.sort(key=lambda r: (-r["benefit_pct"] * r["query_count"], len(r["columns"])))
+    return recommendations[:top_n]
+
+def create_index_sql(dialect: str, table: str, columns) -> str:
+    name = index_name(table, columns)
+    cols = _column_list(columns)
+    if dialect == "postgresql":
+        return f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" ({cols})'
+    return f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({cols})'
+
+def apply_index(engine, table: str, columns) -> str:
+    """
+    Creates the index. On Postgres this runs CONCURRENTLY, which cannot be
+    inside a transaction block, hence the AUTOCOMMIT connection.
+    """
+    ddl = create_index_sql(engine.dialect.name, table, columns)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(ddl))
+    logger.info(f"Applied index: {ddl}")
+    return ddl
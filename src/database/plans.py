@@ -0,0 +1,211 @@
+from collections import Counter, OrderedDict
+from sqlalchemy import text
+from src.config import settings
+from src.database.workload import normalize_sql, sql_fingerprint
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Execution plans in one shape for both dialects: a flat list of plan nodes
+# (depth-first, with depth) carrying scan type, relation, index, estimated
+# vs actual rows and time, plus counts per scan category and warnings for
+# the usual suspects (full scans, bad row estimates, temp sorts).
+# Postgres: EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) in a rolled-back
+# transaction. SQLite: EXPLAIN QUERY PLAN (no estimates) plus a timed run.
+
+_SCAN_CATEGORIES = {
+    "Seq Scan": "full_scan",
+    "Parallel Seq Scan": "full_scan",
+    "Index Scan": "index_scan",
+    "Bitmap Index Scan": "index_scan",
+    "Bitmap Heap Scan": "index_scan",
+    "Index Only Scan": "index_only_scan",
+}
+_SQLITE_ACCESS = re.compile(
+    r"^(SCAN|SEARCH)\s+(?:TABLE\s+)?(\w+)(?:\s+AS\s+\w+)?"
+    r"(?:\s+USING\s+(COVERING\s+)?(?:INDEX\s+(\w+)|(INTEGER PRIMARY KEY)))?"
+)
+# Estimated vs actual rows further apart than this factor are flagged
+MISESTIMATE_FACTOR = 10
+
+def _postgres_nodes(plan: dict, depth: int, nodes: List[dict]):
+    loops = plan.get("Actual Loops") or 1
+    actual_rows = plan.get("Actual Rows")
+    node = {
+        "node": plan["Node Type"],
+        "relation": plan.get("Relation Name"),
+        "index": plan.get("Index Name"),
+        "depth": depth,
+        "estimated_rows": plan.get("Plan Rows"),
+        "actual_rows": actual_rows * loops if actual_rows is not None else None,
+        "loops": plan.get("Actual Loops"),
+        "time_ms": round(plan["Actual Total Time"] * loops, 3) if "Actual Total Time" in plan else None,
+        "shared_hit_blocks": plan.get("Shared Hit Blocks"),
+        "shared_read_blocks": plan.get("Shared Read Blocks"),
+    }
+    if "Sort Method" in plan:
+        node["detail"] = f"{plan['Sort Method']} ({plan.get('Sort Space Type', 'Memory').lower()})"
+    nodes.append(node)
+    for child in plan.get("Plans", []):
+        _postgres_nodes(child, depth + 1, nodes)
+
+def _explain_postgres(engine, sql: str, analyze: bool) -> dict:
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    with engine.connect() as connection:
+        trans = connection.begin()
+        try:
+            raw = connection.execute(text(f"EXPLAIN ({options}) {sql}")).scalar()
+        finally:
+            # ANALYZE really runs the statement: never keep anything it did
+            trans.rollback()
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    nodes: List[dict] = []
+    _postgres_nodes(raw[0]["Plan"], 0, nodes)
+    return {
+        "dialect": "postgresql",
+        "analyzed": analyze,
+        "planning_ms": raw[0].get("Planning Time"),
+        "execution_ms": raw[0].get("Execution Time"),
+        "nodes": nodes,
+    }
+
+def _sqlite_node(detail: str, depth: int) -> dict:
+    node = {"node": detail.split(" ", 1)[0], "relation": None, "index": None, "depth": depth,
+            "estimated_rows": None, "actual_rows": None, "detail": detail}
+    match = _SQLITE_ACCESS.match(detail)
+    if match:
+        access, table, covering, index, rowid = match.groups()
+        node["relation"] = table
+        node["index"] = index or (rowid and "INTEGER PRIMARY KEY")
+        if covering:
+            node["node"] = "Index Only Scan"
+        elif index or rowid:
+            node["node"] = "Index Scan"
+        else:
+            node["node"] = "Seq Scan" if access == "SCAN" else "Search"
+    elif "TEMP B-TREE" in detail:
+        node["node"] = "Temp B-Tree"
+    return node
+
+def _explain_sqlite(engine, sql: str, analyze: bool) -> dict:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        execution_ms = row_count = None
+        if analyze:
+            started = time.perf_counter()
+            row_count = len(connection.exec_driver_sql(sql).fetchall())
+            execution_ms = round((time.perf_counter() - started) * 1000, 3)
+    depths = {0: -1}
+    nodes = []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        nodes.append(_sqlite_node(detail, depths[node_id]))
+    return {
+        "dialect": "sqlite",
+        "analyzed": analyze,
+        "planning_ms": None,
+        "execution_ms": execution_ms,
+        "rows_returned": row_count,
+        "nodes": nodes,
+    }
+
+def _summarize(plan: dict) -> dict:
+    nodes = plan["nodes"]
+    plan["scan_types"] = dict(Counter(_SCAN_CATEGORIES[n["node"]] for n in nodes if n["node"] in _SCAN_CATEGORIES))
+    warnings = []
+    for n in nodes:
+        if n["node"] in ("Seq Scan", "Parallel Seq Scan") and n["relation"]:
+            rows = n["actual_rows"] if n["actual_rows"] is not None else n["estimated_rows"]
+            warnings.append(f"Full scan of {n['relation']}" + (f" ({rows} rows)" if rows is not None else ""))
+        if n["node"] == "Temp B-Tree":
+            warnings.append(f"Sort without an index: {n['detail']}")
+        if n["node"] == "Sort" and "(disk)" in (n.get("detail") or ""):
+            warnings.append(f"Sort spilled to disk: {n['detail']}")
+        estimated, actual = n["estimated_rows"], n["actual_rows"]
+        if estimated and actual and max(estimated, actual) / min(estimated, actual) >= MISESTIMATE_FACTOR:
+            warnings.append(f"{n['node']}{' on ' + n['relation'] if n['relation'] else ''}: "
+                            f"estimated {estimated} rows, got {actual}")
+    plan["warnings"] = warnings
+    return plan
+
+def explain_query(engine, sql: str, analyze: bool = True) -> dict:
+    """
+    Normalized plan of a read-only statement. With analyze the statement is
+    executed (Postgres EXPLAIN ANALYZE, or a timed run on SQLite) to get
+    actual rows and times.
+    """
+    if engine.dialect.name == "postgresql":
+        plan = _explain_postgres(engine, sql, analyze)
+    else:
+        plan = _explain_sqlite(engine, sql, analyze)
+    return _summarize(plan)
+
+class SlowPlanStore:
+    """Plans of the slowest recent statements, one entry per SQL template, bounded LRU."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, datasource: str, duration_ms: float, plan: dict):
+        key = sql_fingerprint(normalize_sql(sql))
+        with self._lock:
+            entry = self._entries.pop(key, None) or {"count": 0, "max_duration_ms": 0.0}
+            entry.update({
+                "sql": sql,
+                "datasource": datasource,
+                "duration_ms": round(duration_ms, 1),
+                "max_duration_ms": round(max(entry["max_duration_ms"], duration_ms), 1),
+                "count": entry["count"] + 1,
+                "last_seen": time.time(),
+                "plan": plan,
+            })
+            self._entries[key] = entry
+            while len(self._entries) > settings.SLOW_PLAN_STORE_SIZE:
+                self._entries.popitem(last=False)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda e: e["max_duration_ms"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+slow_plans = SlowPlanStore()
+
+def note_execution(engine, sql: str, datasource: str, duration_ms: float, plan: Optional[dict] = None):
+    """
+    Keeps the plan of a statement that took SLOW_PLAN_THRESHOLD_MS or more.
+    Without a plan at hand only a plain EXPLAIN is run, so a slow statement
+    is not executed again.
+    """
+    if not settings.SLOW_PLAN_THRESHOLD_MS or duration_ms < settings.SLOW_PLAN_THRESHOLD_MS:
+        return
+    try:
+        slow_plans.record(sql, datasource, duration_ms, plan or explain_query(engine, sql, analyze=False))
+    except Exception as e:
+        logger.warning(f"Could not capture the plan of a slow query: {e}")
+
+def profile_query(engine, sql: str, duration_ms: Optional[float] = None, row_count: Optional[int] = None) -> dict:
+    """
+    Analyzed plan for an answer's `explain` flag; a failure is reported in
+    the plan, not raised. On SQLite the timing of the run that produced the
+    answer is used when given, so the statement is not executed again;
+    Postgres has to run it once more under EXPLAIN ANALYZE.
+    """
+    measured = duration_ms is not None and engine.dialect.name != "postgresql"
+    try:
+        plan = explain_query(engine, sql, analyze=not measured)
+    except Exception as e:
+        logger.warning(f"EXPLAIN failed for {sql}: {e}")
+        return {"error": str(e)}
+    if measured:
+        plan.update(analyzed=True, execution_ms=round(duration_ms, 3), rows_returned=row_count)
+    return plan
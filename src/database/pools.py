@@ -0,0 +1,163 @@
+from collections import OrderedDict
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from src.config import settings
+from src.database.registry import resolve_table
+from typing import Dict
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def _display_url(url: str) -> str:
+    return make_url(url).render_as_string(hide_password=True)
+
+class DatasourcePools:
+    """
+    One engine (connection pool) per datasource URL, shared by every
+    onboarded table_id on that database; each table_id gets its own
+    SQLDatabase over it, limited to its tables.
+
+    Pools are created on first use, at most max_pools are kept (least
+    recently used is disposed first) and any pool idle for idle_seconds is
+    disposed by a background sweeper, so cold databases hold no
+    connections. Reflection talks to the database, so it runs outside the
+    shared lock, one at a time per table_id: a slow or unreachable
+    datasource only holds up its own tables. A table is reflected again if
+    its registry entry's URL changes.
+    """
+
+    def __init__(self, max_pools: int, idle_seconds: float):
+        self.max_pools = max_pools
+        self.idle_seconds = idle_seconds
+        self._pools: "OrderedDict[str, dict]" = OrderedDict()  # url -> engine, last_used
+        self._tables: Dict[str, dict] = {}  # table_id -> url, db
+        self._table_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self.created = 0
+        self.evicted = 0
+
+    def get(self, table_id: str):
+        datasource = resolve_table(table_id)
+        if datasource is None:
+            raise KeyError(f"Unknown table_id: {table_id}")
+
+        with self._lock:
+            db = self._lookup(table_id, datasource.url)
+            if db is not None:
+                return db
+            table_lock = self._table_locks.setdefault(table_id, threading.Lock())
+        with table_lock:
+            with self._lock:
+                db = self._lookup(table_id, datasource.url)  # reflected by a concurrent request meanwhile
+                if db is not None:
+                    return db
+                engine = self._pool(datasource)["engine"]
+            db = self._create(engine, datasource)
+            with self._lock:
+                if datasource.url not in self._pools:  # evicted while reflecting
+                    self._pools[datasource.url] = {"engine": engine}
+                    self._evict_over_limit(keep=datasource.url)
+                self._tables[table_id] = {"url": datasource.url, "db": db}
+                self._pools[datasource.url]["last_used"] = time.monotonic()
+                self._pools.move_to_end(datasource.url)
+            return db
+
+    def _lookup(self, table_id: str, url: str):
+        # Call with self._lock held
+        entry = self._tables.get(table_id)
+        if entry is None or entry["url"] != url or url not in self._pools:
+            return None
+        self._pools[url]["last_used"] = time.monotonic()
+        self._pools.move_to_end(url)
+        return entry["db"]
+
+    def _pool(self, datasource) -> dict:
+        # Call with self._lock held; creating an engine does not connect, so this is quick
+        pool = self._pools.get(datasource.url)
+        if pool is None:
+            engine_args = {"pool_pre_ping": True}
+            if datasource.type != "sqlite":
+                engine_args.update(pool_size=settings.DATASOURCE_POOL_SIZE,
+                                   max_overflow=settings.DATASOURCE_MAX_OVERFLOW,
+                                   pool_recycle=int(settings.DATASOURCE_IDLE_SECONDS))
+            pool = {"engine": create_engine(datasource.url, **engine_args), "last_used": time.monotonic()}
+            self._pools[datasource.url] = pool
+            self.created += 1
+            self._evict_over_limit(keep=datasource.url)
+            self._start_sweeper()
+            logger.info(f"Opened pool for {_display_url(datasource.url)} ({datasource.type})")
+        return pool
+
+    def _evict_over_limit(self, keep: str):
+        while len(self._pools) > self.max_pools:
+            oldest = next(url for url in self._pools if url != keep)
+            self._dispose(oldest)
+
+    def _create(self, engine, datasource):
+        from langchain_community.utilities import SQLDatabase
+
+        existing = {t.lower(): t for t in inspect(engine).get_table_names()}
+        include = [existing[t.lower()] for t in datasource.tables if t.lower() in existing]
+        if datasource.tables and not include:
+            if datasource.type != "sqlite":
+                # Never fall back to every table in the database
+                raise ValueError(f"Table {', '.join(datasource.tables)} of {datasource.table_id} was not found "
+                                 f"in {_display_url(datasource.url)} (default schema)")
+            # A SQLite file is onboarded whole; its table_name is often just the file name
+            logger.info(f"{datasource.table_id}: {datasource.tables[0]} is not a table, exposing the whole file")
+        include = include or None
+        logger.info(f"Reflected table {datasource.table_id} (tables={include or 'all'})")
+        return SQLDatabase(engine, include_tables=include, sample_rows_in_table_info=3)
+
+    def _dispose(self, url: str):
+        # Call with self._lock held
+        pool = self._pools.pop(url)
+        pool["engine"].dispose()
+        for table_id in [t for t, entry in self._tables.items() if entry["url"] == url]:
+            del self._tables[table_id]
+        self.evicted += 1
+        logger.info(f"Closed pool for {_display_url(url)}")
+
+    def discard(self, table_id: str):
+        """Forgets a table's reflection so the next get() reflects it again; the shared pool stays open."""
+        with self._lock:
+            self._tables.pop(table_id, None)
+
+    def sweep(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            for url in [u for u, pool in self._pools.items() if pool["last_used"] < cutoff]:
+                self._dispose(url)
+
+    def _start_sweeper(self):
+        if self._sweeper is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(max(1.0, self.idle_seconds / 4))
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.warning(f"Pool sweep failed: {e}")
+
+        self._sweeper = threading.Thread(target=loop, name="datasource-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            pools = {
+                _display_url(url): {
+                    "idle_s": round(now - pool["last_used"], 1),
+                    "checked_out": pool["engine"].pool.checkedout() if hasattr(pool["engine"].pool, "checkedout") else None,
+                    "tables": sorted(t for t, entry in self._tables.items() if entry["url"] == url),
+                }
+                for url, pool in self._pools.items()
+            }
+        return {"open": len(pools), "created": self.created, "evicted": self.evicted, "pools": pools}
+
+pools = DatasourcePools(settings.DATASOURCE_MAX_POOLS, settings.DATASOURCE_IDLE_SECONDS)
@@ -0,0 +1,194 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+from urllib.parse import quote_plus
+import json
+import os
+import threading
+
+# Same config files the onboarding/tables routers read and write
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+POSTGRES_REGISTRY = os.path.join(PROJECT_ROOT, "config", "postgres_tables.json")
+SQLITE_REGISTRY = os.path.join(PROJECT_ROOT, "config", "sqlite_tables.json")
+POSTGRES_META = os.path.join(PROJECT_ROOT, "config", "postgres_metadata.json")
+SQLITE_META = os.path.join(PROJECT_ROOT, "config", "sqlite_metadata.json")
+PROMPT_CONFIG = os.path.join(PROJECT_ROOT, "config", "prompt.config")
+
+@dataclass
+class Datasource:
+    """An onboarded table resolved to something the agents can query."""
+    table_id: str
+    type: str  # 'postgres' or 'sqlite'
+    url: str
+    tables: List[str] = field(default_factory=list)  # tables to expose; empty = all
+    prompt: str = ""
+
+def load_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def get_table_metadata(table_id):
+    """Saved description/columns for an onboarded table, or None."""
+    for path in (POSTGRES_META, SQLITE_META):
+        meta = load_json(path)
+        if table_id in meta:
+            return meta[table_id]
+    return None
+
+def find_column_descriptions(table_name, column_names):
+    """
+    Hand-written column descriptions for a table, looked up across all
+    onboarded metadata. An entry applies when its registry row names the
+    table or when its column list matches the table's columns.
+    Returns (table_description, {column: description}).
+    """
+    registered = set()
+    for inst in load_json(POSTGRES_REGISTRY).get("postgres_instances", []):
+        if inst.get("postgress_table") == table_name:
+            registered.add(inst.get("table_id"))
+    for inst in load_json(SQLITE_REGISTRY).get("instances", []):
+        if inst.get("table_name") == table_name:
+            registered.add(inst.get("table_id"))
+
+    wanted = set(column_names)
+    table_description = ""
+    descriptions = {}
+    for path in (POSTGRES_META, SQLITE_META):
+        for table_id, entry in load_json(path).items():
+            columns = {}
+            for col in entry.get("columns", []):
+                name = col.get("name", "")
+                # Multi-table entries store columns as "table.column"
+                if "." in name:
+                    prefix, _, name = name.partition(".")
+                    if prefix != table_name:
+                        continue
+                columns[name] = col.get("description", "")
+            if table_id not in registered and set(columns) != wanted:
+                continue
+            for name, description in columns.items():
+                if description and name in wanted:
+                    descriptions.setdefault(name, description)
+            if entry.get("description") and not table_description:
+                table_description = entry["description"]
+    return table_description, descriptions
+
+def resolve_password(password):
+    """Registry passwords are literal, or 'ENV:VAR' (missing = POSTGRES_PASSWORD)."""
+    if not password or password.startswith("ENV:"):
+        env_var = "POSTGRES_PASSWORD"
+        if password and password.startswith("ENV:"):
+            env_var = password.split("ENV:")[1]
+        return os.getenv(env_var)
+    return password
+
+def sqlite_url(file_path):
+    if "sqlite:///" in file_path:
+        return file_path
+    # Handle relative paths
+    if file_path.startswith("./") or file_path.startswith("/"):
+        return f"sqlite:///{file_path}"
+    return f"sqlite:///./{file_path}"
+
+def postgres_url(host, port, database, username, password):
+    user = quote_plus(username or "postgres")
+    return f"postgresql+psycopg2://{user}:{quote_plus(password)}@{host}:{port}/{database}"
+
+def get_table_prompt(table_id):
+    """Prompt saved for a table through /tables/{table_id}/prompt, or ''."""
+    return load_json(PROMPT_CONFIG).get(table_id, {}).get("Prompt", "") or ""
+
+# resolve_table results, valid while none of the files they came from changed
+_resolved: Dict[str, Optional[Datasource]] = {}
+_resolved_stamp = None
+_resolved_lock = threading.Lock()
+
+def _files_stamp():
+    # A stat per file is much cheaper than parsing three JSON files on every get_db()
+    stamp = []
+    for path in (POSTGRES_REGISTRY, SQLITE_REGISTRY, PROMPT_CONFIG):
+        try:
+            stamp.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            stamp.append((path, None))
+    return tuple(stamp)
+
+def invalidate_resolved():
+    """Call after writing a registry or prompt file (mtimes can be too coarse to notice a quick rewrite)."""
+    global _resolved_stamp
+    with _resolved_lock:
+        _resolved.clear()
+        _resolved_stamp = None
+
+def resolve_table(table_id) -> Optional[Datasource]:
+    """
+    Looks a table_id up in the Postgres and SQLite registries. Returns None
+    when it is not onboarded; raises ValueError when it is but no password
+    can be found for it. Results are cached until one of the files changes.
+    """
+    global _resolved_stamp
+    stamp = _files_stamp()
+    with _resolved_lock:
+        if stamp != _resolved_stamp:
+            _resolved.clear()
+            _resolved_stamp = stamp
+        if table_id in _resolved:
+            return _resolved[table_id]
+    datasource = _resolve(table_id, load_json(POSTGRES_REGISTRY), load_json(SQLITE_REGISTRY), load_json(PROMPT_CONFIG))
+    with _resolved_lock:
+        if _resolved_stamp == stamp:
+            _resolved[table_id] = datasource
+    return datasource
+
+def resolve_all_tables() -> Dict[str, Union[Datasource, ValueError]]:
+    """Every onboarded table, reading the registries once; tables without a password map to the ValueError."""
+    pg_data, sqlite_data, prompts = load_json(POSTGRES_REGISTRY), load_json(SQLITE_REGISTRY), load_json(PROMPT_CONFIG)
+    ids = [inst.get("table_id") for inst in pg_data.get("postgres_instances", [])]
+    ids += [inst.get("table_id") for inst in sqlite_data.get("instances", [])]
+    resolved = {}
+    for table_id in filter(None, ids):
+        try:
+            resolved[table_id] = _resolve(table_id, pg_data, sqlite_data, prompts)
+        except ValueError as e:
+            resolved[table_id] = e
+    return resolved
+
+def _resolve(table_id, pg_data, sqlite_data, prompts) -> Optional[Datasource]:
+    for inst in pg_data.get("postgres_instances", []):
+        if inst.get("table_id") != table_id:
+            continue
+        host = inst.get("postgress_hostname")
+        password = inst.get("postgress_password")
+        if not password:
+            host_entry = next((h for h in pg_data.get("postgres_passwords", [])
+                               if h.get("postgress_hostname") == host), {})
+            password = host_entry.get("postgress_password")
+        password = resolve_password(password)
+        if not password:
+            raise ValueError(f"No password available for table {table_id} on {host}")
+        return Datasource(
+            table_id=table_id,
+            type="postgres",
+            url=postgres_url(host, inst.get("postgress_port") or 5432, inst.get("postgress_database"),
+                             inst.get("postgress_user"), password),
+            tables=[inst["postgress_table"]] if inst.get("postgress_table") else [],
+            prompt=prompts.get(table_id, {}).get("Prompt", "") or "",
+        )
+
+    for inst in sqlite_data.get("instances", []):
+        if inst.get("table_id") != table_id:
+            continue
+        return Datasource(
+            table_id=table_id,
+            type="sqlite",
+            url=sqlite_url(inst["file_path"]),
+            # SQLite onboarding covers the whole file; table_name is often just the file name
+            tables=[inst["table_name"]] if inst.get("table_name") else [],
+            prompt=prompts.get(table_id, {}).get("Prompt", "") or "",
+        )
+    return None
+
@@ -0,0 +1,136 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from sqlalchemy import create_engine, text
+from src.config import settings
+from typing import List, Optional
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_WRITES = re.compile(r"\b(insert|update|delete|merge|create|alter|drop|truncate|grant|revoke|copy|call|vacuum|"
+                     r"lock|nextval|setval|pg_advisory\w*)\b|\binto\b|\bfor\s+(update|share|no\s+key\s+update|key\s+share)\b",
+                     re.IGNORECASE)
+
+# Seconds of replay lag; a replica with nothing left to replay has no lag even
+# if the primary has been idle since its last transaction.
+_PG_LAG = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+def is_read_only(sql: str) -> bool:
+    """Only plain SELECT / WITH ... SELECT statements may go to a replica."""
+    stripped = _COMMENTS.sub(" ", sql).strip().rstrip(";").strip()
+    if ";" in stripped:
+        return False  # multiple statements
+    first = stripped.lstrip("(").split(None, 1)[0].lower() if stripped else ""
+    return first in ("select", "with") and not _WRITES.search(stripped)
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.outstanding = 0
+        self.healthy = True  # optimistic until the first check says otherwise
+        self.lag_seconds = 0.0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def check(self):
+        try:
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag_seconds = float(connection.execute(_PG_LAG).scalar() or 0)
+                else:
+                    connection.execute(text("SELECT 1"))
+                    self.lag_seconds = 0.0
+            self.healthy = True
+            self.last_error = None
+        except Exception as e:
+            self.mark_failed(e)
+
+    def mark_failed(self, error: Exception):
+        if self.healthy:
+            logger.warning(f"Replica {self.name} marked unhealthy: {error}")
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error)
+
+    def usable(self) -> bool:
+        return self.healthy and self.lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+
+class ReplicaSet:
+    """
+    Read replicas for the primary DATABASE_URL.
+
+    Each read goes to the usable replica with the fewest outstanding
+    queries. A background thread checks every replica each
+    REPLICA_HEALTH_INTERVAL_SECONDS; replicas that fail the check, or lag
+    more than REPLICA_MAX_LAG_SECONDS behind, get no reads until a later
+    check passes. With no usable replica, reads go to the primary.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._lock = threading.Lock()
+        self._checker = None
+        self.primary_fallbacks = 0
+
+    def start(self):
+        if self._checker is not None:
+            return
+
+        def loop():
+            while True:
+                for replica in self.replicas:
+                    replica.check()
+                time.sleep(settings.REPLICA_HEALTH_INTERVAL_SECONDS)
+
+        self._checker = threading.Thread(target=loop, name="replica-health", daemon=True)
+        self._checker.start()
+
+    @contextmanager
+    def acquire(self):
+        """Yields the least-loaded usable replica (or None = use the primary) and counts it as outstanding."""
+        with self._lock:
+            usable = [r for r in self.replicas if r.usable()]
+            replica = min(usable, key=lambda r: r.outstanding) if usable else None
+            if replica is None:
+                self.primary_fallbacks += 1
+            else:
+                replica.outstanding += 1
+        try:
+            yield replica
+        finally:
+            if replica is not None:
+                with self._lock:
+                    replica.outstanding -= 1
+
+    def stats(self):
+        return {
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [{
+                "url": r.name,
+                "healthy": r.healthy,
+                "lag_seconds": round(r.lag_seconds, 2),
+                "outstanding": r.outstanding,
+                "failures": r.failures,
+                "last_error": r.last_error,
+            } for r in self.replicas],
+        }
+
+@lru_cache(maxsize=1)
+def get_replica_set() -> Optional[ReplicaSet]:
+    if not settings.DATABASE_REPLICA_URLS:
+        return None
+    replica_set = ReplicaSet(settings.DATABASE_REPLICA_URLS)
+    replica_set.start()
+    return replica_set
@@ -0,0 +1,125 @@
+from dataclasses import dataclass, field
+from sqlalchemy import inspect, text
+from src.database.registry import find_column_descriptions
+from src.tokens import count_tokens
+from typing import List, Optional
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Onboarding writes "Imported from <type>" as the table description; it says nothing to the LLM
+_AUTO_DESCRIPTION = re.compile(r"^Imported from \w+$")
+_TEXT_TYPES = ("CHAR", "TEXT", "STRING", "ENUM", "CLOB")
+
+@dataclass
+class ColumnSummary:
+    name: str
+    type: str
+    primary_key: bool = False
+    values: Optional[List[str]] = None  # distinct values for enum-like columns
+    description: str = ""
+
+@dataclass
+class TableSummary:
+    name: str
+    description: str = ""
+    columns: List[ColumnSummary] = field(default_factory=list)
+
+def short_type(sql_type) -> str:
+    raw = str(sql_type).upper()
+    if "INT" in raw:
+        return "int"
+    if any(t in raw for t in ("DECIMAL", "NUMERIC", "MONEY")):
+        return "decimal"
+    if any(t in raw for t in ("REAL", "FLOAT", "DOUBLE")):
+        return "float"
+    if "TIMESTAMP" in raw or "DATETIME" in raw:
+        return "timestamp"
+    if "DATE" in raw:
+        return "date"
+    if "BOOL" in raw:
+        return "bool"
+    if any(t in raw for t in _TEXT_TYPES):
+        return "text"
+    return raw.lower()
+
+def describe_tables(engine, table_names, enum_max_values: int = 12) -> List[TableSummary]:
+    """
+    Reflects the given tables into compact summaries. Text columns with at
+    most enum_max_values distinct values are treated as enums and carry
+    their values; descriptions come from the onboarded metadata JSON.
+    """
+    inspector = inspect(engine)
+    tables = []
+    with engine.connect() as connection:
+        for table_name in table_names:
+            columns = inspector.get_columns(table_name)
+            pk = set(inspector.get_pk_constraint(table_name).get("constrained_columns") or [])
+            table_description, descriptions = find_column_descriptions(table_name, [c["name"] for c in columns])
+
+            summary = TableSummary(
+                name=table_name,
+                description="" if _AUTO_DESCRIPTION.match(table_description or "") else table_description,
+            )
+            for col in columns:
+                col_type = short_type(col["type"])
+                values = None
+                if col_type == "text" and col["name"] not in pk:
+                    rows = connection.execute(
+                        text(f'SELECT DISTINCT "{col["name"]}" FROM "{table_name}" LIMIT {enum_max_values + 1}')
+                    ).fetchall()
+                    if len(rows) <= enum_max_values:
+                        values = sorted(str(r[0]) for r in rows if r[0] is not None)
+                summary.columns.append(ColumnSummary(
+                    name=col["name"],
+                    type=col_type,
+                    primary_key=col["name"] in pk,
+                    values=values,
+                    description=descriptions.get(col["name"], ""),
+                ))
+            tables.append(summary)
+    return tables
+
+# Detail levels, most to least verbose. Each step drops the detail that
+# helps SQL generation least: long enum lists, then column descriptions,
+# then enum values, then types, then table descriptions.
+MAX_DETAIL_LEVEL = 5
+
+def render_schema(tables: List[TableSummary], level: int = 0) -> str:
+    lines = []
+    for table in tables:
+        parts = []
+        for col in table.columns:
+            part = col.name
+            if level < 4:
+                part += f":{col.type}"
+                if col.primary_key:
+                    part += " pk"
+            if col.values is not None and level < 3:
+                values = col.values if level < 1 else col.values[:5] + (["..."] if len(col.values) > 5 else [])
+                part += "{" + "|".join(values) + "}"
+            if col.description and level < 2:
+                part += f' "{col.description}"'
+            parts.append(part)
+        line = f"{table.name}({', '.join(parts)})"
+        if table.description and level < 5:
+            line = f"-- {table.description}\n{line}"
+        lines.append(line)
+    return "\n".join(lines)
+
+def serialize_schema(tables: List[TableSummary], token_budget: int) -> str:
+    """
+    Renders the most detailed form of the schema that fits token_budget,
+    e.g. sales_data(id:int pk, region:text{East|North|South|West}, ...).
+    """
+    rendered = ""
+    for level in range(MAX_DETAIL_LEVEL + 1):
+        rendered = render_schema(tables, level)
+        tokens = count_tokens(rendered)
+        if tokens <= token_budget:
+            if level:
+                logger.info(f"Schema rendered at detail level {level} ({tokens} tokens) to fit budget {token_budget}")
+            return rendered
+    logger.warning(f"Schema still exceeds token budget {token_budget} at minimum detail")
+    return rendered
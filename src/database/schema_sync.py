@@ -0,0 +1,276 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from src.config import settings
+from src.database import registry
+from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Schema drift detection for onboarded tables. Each metadata entry keeps a
+# checksum of its tables' columns as the catalog reports them; a sync run
+# asks the catalog for all checksums of a database in one query, and only
+# tables whose checksum moved are reflected again and merged into
+# *_metadata.json (hand-written descriptions are kept).
+
+# Column signature per table, straight from the catalog (one query per database)
+_PG_SIGNATURES = text(
+    "SELECT c.relname, string_agg(a.attname || ' ' || format_type(a.atttypid, a.atttypmod) || "
+    "CASE WHEN a.attnotnull THEN ' not null' ELSE '' END, ',' ORDER BY a.attnum) "
+    "FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid JOIN pg_namespace n ON n.oid = c.relnamespace "
+    "WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'v', 'm', 'p', 'f') "
+    "AND a.attnum > 0 AND NOT a.attisdropped AND (:all_tables OR c.relname = ANY(:tables)) "
+    "GROUP BY c.relname"
+)
+_SQLITE_SIGNATURES = text(
+    "SELECT m.name, p.name, p.type, p.\"notnull\" FROM sqlite_master m, pragma_table_info(m.name) p "
+    "WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%' ORDER BY m.name, p.cid"
+)
+
+# Held while read-modify-writing a *_metadata.json file
+metadata_lock = threading.Lock()
+last_report: Dict = {}
+# Checksum whose schema this process last dropped its caches for, per table.
+# Another worker may store a new checksum; the difference tells us to drop ours too.
+_applied_checksums: Dict[str, str] = {}
+
+def table_signatures(engine, tables: Optional[List[str]] = None) -> Dict[str, str]:
+    """{table: column signature} for the given tables (None = all) from a single catalog query."""
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            rows = connection.execute(_PG_SIGNATURES, {"all_tables": tables is None, "tables": tables or []})
+            signatures = dict(rows.fetchall())
+        else:
+            columns = defaultdict(list)
+            for table, name, type_, notnull in connection.execute(_SQLITE_SIGNATURES):
+                columns[table].append(f"{name} {type_.upper()}{' not null' if notnull else ''}")
+            signatures = {table: ",".join(cols) for table, cols in columns.items()}
+    if tables is not None:
+        signatures = {t: s for t, s in signatures.items() if t in tables}
+    return signatures
+
+def schema_checksum(signatures: Dict[str, str]) -> str:
+    raw = "\n".join(f"{table}({signatures[table]})" for table in sorted(signatures))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def reflect_columns(inspector, tables: List[str]) -> List[dict]:
+    """Metadata column entries as onboarding writes them ("table.column" when several tables)."""
+    columns = []
+    for table in tables:
+        for c in inspector.get_columns(table):
+            name = f"{table}.{c['name']}" if len(tables) > 1 else c["name"]
+            columns.append({"name": name, "type": str(c["type"]), "description": ""})
+    return columns
+
+def reflect_tables(engine, tables: List[str], workers: int, chunk_size: int = 50) -> Dict[str, object]:
+    """
+    {table: metadata columns, or the Exception} for many tables of one
+    database. Tables are reflected in chunks (one catalog round trip per
+    chunk via get_multi_columns) on a pool of workers sharing the engine.
+    """
+    def reflect(chunk):
+        inspector = inspect(engine)
+        try:
+            found = {name: cols for (_, name), cols in inspector.get_multi_columns(filter_names=chunk).items()}
+        except Exception:
+            found = {}  # fall back to one table at a time to pin the error on the right table
+        reflected = {}
+        for table in chunk:
+            try:
+                if table not in found:
+                    found[table] = inspector.get_columns(table)
+                reflected[table] = [{"name": c["name"], "type": str(c["type"]), "description": ""}
+                                    for c in found[table]]
+            except Exception as e:
+                reflected[table] = e
+        return reflected
+
+    results = {}
+    chunks = [tables[i:i + chunk_size] for i in range(0, len(tables), chunk_size)]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks))), thread_name_prefix="reflect") as executor:
+        for reflected in executor.map(reflect, chunks):
+            results.update(reflected)
+    return results
+
+def merge_columns(existing: List[dict], reflected: List[dict]):
+    """
+    Reflected columns in catalog order, keeping the description (and any
+    other hand-edited keys) of columns that already existed.
+    Returns (columns, changes).
+    """
+    old = {c.get("name"): c for c in existing}
+    merged, changes = [], {"added": [], "removed": [], "retyped": []}
+    for column in reflected:
+        previous = old.get(column["name"])
+        if previous is None:
+            changes["added"].append(column["name"])
+            merged.append(column)
+            continue
+        if previous.get("type") != column["type"]:
+            changes["retyped"].append(column["name"])
+        merged.append({**previous, "type": column["type"]})
+    reflected_names = {c["name"] for c in reflected}
+    changes["removed"] = [name for name in old if name not in reflected_names]
+    return merged, changes
+
+def save_json_atomic(path, data):
+    """Writes through a temp file so readers never see a half-written config file."""
+    save_json_files_atomic([(path, data)])
+
+def save_json_files_atomic(files):
+    """
+    Writes several config files together: every file is staged in a temp
+    file first and only then swapped in, so a failure while writing leaves
+    all of them as they were.
+    """
+    staged = []
+    try:
+        for path, data in files:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=".json")
+            staged.append((tmp_path, path))
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+    except Exception:
+        for tmp_path, _ in staged:
+            os.unlink(tmp_path)
+        raise
+    for tmp_path, path in staged:
+        os.replace(tmp_path, path)
+
+def _sync_database(url: str, entries: List[dict], force: bool) -> List[dict]:
+    """Checks every entry on one database with one catalog query; reflects only the changed ones."""
+    engine = create_engine(url)
+    try:
+        # Postgres entries name one table each; SQLite onboarding covers the whole file
+        wanted = None if any(e["tables"] is None for e in entries) else sorted({t for e in entries for t in e["tables"]})
+        signatures = table_signatures(engine, wanted)
+        inspector = None
+        results = []
+        for entry in entries:
+            tables = sorted(signatures) if entry["tables"] is None else [t for t in entry["tables"] if t in signatures]
+            checksum = schema_checksum({t: signatures[t] for t in tables})
+            if not tables:
+                results.append({**entry, "status": "failed", "error": "table not found"})
+            elif checksum == entry["checksum"] and not force:
+                results.append({**entry, "status": "unchanged"})
+            else:
+                inspector = inspector or inspect(engine)
+                results.append({**entry, "status": "changed", "new_checksum": checksum,
+                                "columns": reflect_columns(inspector, tables)})
+        return results
+    finally:
+        engine.dispose()
+
+def _invalidate(table_id: str, url: str):
+    # Pools hold reflected tables; the prompt schema text and column descriptions are cached
+    from src.cache import get_cache, make_key
+    from src.database import datasource_id
+    from src.database.pools import pools
+    pools.discard(table_id)
+    registry.invalidate_resolved()
+    cache = get_cache("schema")
+    cache.delete(make_key(settings.DATABASE_URL, datasource_id(table_id),
+                          settings.SCHEMA_PROMPT_FORMAT, settings.SCHEMA_PROMPT_TOKEN_BUDGET))
+    cache.delete(make_key("column_descriptions", str(make_url(url))))
+
+def sync_schemas(table_ids: Optional[List[str]] = None, force: bool = False) -> Dict:
+    """
+    Re-syncs onboarded tables (all, or table_ids) whose catalog schema no
+    longer matches the stored checksum. Databases are checked in parallel,
+    at most SCHEMA_SYNC_CONCURRENCY at a time; the metadata files are
+    written once at the end.
+    """
+    global last_report
+    started = time.perf_counter()
+    meta_paths = {"postgres": registry.POSTGRES_META, "sqlite": registry.SQLITE_META}
+    metadata = {kind: registry.load_json(path) for kind, path in meta_paths.items()}
+
+    by_url = defaultdict(list)
+    failed = {}
+    resolved = registry.resolve_all_tables()
+    for table_id in table_ids or list(resolved):
+        datasource = resolved.get(table_id)
+        if datasource is None or isinstance(datasource, ValueError):
+            failed[table_id] = str(datasource) if datasource else "not onboarded"
+            continue
+        stored = metadata[datasource.type].get(table_id, {})
+        by_url[datasource.url].append({
+            "table_id": table_id,
+            "type": datasource.type,
+            "url": datasource.url,
+            "tables": datasource.tables if datasource.type == "postgres" else None,
+            "checksum": stored.get("schema_checksum"),
+        })
+
+    results = []
+
+    def check(url):
+        try:
+            return _sync_database(url, by_url[url], force)
+        except Exception as e:
+            return [{**entry, "status": "failed", "error": str(e)} for entry in by_url[url]]
+
+    if by_url:
+        with ThreadPoolExecutor(max_workers=min(settings.SCHEMA_SYNC_CONCURRENCY, len(by_url)),
+                                thread_name_prefix="schema-sync") as executor:
+            for batch in executor.map(check, list(by_url)):
+                results.extend(batch)
+
+    changed = {}
+    for result in results:
+        if result["status"] == "failed":
+            failed[result["table_id"]] = result["error"]
+    updates = [r for r in results if r["status"] == "changed"]
+    if updates:
+        with metadata_lock:
+            # Re-read: onboarding or /tables may have written while we were checking
+            for kind in {r["type"] for r in updates}:
+                meta = registry.load_json(meta_paths[kind])
+                for result in (r for r in updates if r["type"] == kind):
+                    entry = meta.get(result["table_id"]) or {"description": f"Imported from {kind}", "columns": []}
+                    columns, changes = merge_columns(entry.get("columns", []), result["columns"])
+                    meta[result["table_id"]] = {**entry, "columns": columns, "schema_checksum": result["new_checksum"]}
+                    # Entries onboarded before checksums existed only get one recorded
+                    if any(changes.values()):
+                        changed[result["table_id"]] = changes
+                save_json_atomic(meta_paths[kind], meta)
+        for result in updates:
+            if result["table_id"] in changed:
+                _invalidate(result["table_id"], result["url"])
+            _applied_checksums[result["table_id"]] = result["new_checksum"]
+    # Tables another worker re-synced: its write only dropped that worker's caches. A table
+    # not seen yet may have been cached before the stored checksum, so it is dropped once too.
+    for result in results:
+        if result["status"] == "unchanged" and _applied_checksums.get(result["table_id"]) != result["checksum"]:
+            _invalidate(result["table_id"], result["url"])
+            _applied_checksums[result["table_id"]] = result["checksum"]
+
+    last_report = {
+        "checked": len(results),
+        "changed": changed,
+        "unchanged": len(results) - len(changed) - sum(1 for r in results if r["status"] == "failed"),
+        "failed": failed,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "finished_at": time.time(),
+    }
+    if changed or failed:
+        logger.info(f"Schema sync: {len(changed)} changed, {len(failed)} failed of {len(results)} checked")
+    return last_report
+
+async def schema_sync_loop():
+    """Background task started from the app lifespan; sleeps first so startup stays fast."""
+    while True:
+        await asyncio.sleep(settings.SCHEMA_SYNC_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(sync_schemas)
+        except Exception as e:
+            logger.warning(f"Schema sync failed: {e}")
@@ -0,0 +1,181 @@
+from collections import Counter
+from src.config import settings
+from typing import Dict, List, Optional
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_writes_since_prune = 0
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_LINE_COMMENT = re.compile(r"--[^\n]*")
+_BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+# Clause boundaries used to slice a statement into WHERE / JOIN ON / GROUP BY segments
+_CLAUSE_END = r"(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bHAVING\b|\bLIMIT\b|\bOFFSET\b|\bUNION\b|\bWINDOW\b|;|$)"
+_WHERE_SEGMENT = re.compile(r"\bWHERE\b(.*?)" + _CLAUSE_END, re.IGNORECASE | re.DOTALL)
+_HAVING_SEGMENT = re.compile(r"\bHAVING\b(.*?)(?=\bORDER\s+BY\b|\bLIMIT\b|;|$)", re.IGNORECASE | re.DOTALL)
+_ON_SEGMENT = re.compile(
+    r"\bON\b(.*?)(?=\bWHERE\b|\b(?:LEFT|RIGHT|INNER|OUTER|FULL|CROSS)?\s*JOIN\b|\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|;|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_GROUP_SEGMENT = re.compile(
+    r"\bGROUP\s+BY\b(.*?)(?=\bHAVING\b|\bORDER\s+BY\b|\bLIMIT\b|\bUNION\b|;|$)", re.IGNORECASE | re.DOTALL
+)
+_IDENTIFIER = re.compile(r'(?:"?(\w+)"?\.)?"?(\w+)"?')
+_RANGE_OPERATORS = re.compile(r"^\s*(?:<=|>=|<>|<|>|BETWEEN\b|LIKE\b)", re.IGNORECASE)
+
+def normalize_sql(sql: str) -> str:
+    """
+    Reduces a statement to its template: comments stripped, literals replaced
+    by '?', IN-lists collapsed and whitespace squashed.
+    """
+    text = _BLOCK_COMMENT.sub(" ", sql)
+    text = _LINE_COMMENT.sub(" ", text)
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _IN_LIST.sub("IN (?)", text)
+    text = _WHITESPACE.sub(" ", text).strip().rstrip(";").strip()
+    return text
+
+def sql_fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.lower().encode()).hexdigest()
+
+def _columns_in(segment: str, known_columns: set) -> List[str]:
+    found = []
+    for match in _IDENTIFIER.finditer(segment):
+        name = match.group(2).lower()
+        if name in known_columns and name not in found:
+            found.append(name)
+    return found
+
+def extract_columns(sql: str, known_columns) -> Dict[str, List[str]]:
+    """
+    Finds which known columns a statement filters, joins and groups on.
+
+    Filter columns are split into equality and range predicates because a
+    composite index should lead with equality columns.
+    """
+    known = {c.lower() for c in known_columns}
+    text = _STRING_LITERAL.sub("?", sql)
+
+    equality, ranges = [], []
+    for segment in _WHERE_SEGMENT.findall(text) + _HAVING_SEGMENT.findall(text):
+        for column in _columns_in(segment, known):
+            after = re.search(r'\b' + re.escape(column) + r'"?\s*(.{0,10})', segment, re.IGNORECASE | re.DOTALL)
+            target = ranges if after and _RANGE_OPERATORS.match(after.group(1)) else equality
+            if column not in equality and column not in ranges:
+                target.append(column)
+
+    joins = []
+    for segment in _ON_SEGMENT.findall(text):
+        for column in _columns_in(segment, known):
+            if column not in joins:
+                joins.append(column)
+
+    group_by = []
+    for segment in _GROUP_SEGMENT.findall(text):
+        for column in _columns_in(segment, known):
+            if column not in group_by:
+                group_by.append(column)
+
+    return {"equality": equality, "range": ranges, "join": joins, "group_by": group_by}
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(settings.WORKLOAD_LOG_PATH, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS query_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fingerprint TEXT NOT NULL,
+            normalized_sql TEXT NOT NULL,
+            sample_sql TEXT NOT NULL,
+            datasource TEXT NOT NULL,
+            duration_ms REAL NOT NULL,
+            row_count INTEGER,
+            executed_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_query_log_fingerprint ON query_log (fingerprint)")
+    return conn
+
+def record_query(sql: str, duration_ms: float, row_count: Optional[int], datasource: str = "default"):
+    """
+    Appends one executed statement to the workload log. Never raises: a
+    failing log must not fail the user's query.
+    """
+    global _writes_since_prune
+    if not settings.WORKLOAD_LOG_ENABLED:
+        return
+    try:
+        normalized = normalize_sql(sql)
+        with _lock:
+            conn = _connect()
+            try:
+                conn.execute(
+                    "INSERT INTO query_log (fingerprint, normalized_sql, sample_sql, datasource, duration_ms, row_count, executed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (sql_fingerprint(normalized), normalized, sql, datasource, duration_ms, row_count, time.time()),
+                )
+                _writes_since_prune += 1
+                if _writes_since_prune >= 500:
+                    _writes_since_prune = 0
+                    conn.execute(
+                        "DELETE FROM query_log WHERE id <= (SELECT MAX(id) FROM query_log) - ?",
+                        (settings.WORKLOAD_LOG_MAX_ENTRIES,),
+                    )
+                conn.commit()
+            finally:
+                conn.close()
+    except Exception as e:
+        logger.warning(f"Failed to record query in workload log: {e}")
+
+def load_workload(datasource: Optional[str] = None, limit: int = 200) -> List[Dict]:
+    """
+    Returns the most frequent query templates with their aggregate cost and
+    the latest concrete statement for each (needed to run EXPLAIN).
+    """
+    if not os.path.exists(settings.WORKLOAD_LOG_PATH):
+        return []
+    conn = _connect()
+    try:
+        where = "WHERE datasource = ?" if datasource else ""
+        params = (datasource, limit) if datasource else (limit,)
+        rows = conn.execute(
+            f"""
+            SELECT q.fingerprint, q.normalized_sql, COUNT(*) AS calls,
+                   SUM(q.duration_ms) AS total_ms, AVG(q.duration_ms) AS avg_ms,
+                   AVG(q.row_count) AS avg_rows,
+                   (SELECT s.sample_sql FROM query_log s WHERE s.fingerprint = q.fingerprint ORDER BY s.id DESC LIMIT 1) AS sample_sql
+            FROM query_log q {where}
+            GROUP BY q.fingerprint
+            ORDER BY total_ms DESC
+            LIMIT ?
+            """,
+            params,
+        ).fetchall()
+    finally:
+        conn.close()
+
+    keys = ["fingerprint", "normalized_sql", "calls", "total_ms", "avg_ms", "avg_rows", "sample_sql"]
+    return [dict(zip(keys, row)) for row in rows]
+
+def column_usage(workload: List[Dict], known_columns) -> Counter:
+    """Counts how often each column is used as a filter, join or group key, weighted by calls."""
+    usage = Counter()
+    for entry in workload:
+        cols = extract_columns(entry["sample_sql"], known_columns)
+        for kind, names in cols.items():
+            for name in names:
+                usage[(kind, name)] += entry["calls"]
+    return usage
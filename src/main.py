@@ -1,8 +1,12 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.config import settings
-from src.routers import schema, query, onboarding, tables, qna
+from src.responses import FastJSONResponse, add_compression
+from src.warmup import run_warmup, warmup_state
+from src.routers import schema, query, onboarding, tables, qna, admin, export, results
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from dotenv import load_dotenv
 
@@ -16,13 +20,27 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up GenAI Text-to-SQL API...")
+    warmup_task = None
+    if settings.WARMUP_ON_STARTUP:
+        # Runs in the background so /health answers immediately; /ready flips once done
+        warmup_task = asyncio.create_task(asyncio.to_thread(run_warmup))
+    sync_task = None
+    if settings.SCHEMA_SYNC_INTERVAL_SECONDS > 0:
+        # Picks up columns added/dropped/retyped in onboarded tables after onboarding
+        from src.database.schema_sync import schema_sync_loop
+        sync_task = asyncio.create_task(schema_sync_loop())
     yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if sync_task:
+        sync_task.cancel()
     logger.info("Shutting down...")
 
 app = FastAPI(
     title=settings.APP_TITLE,
     version=settings.APP_VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS Configuration
@@ -39,6 +57,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+add_compression(app)
 
 # Include Routers
 app.include_router(schema.router)
@@ -46,11 +65,20 @@ app.include_router(query.router)
 app.include_router(onboarding.router)
 app.include_router(tables.router)
 app.include_router(qna.router)
+app.include_router(admin.router)
+app.include_router(export.router)
+app.include_router(results.router)
 
 @app.get("/health")
 def health_check():
     return {"status": "ok", "version": settings.APP_VERSION}
 
+@app.get("/ready")
+def readiness_check():
+    if not warmup_state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up", "steps": warmup_state["steps"]})
+    return {"status": "ready", "steps": warmup_state["steps"]}
+
 @app.get("/")
 def read_root():
     return {"message": f"Welcome to {settings.APP_TITLE} v{settings.APP_VERSION}"}
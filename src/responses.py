@@ -0,0 +1,156 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware, IdentityResponder
+from src.config import settings
+from uuid import UUID
+import anyio
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Response encoding for large results: orjson (falls back to the stdlib),
+# msgpack on request (Accept: application/msgpack, needs ormsgpack), and
+# gzip / brotli (needs brotli) above RESPONSE_COMPRESSION_MIN_BYTES.
+
+def _bytes(value):
+    return base64.b64encode(bytes(value)).decode()
+
+# Database values orjson / msgpack do not know, by exact type (a dict lookup,
+# not an isinstance chain); anything else falls back to str().
+_ENCODERS = {
+    Decimal: float,
+    timedelta: lambda v: v.total_seconds(),
+    bytes: _bytes,
+    memoryview: _bytes,
+    bytearray: _bytes,
+    set: list,
+    frozenset: list,
+    # Only the stdlib encoder needs these; orjson handles them natively
+    date: date.isoformat,
+    datetime: datetime.isoformat,
+    time: time.isoformat,
+    UUID: str,
+}
+
+def encode_default(value):
+    encoder = _ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    if isinstance(value, Decimal):  # subclasses
+        return float(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return str(value)
+
+try:
+    import orjson
+
+    def dumps(content) -> bytes:
+        return orjson.dumps(content, default=encode_default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+    def dumps(content) -> bytes:
+        return json.dumps(content, default=encode_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+class FastJSONResponse(JSONResponse):
+    """The app's default response class: JSONResponse rendered with orjson."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+class MsgpackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content) -> bytes:
+        import ormsgpack
+        return ormsgpack.packb(content, default=encode_default, option=ormsgpack.OPT_NON_STR_KEYS)
+
+def _msgpack_available() -> bool:
+    try:
+        import ormsgpack  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return ("application/msgpack" in accept or "application/x-msgpack" in accept) and _msgpack_available()
+
+def respond(request: Request, model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Encodes a response model in the format the client asked for. Meant for
+    models built with model_construct from values the server produced
+    itself: the fields are dumped shallowly, without validating or walking
+    the result rows again.
+    """
+    content = {name: getattr(model, name) for name in type(model).model_fields}
+    if wants_msgpack(request):
+        return MsgpackResponse(content, status_code=status_code)
+    return FastJSONResponse(content, status_code=status_code)
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int, *, thread_minimum_size: int = 128 * 1024, **kwargs):
+        super().__init__(app, minimum_size, **kwargs)
+        self.quality = quality
+        self.thread_minimum_size = thread_minimum_size
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= self.thread_minimum_size:
+            # Like GZipResponder: large chunks would block the event loop
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        import brotli
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that prefers brotli when the client accepts it and the
+    brotli package is installed. Bodies below minimum_size go out as they are.
+    """
+
+    def __init__(self, app, minimum_size: int, compresslevel: int, brotli_quality: int, **kwargs):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel, **kwargs)
+        self.brotli_quality = brotli_quality
+        try:
+            import brotli  # noqa: F401
+            self.brotli = True
+        except ImportError:
+            self.brotli = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.brotli and "br" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality,
+                                        exclude_content_types=self.exclude_content_types)
+            await responder(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+def add_compression(app):
+    if settings.RESPONSE_COMPRESSION_MIN_BYTES <= 0:
+        return
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+        compresslevel=settings.RESPONSE_GZIP_LEVEL,
+        brotli_quality=settings.RESPONSE_BROTLI_QUALITY,
+        # Parquet is compressed already
+        exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/vnd.apache.parquet",),
+    )
@@ -0,0 +1,160 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from src.agent.admission import admission
+from src.cache import get_cache_backend
+from src.config import settings
+from src.database import get_db
+from src.database.index_advisor import recommend_indexes, apply_index
+import asyncio
+import logging
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+logger = logging.getLogger(__name__)
+
+class IndexRecommendation(BaseModel):
+    table: str
+    columns: List[str]
+    index_name: str
+    estimated_cost_before: float
+    estimated_cost_after: float
+    benefit_pct: float
+    query_count: int
+    ddl: str
+
+class ApplyIndexesRequest(BaseModel):
+    allow_apply: bool = Field(False, description="Must be true to actually create indexes")
+    index_names: Optional[List[str]] = Field(None, description="Subset of recommended indexes to apply (default: all)")
+    top_n: int = 10
+
+class ApplyIndexesResponse(BaseModel):
+    applied: List[str]
+    failed: List[str]
+
+@router.get("/index-advisor", response_model=List[IndexRecommendation])
+async def get_index_recommendations(top_n: int = 10, min_benefit_pct: float = 5.0):
+    """
+    Recommends secondary indexes for the default datasource based on the
+    recorded query workload. On Postgres this requires the hypopg extension.
+    """
+    db = get_db()
+    try:
+        return await asyncio.to_thread(recommend_indexes, db._engine, top_n=top_n, min_benefit_pct=min_benefit_pct)
+    except Exception as e:
+        logger.error(f"Index advisor failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Index advisor failed: {str(e)}")
+
+@router.post("/index-advisor/apply", response_model=ApplyIndexesResponse)
+async def apply_index_recommendations(payload: ApplyIndexesRequest):
+    if not settings.INDEX_ADVISOR_ALLOW_APPLY:
+        raise HTTPException(status_code=403, detail="Applying indexes is disabled (INDEX_ADVISOR_ALLOW_APPLY=false).")
+    if not payload.allow_apply:
+        raise HTTPException(status_code=400, detail="Set allow_apply=true to create the recommended indexes.")
+
+    db = get_db()
+    recommendations = await asyncio.to_thread(recommend_indexes, db._engine, top_n=payload.top_n)
+    if payload.index_names is not None:
+        recommendations = [r for r in recommendations if r["index_name"] in payload.index_names]
+
+    applied, failed = [], []
+    for rec in recommendations:
+        try:
+            await asyncio.to_thread(apply_index, db._engine, rec["table"], rec["columns"])
+            applied.append(rec["index_name"])
+        except Exception as e:
+            logger.error(f"Failed to create {rec['index_name']}: {e}")
+            failed.append(rec["index_name"])
+
+    return ApplyIndexesResponse(applied=applied, failed=failed)
+
+@router.get("/cache")
+async def cache_stats():
+    return get_cache_backend().stats()
+
+@router.delete("/cache")
+async def clear_cache():
+    get_cache_backend().clear()
+    return {"status": "success", "message": "Cache cleared"}
+
+@router.get("/llm-cache")
+async def llm_cache_stats():
+    from src.agent.llm_cache import get_llm_cache
+    cache = get_llm_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+@router.delete("/llm-cache")
+async def clear_llm_cache():
+    from src.agent.llm_cache import get_llm_cache
+    cache = get_llm_cache()
+    if cache:
+        cache.clear()
+    return {"status": "success", "message": "LLM cache cleared"}
+
+@router.get("/admission")
+async def admission_stats():
+    """Per-lane concurrency, queue depth, wait times and rejections."""
+    return admission.stats()
+
+@router.get("/llm-routing")
+async def llm_routing_stats():
+    """Rolling p95 latency, error rate and skip state per provider/model."""
+    from src.agent.llm_routing import routing_stats
+    return routing_stats()
+
+@router.get("/datasources")
+async def datasource_stats():
+    """Open per-datasource connection pools, the tables using them, idle time and checked-out connections."""
+    from src.database.pools import pools
+    return pools.stats()
+
+@router.get("/replicas")
+async def replica_stats():
+    """Read replica health, replication lag and outstanding queries."""
+    from src.database.replicas import get_replica_set
+    replicas = get_replica_set()
+    return replicas.stats() if replicas else {"primary_fallbacks": 0, "replicas": []}
+
+@router.get("/sessions")
+async def session_stats():
+    """Live multi-turn sessions and whether their checkpoints persist."""
+    from src.agent.sessions import sessions
+    return sessions.stats()
+
+@router.post("/schema-sync")
+async def run_schema_sync(table_id: Optional[str] = None, force: bool = False):
+    """
+    Re-syncs onboarded tables (or one table_id) whose schema changed since
+    onboarding / the last sync; force re-reflects even unchanged tables.
+    """
+    from src.database.schema_sync import sync_schemas
+    return await asyncio.to_thread(sync_schemas, [table_id] if table_id else None, force)
+
+@router.get("/schema-sync")
+async def schema_sync_report():
+    """Report of the most recent schema sync run (periodic or triggered)."""
+    from src.database import schema_sync
+    return schema_sync.last_report
+
+@router.get("/circuit-breakers")
+async def circuit_breaker_stats():
+    """State of the per-dependency circuit breakers (llm:<provider>, db:<datasource>)."""
+    from src.agent.resilience import breaker_stats
+    return breaker_stats()
+
+@router.get("/token-usage")
+async def token_usage():
+    """Running prompt/completion token totals per API key (hashed) in the current budget window."""
+    from src.agent.token_budget import ledger
+    return ledger.stats()
+
+@router.get("/slow-plans")
+async def slow_plans():
+    """Plans of statements slower than SLOW_PLAN_THRESHOLD_MS, slowest first (one per SQL template)."""
+    from src.database.plans import slow_plans
+    return slow_plans.entries()
+
+@router.delete("/slow-plans")
+async def clear_slow_plans():
+    from src.database.plans import slow_plans
+    slow_plans.clear()
+    return {"status": "success", "message": "Slow plans cleared"}
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Literal
+from src.agent.answers import get_answer
+from src.database import get_db
+from src.database.export import MEDIA_TYPES, WRITERS
+from src.database.replicas import get_replica_set, is_read_only
+from src.database.registry import resolve_table
+import asyncio
+import itertools
+import logging
+
+router = APIRouter(prefix="/api/v1", tags=["export"])
+logger = logging.getLogger(__name__)
+
+class ExportRequest(BaseModel):
+    answer_id: str = Field(..., description="answer_id from a /query or /qna response; exports its SQL")
+    format: Literal["csv", "ndjson", "parquet"] = "csv"
+
+def _on_replica(replicas, primary_engine, writer, sql):
+    # The replica counts as busy for as long as the export streams
+    with replicas.acquire() as replica:
+        yield from writer(replica.engine if replica else primary_engine, sql)
+
+@router.post("/export")
+async def export_results(request: ExportRequest):
+    """
+    Streams the full result of an earlier answer's SQL as CSV, NDJSON or
+    Parquet (one row group per batch; requires pyarrow) using chunked
+    transfer encoding. Only SQL the service generated itself can be
+    exported. answer_ids live in the cache backend: with several workers
+    set CACHE_BACKEND=sqlite, or an export may land on a worker that never
+    saw the answer and get a 404.
+    """
+    answer = get_answer(request.answer_id)
+    if answer is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired answer_id.")
+    sql, table_id = answer["sql"], answer["table_id"]
+    if not is_read_only(sql):
+        raise HTTPException(status_code=400, detail="Only a single read-only SELECT can be exported.")
+    if request.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow to be installed.")
+    if table_id and resolve_table(table_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown table_id: {table_id}")
+
+    engine = get_db(table_id)._engine
+    writer = WRITERS[request.format]
+    replicas = None if table_id else get_replica_set()
+    body = _on_replica(replicas, engine, writer, sql) if replicas else writer(engine, sql)
+
+    # Run the query before answering so a bad statement is a 400, not a truncated 200
+    try:
+        first = await asyncio.to_thread(next, body, b"")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Export failed: {str(e)}")
+
+    logger.info(f"Exporting {request.format}: {sql}")
+    return StreamingResponse(
+        itertools.chain([first], body),
+        media_type=MEDIA_TYPES[request.format],
+        headers={"Content-Disposition": f'attachment; filename="export.{request.format}"'},
+    )
@@ -1,13 +1,18 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uuid
 import hashlib
 import json
 import os
+import asyncio
 import logging
+import time
 from typing import List, Optional, Dict, Any
 from sqlalchemy import create_engine, inspect
-from urllib.parse import quote_plus
+from src.database.registry import invalidate_resolved, load_json, postgres_url, resolve_password, sqlite_url
+from src.config import settings
+from src.database.schema_sync import (metadata_lock, reflect_columns, reflect_tables, save_json_files_atomic,
+                                      schema_checksum, table_signatures)
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -44,6 +49,28 @@ class OnboardTableResponse(BaseModel):
     table_id: str
     hash_key: str
 
+class OnboardTablesRequest(BaseModel):
+    type: str = "postgres"  # bulk onboarding is Postgres only; a SQLite file is onboarded whole
+    host: Optional[str] = "localhost"
+    port: Optional[int] = 5432
+    database: Optional[str] = None
+    username: Optional[str] = None
+    password: Optional[str] = None
+    table_names: Optional[List[str]] = Field(None, description="Tables to onboard; omit for every table in the database's default schema")
+
+class OnboardTableResult(BaseModel):
+    table_name: str
+    status: str  # 'onboarded', 'exists' or 'failed'
+    table_id: Optional[str] = None
+    hash_key: Optional[str] = None
+    error: Optional[str] = None
+
+class OnboardTablesResponse(BaseModel):
+    onboarded: int
+    failed: int
+    duration_ms: float
+    results: List[OnboardTableResult]
+
 def load_registry(path):
     if not os.path.exists(path):
         return {"instances": []} # Generic structure
@@ -53,10 +80,6 @@ def load_registry(path):
     except:
         return {"instances": []}
 
-def save_registry(path, data):
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=4)
-
 # Helpers for Postgres specific structure 
 def load_postgres_registry():
     if not os.path.exists(REGISTRY_PATH):
@@ -67,10 +90,6 @@ def load_postgres_registry():
     except:
          return {"postgres_instances": [], "postgres_passwords": []}
 
-def save_postgres_registry(data):
-    with open(REGISTRY_PATH, 'w') as f:
-        json.dump(data, f, indent=4)
-
 def generate_hash_key(host, db, table):
     raw = f"{host}:{db}:{table}"
     return hashlib.sha256(raw.encode()).hexdigest()
@@ -78,47 +97,43 @@ def generate_hash_key(host, db, table):
 def generate_sqlite_hash(file_path):
     return hashlib.sha256(file_path.encode()).hexdigest()
 
-def extract_and_save_schema(table_id, payload):
+def commit_onboarding(registry_path, load, meta_path, add_to_registry):
     """
-    Connects to the DB, fetches columns, and updates appropriate metadata file
+    Writes one onboarding to the registry and its metadata file together,
+    under metadata_lock. add_to_registry(registry) updates the registry as
+    it is now on disk and returns the {table_id: entry} metadata to add (it
+    may raise to abort; nothing is written then). Both files are staged
+    before either is replaced, metadata first, so a table never shows up in
+    the registry without its metadata.
+    """
+    with metadata_lock:
+        registry = load()
+        new_meta = add_to_registry(registry)
+        meta = load_json(meta_path)
+        meta.update(new_meta)
+        save_json_files_atomic([(meta_path, meta), (registry_path, registry)])
+    invalidate_resolved()
+
+def extract_schema(payload):
+    """
+    Connects to the DB and fetches the columns for a metadata entry; None if
+    the schema could not be read.
     """
     try:
         connection_url = ""
         target_tables = []
-        metadata_path = ""
         
         if payload.type == "sqlite":
-             metadata_path = SQLITE_META_PATH
-             if "sqlite:///" not in payload.file_path:
-                 # Handle relative paths 
-                 if payload.file_path.startswith("./") or payload.file_path.startswith("/"):
-                     connection_url = f"sqlite:///{payload.file_path}"
-                 else:
-                     connection_url = f"sqlite:///./{payload.file_path}"
-             else:
-                 connection_url = payload.file_path
+             connection_url = sqlite_url(payload.file_path)
              
         elif payload.type == "postgres":
-             metadata_path = POSTGRES_META_PATH
-             user = payload.username or "postgres"
-             pwd = payload.password
-             
-             if not pwd or pwd.startswith("ENV:"):
-                 env_var = "POSTGRES_PASSWORD"
-                 if pwd and pwd.startswith("ENV:"):
-                     env_var = pwd.split("ENV:")[1]
-                 pwd = os.getenv(env_var)
+             pwd = resolve_password(payload.password)
              
              if not pwd:
                  logger.warning("No password found for schema extraction")
-                 return
+                 return None
                  
-             user = quote_plus(user)
-             password = quote_plus(pwd)
-             host = payload.host
-             port = payload.port
-             db = payload.database
-             connection_url = f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{db}"
+             connection_url = postgres_url(payload.host, payload.port, payload.database, payload.username, pwd)
              target_tables = [payload.table_name]
              
         # Connect
@@ -129,42 +144,19 @@ def extract_and_save_schema(table_id, payload):
         if not target_tables:
             target_tables = inspector.get_table_names()
             
-        columns_list = []
-        
-        for t_name in target_tables:
-            cols = inspector.get_columns(t_name)
-            for c in cols:
-                col_name = c['name']
-                if len(target_tables) > 1:
-                    col_name = f"{t_name}.{c['name']}"
-                
-                columns_list.append({
-                    "name": col_name,
-                    "type": str(c['type']),
-                    "description": ""
-                })
-                
-        # Load Metadata
-        meta = {}
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r') as f:
-                try:
-                    meta = json.load(f)
-                except:
-                    meta = {}
-                    
-        meta[table_id] = {
+        columns_list = reflect_columns(inspector, target_tables)
+        # Baseline for the periodic re-sync (schema_sync) to detect drift against
+        checksum = schema_checksum(table_signatures(engine, target_tables))
+        engine.dispose()
+        return {
             "description": f"Imported from {payload.type}",
-            "columns": columns_list
+            "columns": columns_list,
+            "schema_checksum": checksum
         }
         
-        with open(metadata_path, 'w') as f:
-            json.dump(meta, f, indent=4)
-            
-        logger.info(f"Schema extracted and saved for {table_id} to {os.path.basename(metadata_path)}")
-        
     except Exception as e:
-        logger.error(f"Failed to extract schema for {table_id}: {e}")
+        logger.error(f"Failed to extract schema for {payload.table_name}: {e}")
+        return None
 
 @router.post("/onboard-table", response_model=OnboardTableResponse)
 async def onboard_table(payload: OnboardTableRequest):
@@ -174,13 +166,14 @@ async def onboard_table(payload: OnboardTableRequest):
         return await onboard_postgres(payload)
 
 async def onboard_sqlite(payload: OnboardTableRequest):
-    registry = load_registry(SQLITE_REGISTRY_PATH)
     hash_key = generate_sqlite_hash(payload.file_path)
     
+    def is_onboarded(registry):
+        return any(inst.get("hash_key") == hash_key for inst in registry.get("instances", []))
+
     # Check uniqueness
-    for inst in registry.get("instances", []):
-         if inst.get("hash_key") == hash_key:
-             raise HTTPException(status_code=409, detail="Database file already onboarded.")
+    if is_onboarded(load_registry(SQLITE_REGISTRY_PATH)):
+        raise HTTPException(status_code=409, detail="Database file already onboarded.")
              
     table_id = str(uuid.uuid4())
     new_instance = {
@@ -193,14 +186,18 @@ async def onboard_sqlite(payload: OnboardTableRequest):
         "onboarded_at": datetime.now().isoformat()
     }
     
-    if "instances" not in registry:
-        registry["instances"] = []
-    registry["instances"].append(new_instance)
-    
-    save_registry(SQLITE_REGISTRY_PATH, registry)
-    
     # Extract Schema
-    extract_and_save_schema(table_id, payload)
+    schema = extract_schema(payload)
+
+    def add_to_registry(registry):
+        # Re-checked under the lock: another request may have onboarded it meanwhile
+        if is_onboarded(registry):
+            raise HTTPException(status_code=409, detail="Database file already onboarded.")
+        registry.setdefault("instances", []).append(new_instance)
+        return {table_id: schema} if schema else {}
+
+    commit_onboarding(SQLITE_REGISTRY_PATH, lambda: load_registry(SQLITE_REGISTRY_PATH), SQLITE_META_PATH,
+                      add_to_registry)
     
     return OnboardTableResponse(
         message="SQLite Database onboarded",
@@ -210,24 +207,14 @@ async def onboard_sqlite(payload: OnboardTableRequest):
 
 async def onboard_postgres(payload: OnboardTableRequest):
     logger.info(f"Onboarding table: {payload.table_name} in {payload.database}@{payload.host}")
-    registry = load_postgres_registry()
     table_id = str(uuid.uuid4())
     hash_key = generate_hash_key(payload.host, payload.database, payload.table_name)
     
-    for inst in registry.get("postgres_instances", []):
-        if inst.get("postgress_hash_key") == hash_key:
-             raise HTTPException(status_code=409, detail="Table already exists.")
-    
-    passwords_list = registry.get("postgres_passwords", [])
-    host_entry = next((item for item in passwords_list if item["postgress_hostname"] == payload.host), None)
-    
-    if not host_entry:
-         pwd_val = payload.password or "ENV:POSTGRES_PASSWORD"
-         passwords_list.append({
-             "postgress_hostname": payload.host,
-             "postgress_password": pwd_val
-         })
-         registry["postgres_passwords"] = passwords_list
+    def is_onboarded(registry):
+        return any(inst.get("postgress_hash_key") == hash_key for inst in registry.get("postgres_instances", []))
+
+    if is_onboarded(load_postgres_registry()):
+        raise HTTPException(status_code=409, detail="Table already exists.")
 
     new_instance = {
         "table_id": table_id,
@@ -242,17 +229,127 @@ async def onboard_postgres(payload: OnboardTableRequest):
         "onboarded_at": datetime.now().isoformat()
     }
     
-    if "postgres_instances" not in registry:
-        registry["postgres_instances"] = []
-    registry["postgres_instances"].append(new_instance)
-    
-    save_postgres_registry(registry)
-    
     # Extract Schema
-    extract_and_save_schema(table_id, payload)
+    schema = extract_schema(payload)
+
+    def add_to_registry(registry):
+        # Re-checked under the lock: a concurrent or bulk onboarding may have added it meanwhile
+        if is_onboarded(registry):
+            raise HTTPException(status_code=409, detail="Table already exists.")
+        passwords_list = registry.setdefault("postgres_passwords", [])
+        if not any(item.get("postgress_hostname") == payload.host for item in passwords_list):
+            passwords_list.append({
+                "postgress_hostname": payload.host,
+                "postgress_password": payload.password or "ENV:POSTGRES_PASSWORD"
+            })
+        registry.setdefault("postgres_instances", []).append(new_instance)
+        return {table_id: schema} if schema else {}
+
+    commit_onboarding(REGISTRY_PATH, load_postgres_registry, POSTGRES_META_PATH, add_to_registry)
     
     return OnboardTableResponse(
         message="Table successfully onboarded",
         table_id=table_id,
         hash_key=hash_key
     )
+
+@router.post("/onboard-tables", response_model=OnboardTablesResponse)
+async def onboard_tables(payload: OnboardTablesRequest):
+    """
+    Onboards many tables of one Postgres database in a single call: one
+    engine, concurrent reflection, and one commit of the metadata and
+    registry files at the end, with a per-table result.
+    """
+    if payload.type != "postgres":
+        raise HTTPException(status_code=400, detail="Bulk onboarding supports Postgres; a SQLite file is onboarded whole by /onboard-table.")
+    pwd = resolve_password(payload.password)
+    if not pwd:
+        raise HTTPException(status_code=400, detail="No password found for the database.")
+    return await asyncio.to_thread(_onboard_postgres_tables, payload, pwd)
+
+def _onboard_postgres_tables(payload: OnboardTablesRequest, pwd: str) -> OnboardTablesResponse:
+    started = time.perf_counter()
+    logger.info(f"Bulk onboarding from {payload.database}@{payload.host}")
+    engine = create_engine(postgres_url(payload.host, payload.port, payload.database, payload.username, pwd),
+                           pool_size=settings.ONBOARD_CONCURRENCY, max_overflow=0)
+    try:
+        try:
+            table_names = payload.table_names or inspect(engine).get_table_names()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not list tables: {str(e)}")
+
+        existing = {inst.get("postgress_hash_key") for inst in load_postgres_registry().get("postgres_instances", [])}
+        results = {}
+        pending = []
+        for name in dict.fromkeys(table_names):
+            hash_key = generate_hash_key(payload.host, payload.database, name)
+            if hash_key in existing:
+                results[name] = OnboardTableResult(table_name=name, status="exists", hash_key=hash_key)
+            else:
+                pending.append(name)
+
+        reflected = reflect_tables(engine, pending, settings.ONBOARD_CONCURRENCY) if pending else {}
+        try:
+            signatures = table_signatures(engine, pending) if pending else {}
+        except Exception as e:
+            logger.warning(f"Could not read schema checksums; the next schema sync will record them: {e}")
+            signatures = {}
+    finally:
+        engine.dispose()
+
+    now = datetime.now().isoformat()
+    new_instances, new_meta = [], {}
+    for name in pending:
+        columns = reflected.get(name)
+        if isinstance(columns, Exception) or not columns:
+            error = str(columns) if isinstance(columns, Exception) else "table not found"
+            results[name] = OnboardTableResult(table_name=name, status="failed", error=error)
+            continue
+        table_id = str(uuid.uuid4())
+        hash_key = generate_hash_key(payload.host, payload.database, name)
+        new_instances.append({
+            "table_id": table_id,
+            "postgress_user": payload.username or "postgres",
+            "postgress_password": "ENV:POSTGRES_PASSWORD",
+            "postgress_hostname": payload.host,
+            "postgress_port": str(payload.port),
+            "postgress_database": payload.database,
+            "postgress_table": name,
+            "postgress_hash_key": hash_key,
+            "onboarded_by": "Admin",
+            "onboarded_at": now
+        })
+        new_meta[table_id] = {"description": "Imported from postgres", "columns": columns}
+        if name in signatures:
+            new_meta[table_id]["schema_checksum"] = schema_checksum({name: signatures[name]})
+        results[name] = OnboardTableResult(table_name=name, status="onboarded", table_id=table_id, hash_key=hash_key)
+
+    def add_to_registry(registry):
+        passwords_list = registry.setdefault("postgres_passwords", [])
+        if not any(item.get("postgress_hostname") == payload.host for item in passwords_list):
+            passwords_list.append({
+                "postgress_hostname": payload.host,
+                "postgress_password": payload.password or "ENV:POSTGRES_PASSWORD"
+            })
+        # Re-check duplicates against the registry as it is now, not as it was before reflecting
+        taken = {inst.get("postgress_hash_key") for inst in registry.get("postgres_instances", [])}
+        added = {}
+        for inst in new_instances:
+            if inst["postgress_hash_key"] in taken:
+                name = inst["postgress_table"]
+                results[name] = OnboardTableResult(table_name=name, status="exists", hash_key=inst["postgress_hash_key"])
+                continue
+            registry.setdefault("postgres_instances", []).append(inst)
+            added[inst["table_id"]] = new_meta[inst["table_id"]]
+        return added
+
+    if new_instances:
+        commit_onboarding(REGISTRY_PATH, load_postgres_registry, POSTGRES_META_PATH, add_to_registry)
+
+    ordered = [results[name] for name in dict.fromkeys(table_names)]
+    onboarded = sum(1 for r in ordered if r.status == "onboarded")
+    failed = sum(1 for r in ordered if r.status == "failed")
+    logger.info(f"Bulk onboarding done: {onboarded} onboarded, {failed} failed of {len(ordered)}")
+    return OnboardTablesResponse(onboarded=onboarded, failed=failed,
+                                 duration_ms=round((time.perf_counter() - started) * 1000, 1), results=ordered)
+
@@ -1,14 +1,49 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Literal, Optional
-from src.agent.qna_graph import qna_graph
+from src.agent.admission import admission, AdmissionRejected
+from src.agent.answers import remember_answer
+from src.agent.llm_cache import set_cache_policy
+from src.agent.resilience import set_deadline
+from src.agent.results import store_result
+from src.agent.sessions import TURN_KEYS, sessions
+from src.agent.singleflight import SingleFlight, question_key
+from src.agent.token_budget import TokenBudgetExceeded, ledger, start_request, tenant_for
+from src.agent.qna_state import QnAState
+from src.config import settings
+from src.database.registry import resolve_table
+from src.responses import respond
+import asyncio
 
 router = APIRouter(prefix="/api/v1", tags=["qna"])
+qna_flights = SingleFlight("qna")
+
+def get_qna_graph():
+    # Imported on first use: compiling the graph pulls in LangGraph and LangChain
+    from src.agent.qna_graph import qna_graph
+    return qna_graph
+
+_session_graph = None
+
+async def get_session_graph():
+    # Same graph, compiled with the session checkpointer so turns see earlier ones
+    global _session_graph
+    if _session_graph is None:
+        from src.agent.qna_graph import qna_workflow
+        _session_graph = qna_workflow.compile(checkpointer=await sessions.saver())
+    return _session_graph
 
 class QnARequest(BaseModel):
     question: str
-    model_provider: Literal["openai", "gemini"] = Field("openai", description="LLM Provider to use")
-    model_name: Optional[str] = Field(None, description="Specific model to use")
+    table_id: Optional[str] = Field(None, description="Onboarded table to query (see /tables); defaults to the main database")
+    model_provider: Literal["openai", "gemini", "replay"] = Field("openai", description="LLM Provider to use")
+    priority: Literal["interactive", "batch"] = Field("interactive", description="Admission priority when providers are saturated")
+    model_name: Optional[str] = Field(None, description="Specific model to use; overrides the complexity-based tier")
+    full_summary: bool = Field(False, description="Always summarise with the LLM, even for single-value / small group-by results")
+    session_id: Optional[str] = Field(None, description="Continue a conversation: follow-up questions can refer to earlier turns")
+    explain: bool = Field(False, description="Attach the execution plan (runs EXPLAIN ANALYZE, i.e. the SQL once more)")
+    max_points: Optional[int] = Field(None, ge=4, description="Downsample time-series data to about this many points for charting")
+    downsample: Literal["lttb", "minmax"] = Field("lttb", description="Downsampling method when max_points is set")
 
 class QnAResponse(BaseModel):
     question: str
@@ -17,21 +52,75 @@ class QnAResponse(BaseModel):
     sql_query: str
     table_layout: str # JSON string or description of schema used
     data: List[Dict[str, Any]]
+    total_rows: Optional[int] = None  # rows in the full result; more than len(data) when paged or downsampled
+    downsampled: Optional[str] = None  # method used when data was downsampled
+    result_handle: Optional[str] = None  # page through the full result at /api/v1/results/{handle}
     summary: str
+    model: Optional[str] = None
+    generation_path: Optional[str] = None  # how the SQL was produced: 'rules', 'cache', 'llm' or 'session'
+    answer_id: Optional[str] = None  # pass to /api/v1/export for the full result
+    session_id: Optional[str] = None
+    query_plan: Optional[Dict[str, Any]] = None  # with explain=true: normalized plan and timings
     error: Optional[str] = None
 
 @router.post("/qna", response_model=QnAResponse)
-async def ask_qna(request: QnARequest):
+async def ask_qna(request: QnARequest, http_request: Request, x_api_key: Optional[str] = Header(None),
+                  x_llm_cache: Optional[Literal["use", "refresh", "bypass"]] = Header(None)):
+    if request.table_id:
+        try:
+            if resolve_table(request.table_id) is None:
+                raise HTTPException(status_code=404, detail=f"Unknown table_id: {request.table_id}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
-        # Invoke the QnA graph
-        result = await qna_graph.ainvoke({
-            "question": request.question,
-            "model_provider": request.model_provider,
-            "model_name": request.model_name
-        })
+        # Per-API-key token budget (TOKEN_BUDGET_PER_KEY per window)
+        ledger.check(tenant_for(x_api_key))
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    try:
+        # Invoke the QnA graph; identical concurrent questions share one run
+        async def run():
+            # Retries in the graph nodes give up rather than wait past this
+            set_deadline(settings.REQUEST_DEADLINE_SECONDS)
+            # LLM calls in the graph are charged to this request and API key
+            start_request(x_api_key)
+            set_cache_policy(x_llm_cache)
+            # LLM calls in the graph take admission slots at this priority
+            admission.bind(request.priority)
+            state = {
+                # Checkpointed values of the previous turn must not leak into this one
+                **{k: None for k in TURN_KEYS if k in QnAState.__annotations__},
+                "question": request.question,
+                "table_id": request.table_id,
+                "model_provider": request.model_provider,
+                "model_name": request.model_name,
+                "full_summary": request.full_summary,
+                "explain": request.explain
+            }
+            if request.session_id:
+                config = await sessions.begin(f"qna:{request.session_id}")
+                graph = await get_session_graph()
+                result = await graph.ainvoke(state, config, durability="exit")
+                await sessions.finish(config)
+            else:
+                result = await get_qna_graph().ainvoke(state)
+            # Keep the SQL so the full result can be exported by answer_id; a
+            # session refinement's SQL only runs against the previous result
+            if result.get("sql_query") and not result.get("error") and result.get("generation_path") != "session":
+                result["answer_id"] = remember_answer(result["sql_query"], request.table_id)
+            # Results beyond the first page are kept for /api/v1/results/{handle}
+            rows = result.get("query_result") or []
+            if len(rows) > settings.RESULT_PAGE_SIZE and not result.get("error"):
+                result["result_handle"] = await asyncio.to_thread(
+                    store_result, result.get("result_columns") or list(rows[0].keys()), rows)
+            return result
+
+        key = question_key(request.question, request.model_provider, request.model_name, request.table_id or settings.DATABASE_URL,
+                           tenant_for(x_api_key)) + (request.full_summary, request.session_id, x_llm_cache, request.explain)
+        result = await qna_flights.do(key, run)
         
         if result.get("error"):
-             return QnAResponse(
+             return respond(http_request, QnAResponse(
                 question=request.question,
                 business_explanation="Error",
                 entity_explanation="Error",
@@ -40,16 +129,35 @@ async def ask_qna(request: QnARequest):
                 data=[],
                 summary="An error occurred.",
                 error=result["error"]
-            )
+            ))
+
+        rows = result.get("query_result") or []
+        sampled = None
+        if request.max_points and len(rows) > request.max_points:
+            # Only the payload is reduced: the summary was written from every row
+            from src.agent.downsample import downsample_rows
+            columns = result.get("result_columns") or list(rows[0].keys())
+            sampled = downsample_rows(columns, rows, request.max_points, request.downsample)
 
-        return QnAResponse(
+        # The rows come straight from our own query: skip re-validating them
+        return respond(http_request, QnAResponse.model_construct(
             question=request.question,
-            business_explanation=result.get("business_explanation", ""),
-            entity_explanation=result.get("entity_explanation", ""),
-            sql_query=result.get("sql_query", ""),
-            table_layout=result.get("table_layout", ""),
-            data=result.get("query_result", []),
-            summary=result.get("summary", "")
-        )
+            business_explanation=result.get("business_explanation") or "",
+            entity_explanation=result.get("entity_explanation") or "",
+            sql_query=result.get("sql_query") or "",
+            table_layout=result.get("table_layout") or "",
+            data=sampled if sampled is not None else rows[:settings.RESULT_PAGE_SIZE],
+            total_rows=len(rows),
+            downsampled=request.downsample if sampled is not None else None,
+            result_handle=result.get("result_handle"),
+            summary=result.get("summary") or "",
+            model=result.get("selected_model") or request.model_name,
+            generation_path=result.get("generation_path"),
+            answer_id=result.get("answer_id"),
+            session_id=request.session_id,
+            query_plan=result.get("query_plan")
+        ))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
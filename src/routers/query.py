@@ -1,14 +1,45 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
 from pydantic import BaseModel, Field
-from src.agent.graph import graph
-from typing import Literal, Optional
+from typing import Any, Dict, Literal, Optional
+from src.agent.admission import admission, AdmissionRejected
+from src.agent.answers import remember_answer
+from src.agent.llm_cache import set_cache_policy
+from src.agent.resilience import set_deadline
+from src.agent.sessions import TURN_KEYS, sessions
+from src.agent.singleflight import SingleFlight, question_key
+from src.agent.token_budget import TokenBudgetExceeded, ledger, start_request, tenant_for
+from src.agent.state import AgentState
+from src.config import settings
+from src.database.registry import resolve_table
+from src.responses import respond
 
 router = APIRouter(prefix="/api/v1", tags=["query"])
+query_flights = SingleFlight("query")
+
+def get_graph():
+    # Imported on first use: compiling the graph pulls in LangGraph and LangChain
+    from src.agent.graph import graph
+    return graph
+
+_session_graph = None
+
+async def get_session_graph():
+    # Same graph, compiled with the session checkpointer so turns see earlier ones
+    global _session_graph
+    if _session_graph is None:
+        from src.agent.graph import workflow
+        _session_graph = workflow.compile(checkpointer=await sessions.saver())
+    return _session_graph
 
 class QueryRequest(BaseModel):
     question: str
-    model_provider: Literal["openai", "gemini"] = Field("openai", description="LLM Provider to use")
-    model_name: Optional[str] = Field(None, description="Specific model to use (e.g. gpt-4o)")
+    table_id: Optional[str] = Field(None, description="Onboarded table to query (see /tables); defaults to the main database")
+    model_provider: Literal["openai", "gemini", "replay"] = Field("openai", description="LLM Provider to use")
+    priority: Literal["interactive", "batch"] = Field("interactive", description="Admission priority when providers are saturated")
+    model_name: Optional[str] = Field(None, description="Specific model to use (e.g. gpt-4o); overrides the complexity-based tier")
+    full_summary: bool = Field(False, description="Always summarise with the LLM, even for single-value / small group-by results")
+    session_id: Optional[str] = Field(None, description="Continue a conversation: follow-up questions can refer to earlier turns")
+    explain: bool = Field(False, description="Attach the execution plan (runs EXPLAIN ANALYZE, i.e. the SQL once more)")
 
 class QueryResponse(BaseModel):
     question: str
@@ -18,25 +49,79 @@ class QueryResponse(BaseModel):
     error: str | None = None
     provider: str
     model: str | None = None
+    generation_path: str | None = None  # how the SQL was produced: 'rules', 'cache', 'llm' or 'session'
+    answer_id: str | None = None  # pass to /api/v1/export for the full result
+    session_id: str | None = None
+    query_plan: Dict[str, Any] | None = None  # with explain=true: normalized plan and timings
 
 @router.post("/query", response_model=QueryResponse)
-async def ask_question(request: QueryRequest):
+async def ask_question(request: QueryRequest, http_request: Request,
+                       x_api_key: Optional[str] = Header(None),
+                       x_llm_cache: Optional[Literal["use", "refresh", "bypass"]] = Header(None)):
+    if request.table_id:
+        try:
+            if resolve_table(request.table_id) is None:
+                raise HTTPException(status_code=404, detail=f"Unknown table_id: {request.table_id}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
-        # Invoke the graph with question AND model_provider
-        result = graph.invoke({
-            "question": request.question,
-            "model_provider": request.model_provider,
-            "model_name": request.model_name
-        })
+        # Per-API-key token budget (TOKEN_BUDGET_PER_KEY per window)
+        ledger.check(tenant_for(x_api_key))
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    try:
+        # Invoke the graph with question AND model_provider.
+        # Identical concurrent questions share one graph run.
+        async def run():
+            # Retries in the graph nodes give up rather than wait past this
+            set_deadline(settings.REQUEST_DEADLINE_SECONDS)
+            # LLM calls in the graph are charged to this request and API key
+            start_request(x_api_key)
+            set_cache_policy(x_llm_cache)
+            # LLM calls in the graph take admission slots at this priority
+            admission.bind(request.priority)
+            state = {
+                # Checkpointed values of the previous turn must not leak into this one
+                **{k: None for k in TURN_KEYS if k in AgentState.__annotations__},
+                "question": request.question,
+                "table_id": request.table_id,
+                "model_provider": request.model_provider,
+                "model_name": request.model_name,
+                "full_summary": request.full_summary,
+                "explain": request.explain
+            }
+            if request.session_id:
+                config = await sessions.begin(f"query:{request.session_id}")
+                graph = await get_session_graph()
+                result = await graph.ainvoke(state, config, durability="exit")
+                await sessions.finish(config)
+            else:
+                result = await get_graph().ainvoke(state)
+            # Keep the SQL so the full result can be exported by answer_id; a
+            # session refinement's SQL only runs against the previous result
+            if result.get("sql_query") and not result.get("error") and result.get("generation_path") != "session":
+                result["answer_id"] = remember_answer(result["sql_query"], request.table_id)
+            return result
+
+        key = question_key(request.question, request.model_provider, request.model_name, request.table_id or settings.DATABASE_URL,
+                           tenant_for(x_api_key)) + (request.full_summary, request.session_id, x_llm_cache, request.explain)
+        result = await query_flights.do(key, run)
         
-        return QueryResponse(
-            question=result["question"],
+        # Everything here was produced by the graph: skip re-validating it
+        return respond(http_request, QueryResponse.model_construct(
+            question=request.question,
             sql_query=result.get("sql_query"),
             query_result=result.get("query_result"),
             answer=result.get("answer"),
             error=result.get("error"),
             provider=result.get("model_provider", request.model_provider),
-            model=request.model_name
-        )
+            model=result.get("selected_model") or request.model_name,
+            generation_path=result.get("generation_path"),
+            answer_id=result.get("answer_id"),
+            session_id=request.session_id,
+            query_plan=result.get("query_plan")
+        ))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
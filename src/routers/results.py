@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from src.agent.results import get_page
+from src.responses import respond
+import asyncio
+
+router = APIRouter(prefix="/api/v1", tags=["results"])
+
+class ResultPage(BaseModel):
+    handle: str
+    columns: List[str]
+    data: List[Dict[str, Any]]
+    offset: int
+    limit: int
+    total_rows: int
+    sort: Optional[str] = None
+
+@router.get("/results/{handle}", response_model=ResultPage)
+async def get_result_page(handle: str, http_request: Request,
+                          offset: int = Query(0, ge=0),
+                          limit: int = Query(100, ge=1, le=10000),
+                          sort: Optional[str] = Query(None, description="Column to sort by; prefix with '-' for descending")):
+    """
+    One page of a stored /qna result (see result_handle). Pages come from
+    the stored copy, never from the source database.
+    """
+    column = sort[1:] if sort and sort.startswith("-") else sort
+    try:
+        page = await asyncio.to_thread(get_page, handle, offset, limit, column, bool(sort and sort.startswith("-")))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired result handle.")
+    columns, rows, total = page
+    return respond(http_request, ResultPage.model_construct(
+        handle=handle, columns=columns, data=rows, offset=offset, limit=limit, total_rows=total, sort=sort
+    ))
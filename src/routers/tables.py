@@ -4,6 +4,8 @@ import json
 import os
 import logging
 from typing import List, Optional, Dict, Any
+from src.database.registry import invalidate_resolved
+from src.database.schema_sync import metadata_lock
 
 router = APIRouter(prefix="/api/v1", tags=["tables"])
 logger = logging.getLogger(__name__)
@@ -33,6 +35,7 @@ async def save_table_prompt(table_id: str, payload: PromptConfigRequest):
     data = load_json(PROMPT_CONFIG)
     data[table_id] = payload.dict()
     save_json(PROMPT_CONFIG, data)
+    invalidate_resolved()
     return {"status": "success", "message": "Prompt configuration saved"}
 
 class TableSummary(BaseModel):
@@ -62,6 +65,11 @@ def load_json(path):
     except:
         return {}
 
+def _keep_checksum(old, new):
+    if old.get("schema_checksum"):
+        new["schema_checksum"] = old["schema_checksum"]
+    return new
+
 def save_json(path, data):
     with open(path, 'w') as f:
         json.dump(data, f, indent=4)
@@ -128,19 +136,21 @@ async def get_table_metadata(table_id: str):
 
 @router.post("/tables/{table_id}/metadata")
 async def update_table_metadata(table_id: str, payload: TableMetadataRequest):
-    # Check Postgres
-    pg_meta = load_json(POSTGRES_META)
-    if table_id in pg_meta:
-        pg_meta[table_id] = payload.dict()
-        save_json(POSTGRES_META, pg_meta)
-        return {"status": "success", "message": "Metadata saved to Postgres registry"}
-        
-    # Check SQLite
-    sl_meta = load_json(SQLITE_META)
-    if table_id in sl_meta:
-        sl_meta[table_id] = payload.dict()
-        save_json(SQLITE_META, sl_meta)
-        return {"status": "success", "message": "Metadata saved to SQLite registry"}
+    # The schema checksum stays, so a description edit does not count as drift
+    with metadata_lock:
+        # Check Postgres
+        pg_meta = load_json(POSTGRES_META)
+        if table_id in pg_meta:
+            pg_meta[table_id] = _keep_checksum(pg_meta[table_id], payload.dict())
+            save_json(POSTGRES_META, pg_meta)
+            return {"status": "success", "message": "Metadata saved to Postgres registry"}
+            
+        # Check SQLite
+        sl_meta = load_json(SQLITE_META)
+        if table_id in sl_meta:
+            sl_meta[table_id] = _keep_checksum(sl_meta[table_id], payload.dict())
+            save_json(SQLITE_META, sl_meta)
+            return {"status": "success", "message": "Metadata saved to SQLite registry"}
         
     # If not found, default to one based on... IDK?
     # Probably an error, but let's assume it's a new entry that got desynced?
@@ -0,0 +1,41 @@
+from src.config import settings
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_failed = False
+_lock = threading.Lock()
+
+def _get_encoding():
+    """
+    Loads the tiktoken encoding once. tiktoken fetches its BPE file on first
+    use, so when that fails (offline hosts) we remember the failure and use
+    the character heuristic from then on instead of retrying every call.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+    with _lock:
+        if _encoding is None and not _encoding_failed:
+            if settings.TOKENIZER_ENCODING == "heuristic":
+                _encoding_failed = True
+                return None
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(settings.TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.warning(f"Tokenizer '{settings.TOKENIZER_ENCODING}' unavailable, estimating tokens from length: {e}")
+                _encoding_failed = True
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Token count of a prompt fragment, measured locally (no API call)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # ~4 characters per token for English text and SQL identifiers
+    return len(text) // 4 + 1
@@ -0,0 +1,57 @@
+from src.config import settings
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Populated by run_warmup(); read by the /ready endpoint
+warmup_state = {
+    "enabled": settings.WARMUP_ON_STARTUP,
+    "ready": not settings.WARMUP_ON_STARTUP,
+    "steps": {},
+    "error": None,
+}
+
+def _step(name, fn):
+    started = time.perf_counter()
+    try:
+        fn()
+        warmup_state["steps"][name] = {"ok": True, "ms": round((time.perf_counter() - started) * 1000, 1)}
+    except Exception as e:
+        # A failed step is logged but does not block readiness: the request
+        # path will simply pay for it lazily, as it does without warm-up.
+        logger.warning(f"Warm-up step '{name}' failed: {e}")
+        warmup_state["steps"][name] = {"ok": False, "error": str(e)}
+
+def _compile_graphs():
+    from src.agent.graph import graph  # noqa: F401
+    from src.agent.qna_graph import qna_graph  # noqa: F401
+
+def _connect_database():
+    from src.database import get_db
+    get_db()
+
+def _render_schema():
+    from src.database import get_schema_info
+    get_schema_info()
+
+def _create_clients():
+    from src.agent.llm_factory import get_llm
+    get_llm("openai")
+    if settings.GOOGLE_API_KEY:
+        get_llm("gemini")
+
+def run_warmup():
+    """
+    Pays the one-off startup costs (imports + graph compilation, engine
+    creation and reflection, schema rendering, LLM client creation) before
+    the worker reports ready, instead of on the first user request.
+    """
+    logger.info("Warm-up started...")
+    started = time.perf_counter()
+    _step("graphs", _compile_graphs)
+    _step("database", _connect_database)
+    _step("schema", _render_schema)
+    _step("llm_clients", _create_clients)
+    warmup_state["ready"] = True
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s")